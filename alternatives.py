@@ -0,0 +1,130 @@
+import heapq
+from bisect import bisect_right
+from time import perf_counter
+from booking_store import time_to_minutes
+from metrics import timed
+from restaurant_catalog import RATING_BANDS, RestaurantCatalog, location_area
+from table_allocation import allocate
+
+# Similarity weights, they add up to 1
+CUISINE_WEIGHT = 0.5
+RATING_WEIGHT = 0.25
+AREA_WEIGHT = 0.25
+# What sending the party to another restaurant costs, in minutes of moving their
+# time: a restaurant with similarity s ranks like a shift of (1 - s) * this
+OTHER_RESTAURANT_MINUTES = 60
+DEFAULT_BUDGET_MS = 50
+
+#Index of the rating filter band a rating falls in, 0 below the lowest
+def rating_band(rating):
+    return bisect_right(RATING_BANDS, rating)
+
+#(cuisine, rating band, area) of a restaurant, the facets the restaurant filters use
+def facets(restaurant):
+    return restaurant.cuisine_type.lower(), rating_band(restaurant.rating), location_area(restaurant.location)
+
+def _facet_similarity(facets, other):
+    return CUISINE_WEIGHT * (facets[0] == other[0]) + RATING_WEIGHT * (facets[1] == other[1]) + AREA_WEIGHT * (facets[2] == other[2])
+
+#How alike two restaurants are from 0 to 1, on cuisine, rating band and area
+def similarity(restaurant, other):
+    return _facet_similarity(facets(restaurant), facets(other))
+
+def _best_rated(restaurant):
+    return -restaurant.rating, restaurant.restaurant_id
+
+
+#Suggestions for when the requested slot is full: the nearest free times at the
+#same restaurant, and similar restaurants with a table free at the requested time.
+#Everything is read from the booking store's in-memory day index, one read of the
+#day's bookings for the requested restaurant and one lookup per other restaurant.
+#Similar restaurants are the ones sharing its cuisine or area, checked most
+#similar first until enough are found or the latency budget runs out.
+#Restaurants are grouped by facets up front, so a query only scores the groups
+#and walks the restaurants it actually checks. Build a new engine after the
+#catalogue changes.
+class AlternativesEngine:
+    def __init__(self, restaurants):
+        self.catalog = restaurants if isinstance(restaurants, RestaurantCatalog) else RestaurantCatalog(restaurants.values())
+        # facets -> restaurants with them, best rated first
+        self._groups = {}
+        for restaurant in self.catalog.values():
+            self._groups.setdefault(facets(restaurant), []).append(restaurant)
+        # cuisine -> facets of its groups, and the same per area
+        self._cuisine_groups = {}
+        self._area_groups = {}
+        for key, group in self._groups.items():
+            group.sort(key=_best_rated)
+            self._cuisine_groups.setdefault(key[0], set()).add(key)
+            self._area_groups.setdefault(key[2], set()).add(key)
+        self.stats = {'queries': 0, 'restaurants_checked': 0, 'over_budget': 0}
+
+    #Restaurants sharing a restaurant's cuisine or area as (similarity, restaurant),
+    #most similar first, then best rated. Generated as they are consumed.
+    def similar_restaurants(self, restaurant):
+        own = facets(restaurant)
+        by_score = {}
+        for key in self._cuisine_groups.get(own[0], set()) | self._area_groups.get(own[2], set()):
+            by_score.setdefault(_facet_similarity(own, key), []).append(self._groups[key])
+        for score in sorted(by_score, reverse=True):
+            for other in heapq.merge(*by_score[score], key=_best_rated):
+                if other is not restaurant:
+                    yield score, other
+
+    #Free times at the restaurant closest to `time`, other than `time` itself, as alternative dicts
+    def _nearest_times(self, restaurant, date, time, party_size, limit):
+        requested = time_to_minutes(time)
+        # Every table, so joined tables count for large parties
+        matrix = restaurant.availability_matrix(date, 1)
+        order = sorted(range(len(matrix.slot_minutes)), key=lambda k: (abs(matrix.slot_minutes[k] - requested), matrix.slot_minutes[k]))
+        found = []
+        for k in order:
+            if len(found) >= limit:
+                break
+            free_tables = [{'table_id': table_id, 'size': size} for (table_id, size), busy in zip(matrix.tables, matrix.busy) if not busy >> k & 1]
+            option = allocate(free_tables, party_size)
+            if option is not None and matrix.slot_minutes[k] != requested:
+                found.append(_alternative(restaurant, matrix.slots[k], option, matrix.slot_minutes[k] - requested, 1.0))
+        return found
+
+    #Alternatives to a full (restaurant, date, time, party size), cheapest first.
+    #Each is a dict with the restaurant, time, table_id, seats, minutes_away,
+    #similarity and cost (minutes_away plus the cost of changing restaurant).
+    #Similar restaurants are only checked while the budget lasts.
+    @timed()
+    def suggest(self, restaurant_id, date, time, party_size, max_times=3, max_restaurants=5, budget_ms=DEFAULT_BUDGET_MS):
+        deadline = perf_counter() + budget_ms / 1000
+        restaurant = self.catalog.get(restaurant_id)
+        if restaurant is None:
+            raise ValueError(f"Unknown restaurant {restaurant_id}")
+        party_size = int(party_size)
+        self.stats['queries'] += 1
+
+        alternatives = self._nearest_times(restaurant, date, time, party_size, max_times)
+        found = 0
+        for score, other in self.similar_restaurants(restaurant):
+            if found >= max_restaurants:
+                break
+            if perf_counter() > deadline:
+                self.stats['over_budget'] += 1
+                break
+            if not other.check_valid_booking_time(time):
+                continue
+            self.stats['restaurants_checked'] += 1
+            option = allocate(other._free_tables(date, time), party_size)
+            if option is not None:
+                alternatives.append(_alternative(other, time, option, 0, score))
+                found += 1
+        alternatives.sort(key=lambda alternative: (alternative['cost'], alternative['time']))
+        return alternatives
+
+def _alternative(restaurant, time, option, minutes_away, score):
+    return {
+        'restaurant': restaurant,
+        'time': time,
+        'table_id': option.table_id,
+        'seats': option.seats,
+        'minutes_away': minutes_away,
+        'similarity': score,
+        'cost': abs(minutes_away) + (1 - score) * OTHER_RESTAURANT_MINUTES,
+    }
@@ -0,0 +1,93 @@
+from table_allocation import allocate
+
+#Minutes since midnight to 'HH:MM'
+def minutes_to_time(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+#Slot x table occupancy grid for one restaurant and day.
+#Each table's busy slots are kept as one int used as a bitset, bit k set
+#means the table can't be booked at slots[k].
+class AvailabilityMatrix:
+    def __init__(self, restaurant_id, date, slots, tables):
+        self.restaurant_id = restaurant_id
+        self.date = date
+        self.slot_minutes = list(slots)
+        self.slots = [minutes_to_time(minutes) for minutes in self.slot_minutes]
+        # List of (table_id, size)
+        self.tables = list(tables)
+        self.table_ids = [table_id for table_id, _ in self.tables]
+        self.busy = [0] * len(self.tables)
+        self._slot_positions = {slot: k for k, slot in enumerate(self.slots)}
+
+    #Build the grid from (table_id, start, duration) bookings in a single pass
+    @classmethod
+    def build(cls, restaurant_id, date, slots, tables, bookings, stay):
+        matrix = cls(restaurant_id, date, slots, tables)
+        positions = {table_id: i for i, table_id in enumerate(matrix.table_ids)}
+        slot_minutes = matrix.slot_minutes
+        if not slot_minutes:
+            return matrix
+        first = slot_minutes[0]
+        step = slot_minutes[1] - first if len(slot_minutes) > 1 else 1
+
+        for table_id, start, duration in bookings:
+            i = positions.get(table_id)
+            if i is None:
+                continue
+            # A stay starting at s overlaps [start, start + duration) when
+            # start - stay < s < start + duration
+            lo = max(0, (start - stay - first) // step + 1)
+            hi = min(len(slot_minutes), -(-(start + duration - first) // step))
+            if lo < hi:
+                matrix.busy[i] |= ((1 << (hi - lo)) - 1) << lo
+        return matrix
+
+    def _slot_bit(self, slot):
+        return 1 << self._slot_positions[slot]
+
+    #Check if a table can be booked at a slot
+    def is_free(self, slot, table_id):
+        return not self.busy[self.table_ids.index(table_id)] & self._slot_bit(slot)
+
+    #Get the tables (as get_available_tables returns them) free at a slot
+    def free_tables(self, slot):
+        bit = self._slot_bit(slot)
+        return [{'table_id': table_id, 'size': size} for (table_id, size), busy in zip(self.tables, self.busy) if not busy & bit]
+
+    #Get the slots where at least one table is free
+    def bookable_slots(self):
+        if not self.tables:
+            return []
+        # A slot is full only if it is busy for every table
+        full = -1
+        for busy in self.busy:
+            full &= busy
+        return [slot for k, slot in enumerate(self.slots) if not full >> k & 1]
+
+    #Get the slots where a party can be seated on one free table or, with allow_join,
+    #on free tables joined together. Build the matrix over every table (party size 1)
+    #so the smaller tables that can be joined are in it.
+    def seatable_slots(self, party_size, allow_join=True):
+        # A slot is full for single tables only if every table big enough is busy
+        full = -1
+        for (_, size), busy in zip(self.tables, self.busy):
+            if size >= party_size:
+                full &= busy
+        slots = []
+        for k, slot in enumerate(self.slots):
+            if not full >> k & 1:
+                slots.append(slot)
+            elif allow_join:
+                free_tables = [{'table_id': table_id, 'size': size} for (table_id, size), busy in zip(self.tables, self.busy) if not busy >> k & 1]
+                if allocate(free_tables, party_size) is not None:
+                    slots.append(slot)
+        return slots
+
+    #Number of free tables per slot
+    def free_counts(self):
+        return [sum(1 for busy in self.busy if not busy >> k & 1) for k in range(len(self.slots))]
+
+    #Grid as rows of booleans, one row per slot and one column per table
+    def as_rows(self):
+        return [[not busy >> k & 1 for busy in self.busy] for k in range(len(self.slots))]
@@ -0,0 +1,79 @@
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from table_allocation import allocate, assign_batch, assign_greedy, first_fit_table
+
+# Table configurations taken from restaurants.csv
+CONFIGS = {
+    'R001': {2: 3, 4: 4, 6: 3},
+    'R003': {2: 4, 4: 5, 6: 3},
+    'R004': {2: 2, 4: 2, 8: 2},
+}
+
+def _tables(config):
+    return [{'table_id': f"T{size}_{i+1}", 'size': size} for size in config for i in range(config[size])]
+
+def _parties(rng, count):
+    # Mostly couples and fours, with the odd large group
+    return [rng.choices([1, 2, 3, 4, 5, 6, 8, 10], weights=[3, 30, 12, 25, 8, 10, 5, 2])[0] for _ in range(count)]
+
+#Seat parties one by one as they arrive and report seated covers / total seats
+def sequential(policy, config, parties, rng):
+    free = _tables(config)
+    seats = sum(table['size'] for table in free)
+    covers = 0
+    for party_size in parties:
+        if policy == 'first-fit':
+            table = first_fit_table(free, party_size)
+            used = {table['table_id']} if table else set()
+        elif policy == 'any-fit':
+            # What the old GUI allowed: any table big enough, whichever the user clicks
+            fitting = [table for table in free if table['size'] >= party_size]
+            used = {rng.choice(fitting)['table_id']} if fitting else set()
+        else:
+            option = allocate(free, party_size, allow_join=(policy == 'best-fit+join'))
+            used = set(option.table_ids) if option else set()
+        if used:
+            covers += party_size
+            free = [table for table in free if table['table_id'] not in used]
+    return covers, seats
+
+def bench_sequential(rng, slots=2000):
+    print("Sequential arrivals, seat utilisation over", slots, "busy slots")
+    for policy in ('any-fit', 'first-fit', 'best-fit', 'best-fit+join'):
+        covers = seats = 0
+        started = time.perf_counter()
+        for _ in range(slots):
+            config = CONFIGS[rng.choice(sorted(CONFIGS))]
+            parties = _parties(rng, rng.randint(8, 16))
+            slot_covers, slot_seats = sequential(policy, config, parties, rng)
+            covers += slot_covers
+            seats += slot_seats
+        elapsed = time.perf_counter() - started
+        print(f"  {policy:14s} utilisation {covers / seats:6.1%}  {elapsed / slots * 1e6:8.1f} us/slot")
+
+def bench_batch(rng, slots=200):
+    print("Batch assignment of pending requests for one slot")
+    for count in (4, 6, 8):
+        results = {}
+        for name, solver in (('greedy', assign_greedy), ('exact', assign_batch)):
+            covers = 0
+            started = time.perf_counter()
+            local = random.Random(count)
+            for _ in range(slots):
+                config = CONFIGS[local.choice(sorted(CONFIGS))]
+                parties = _parties(local, count)
+                assignment = solver(_tables(config), parties)
+                covers += sum(size for option, size in zip(assignment, parties) if option is not None)
+            results[name] = (covers, (time.perf_counter() - started) / slots * 1e3)
+        print(f"  {count} requests: greedy {results['greedy'][0]} covers {results['greedy'][1]:.2f} ms/slot,"
+              f" exact {results['exact'][0]} covers {results['exact'][1]:.2f} ms/slot")
+
+if __name__ == "__main__":
+    rng = random.Random(42)
+    bench_sequential(rng)
+    bench_batch(rng)
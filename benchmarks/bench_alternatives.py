@@ -0,0 +1,81 @@
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from alternatives import AlternativesEngine
+from restaurant_functions import build_catalog, filter_restaurants, load_restaurants
+from run_benchmarks import percentile
+from storage import CSVBackend, get_booking_store, set_backend
+from synthetic_data import write_dataset
+
+RESTAURANTS = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+BOOKINGS = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+QUERIES = 300
+DATE = '2025-11-14'
+
+
+#Bookings filling every table of a restaurant at a time, so the slot is full
+def fill_slot(restaurant, time, user_id):
+    return [{'booking_id': f"FULL-{restaurant.restaurant_id}-{table_id}", 'user_id': user_id, 'restaurant_id': restaurant.restaurant_id,
+             'date': DATE, 'time': time, 'table_id': table_id, 'party_size': size, 'status': 'active', 'duration': restaurant.default_duration}
+            for table_id, size in restaurant._suitable_tables(1)]
+
+#What a user does by hand: try the other times one by one, then restaurants of the same cuisine
+def retry_by_hand(catalog, restaurant, time, party_size, max_times=3, max_restaurants=5):
+    found = []
+    times = sorted(restaurant.get_time_slots(), key=lambda slot: abs(int(slot[:2]) * 60 + int(slot[3:]) - int(time[:2]) * 60 - int(time[3:])))
+    for slot in times:
+        if len([f for f in found if f[0] is restaurant]) >= max_times:
+            break
+        if slot != time and restaurant.get_table_options(DATE, slot, party_size):
+            found.append((restaurant, slot))
+    others = 0
+    for other in filter_restaurants(catalog, restaurant.cuisine_type):
+        if others >= max_restaurants:
+            break
+        if other is not restaurant and other.check_valid_booking_time(time) and other.get_table_options(DATE, time, party_size):
+            found.append((other, time))
+            others += 1
+    return found
+
+def run(label, func, queries):
+    latencies = []
+    for args in queries:
+        started = time.perf_counter()
+        func(*args)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    print(f"{label:28}{percentile(latencies, 0.50):10.2f}{percentile(latencies, 0.99):10.2f}{max(latencies) * 1000:10.2f}")
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_dataset(tmp, RESTAURANTS, 1000, BOOKINGS, seed=24)
+        set_backend(CSVBackend(paths['restaurants'], paths['users'], paths['bookings']))
+        catalog = build_catalog(load_restaurants())
+        store = get_booking_store()
+        engine = AlternativesEngine(catalog)
+
+        rng = random.Random(24)
+        queries = []
+        rows = []
+        for restaurant in rng.sample(list(catalog.values()), QUERIES):
+            time_str = rng.choice(restaurant.get_time_slots()[2:-4])
+            # Tables already booked then are rejected, they are full anyway
+            rows += fill_slot(restaurant, time_str, 'U000001')
+            queries.append((restaurant, time_str, rng.choice([2, 2, 4, 6])))
+        store.reserve_many(rows)
+
+        print(f"{len(catalog)} restaurants, {BOOKINGS} bookings, {QUERIES} full slots")
+        print(f"{'':28}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        run('retry by hand', lambda restaurant, time_str, party_size: retry_by_hand(catalog, restaurant, time_str, party_size), queries)
+        run('AlternativesEngine.suggest', lambda restaurant, time_str, party_size: engine.suggest(restaurant.restaurant_id, DATE, time_str, party_size), queries)
+        run('suggest, 2 ms budget', lambda restaurant, time_str, party_size: engine.suggest(restaurant.restaurant_id, DATE, time_str, party_size, budget_ms=2), queries)
+        print(engine.stats)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from booking_analytics import BookingAnalytics
+from booking_record import BOOKING_FIELDS
+from booking_store import BookingStore
+from restaurant_functions import load_restaurants
+from storage import CSVBackend, set_backend
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+FIRST_DAY = date(2022, 1, 1)
+DAYS = 3 * 365
+
+#Several years of history with cancellations, completed visits and no-shows
+def write_history(path, restaurants, rows, rng):
+    restaurants = list(restaurants.values())
+    tables = {restaurant.restaurant_id: restaurant._suitable_tables(1) for restaurant in restaurants}
+    statuses = ['completed'] * 14 + ['active'] * 2 + ['cancelled'] * 3 + ['no_show']
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(BOOKING_FIELDS)
+        for i in range(rows):
+            restaurant = rng.choice(restaurants)
+            table_id, size = rng.choice(tables[restaurant.restaurant_id])
+            hour = rng.randint(int(restaurant.opening_hours[:2]), int(restaurant.closing_hours[:2]) - 2)
+            writer.writerow([f"H{i:08d}", f"U{rng.randint(1, 20000):05d}", restaurant.restaurant_id,
+                             (FIRST_DAY + timedelta(days=rng.randrange(DAYS))).isoformat(),
+                             f"{hour:02d}:{rng.choice(['00', '30'])}", table_id, rng.randint(1, size), rng.choice(statuses), ''])
+
+def timed(name, func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    print(f"{name:40}{(time.perf_counter() - started) * 1000:10.1f} ms")
+    return result
+
+def main():
+    set_backend(CSVBackend(os.path.join(ROOT, 'restaurants.csv'), os.path.join(ROOT, 'users.csv'), os.devnull))
+    restaurants = load_restaurants()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bookings.csv')
+        write_history(path, restaurants, ROWS, random.Random(16))
+        print(f"{ROWS} bookings over {DAYS} days, {os.path.getsize(path) / 1e6:.1f} MB CSV")
+        store = timed('load BookingStore', BookingStore, path)
+        analytics = timed('pack columns', BookingAnalytics, restaurants, store)
+
+        timed('covers_per_day', analytics.covers_per_day)
+        timed('covers_per_day (one month)', analytics.covers_per_day, '2023-06-01', '2023-06-30')
+        timed('peak_slot_utilisation', analytics.peak_slot_utilisation)
+        timed('cancellation_rates', analytics.cancellation_rates)
+        timed('no_show_hot_spots', analytics.no_show_hot_spots)
+
+        # New bookings and a cancellation since the last report
+        restaurant = next(iter(restaurants.values()))
+        table_id = restaurant._suitable_tables(1)[0][0]
+        for i in range(100):
+            store.add_booking({'booking_id': f"N{i:05d}", 'user_id': 'U00001', 'restaurant_id': restaurant.restaurant_id,
+                               'date': (FIRST_DAY + timedelta(days=DAYS + i)).isoformat(), 'time': restaurant.opening_hours,
+                               'table_id': table_id, 'party_size': '2', 'status': 'active', 'duration': ''})
+        store.cancel_booking('N00000', 'U00001')
+        timed('refresh after 100 bookings + 1 cancel', analytics.refresh)
+        timed('cancellation_rates (refreshed)', analytics.cancellation_rates)
+        timed('refresh with nothing new', analytics.refresh)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from booking_store import time_to_minutes
+from restaurant_classes import Restaurant
+from restaurant_functions import get_available_time_slots
+from storage import CSVBackend, get_booking_store, set_backend
+
+RESTAURANTS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+DAYS = int(sys.argv[2]) if len(sys.argv) > 2 else 14
+FIRST_DAY = date(2025, 6, 1)
+CONFIGS = ["2:4,4:4,6:2", "2:6,4:6,8:2", "2:2,4:8,6:4,10:1"]
+HOURS = [("11:00", "22:00"), ("12:00", "23:00"), ("17:00", "22:30")]
+
+
+#Restaurant as it was before hours, slots and table IDs were cached:
+#everything is parsed or rebuilt on every call
+class UncachedRestaurant(Restaurant):
+    __slots__ = ()
+
+    def _suitable_tables(self, party_size):
+        suitable_sizes = [size for size in self.table_configuration.keys() if size >= party_size]
+        return [(f"T{size}_{i+1}", size) for size in suitable_sizes for i in range(self.table_configuration[size])]
+
+    def _slot_grid(self, step=30):
+        minutes = list(range(time_to_minutes(self.opening_hours), time_to_minutes(self.closing_hours) + 1, step))
+        return minutes, None
+
+    def check_valid_booking_time(self, time):
+        try:
+            booking_time = datetime.strptime(time, '%H:%M').time()
+            opening = datetime.strptime(self.opening_hours, '%H:%M').time()
+            closing = datetime.strptime(self.closing_hours, '%H:%M').time()
+            return opening <= booking_time <= closing
+        except ValueError:
+            return False
+
+#The strptime/strftime loop get_available_time_slots used, which never ends when closing is 23:30 or later
+def uncached_time_slots(restaurant, day):
+    opening = datetime.strptime(restaurant.opening_hours, '%H:%M')
+    closing = datetime.strptime(restaurant.closing_hours, '%H:%M')
+    time_slots = []
+    current = opening
+    while current <= closing:
+        time_slots.append(current.strftime('%H:%M'))
+        current = datetime.strptime((datetime.combine(datetime.today(), current.time()) + timedelta(minutes=30)).strftime('%H:%M'), '%H:%M')
+    return time_slots
+
+def make_restaurants(cls, count):
+    rng = random.Random(17)
+    restaurants = []
+    for i in range(count):
+        opening, closing = rng.choice(HOURS)
+        restaurants.append(cls(f"R{i:04d}", f"Restaurant {i}", 'Italian', 4.0, 'Downtown', 20, rng.choice(CONFIGS), opening, closing))
+    return restaurants
+
+def fill_store(store, restaurants, days, rng):
+    count = 0
+    for restaurant in restaurants:
+        tables = restaurant._suitable_tables(1)
+        slots = restaurant.get_slot_minutes()[:-3]
+        for offset in range(days):
+            day = (FIRST_DAY + timedelta(days=offset)).isoformat()
+            for table_id, size in rng.sample(list(tables), len(tables) // 3):
+                minutes = rng.choice(slots)
+                store.add_booking({'booking_id': f"B{count:07d}", 'user_id': 'U001', 'restaurant_id': restaurant.restaurant_id,
+                                   'date': day, 'time': f"{minutes // 60:02d}:{minutes % 60:02d}", 'table_id': table_id,
+                                   'party_size': '2', 'status': 'active', 'duration': '90'})
+                count += 1
+    return count
+
+#What an availability page does per restaurant and day: list the slots, check
+#each is within hours, list free tables at a few of them and build the day grid
+def sweep(restaurants, days, time_slots):
+    offers = 0
+    for offset in range(days):
+        day = (FIRST_DAY + timedelta(days=offset)).isoformat()
+        for restaurant in restaurants:
+            slots = time_slots(restaurant, day)
+            valid = [slot for slot in slots if restaurant.check_valid_booking_time(slot)]
+            for slot in valid[::4]:
+                offers += len(restaurant.get_available_tables(day, slot, 2))
+            offers += len(restaurant.availability_matrix(day, 4).bookable_slots())
+    return offers
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        set_backend(CSVBackend(os.devnull, os.devnull, os.path.join(tmp, 'bookings.csv')))
+        store = get_booking_store()
+        count = fill_store(store, make_restaurants(Restaurant, RESTAURANTS), DAYS, random.Random(17))
+        print(f"{RESTAURANTS} restaurants x {DAYS} days, {count} bookings")
+
+        results = {}
+        for name, cls, time_slots in [('uncached', UncachedRestaurant, uncached_time_slots),
+                                      ('cached', Restaurant, get_available_time_slots)]:
+            restaurants = make_restaurants(cls, RESTAURANTS)
+            started = time.perf_counter()
+            results[name] = sweep(restaurants, DAYS, time_slots)
+            seconds = time.perf_counter() - started
+            print(f"{name:10}{seconds:8.2f}s  {RESTAURANTS * DAYS / seconds:10,.0f} restaurant-days/s")
+        assert results['uncached'] == results['cached']
+
+if __name__ == "__main__":
+    main()
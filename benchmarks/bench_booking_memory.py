@@ -0,0 +1,74 @@
+import csv
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from booking_record import BOOKING_FIELDS, Booking, BookingTable
+from booking_store import BookingStore
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+
+def write_bookings(path, rows, rng):
+    first_day = date(2022, 1, 1)
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(BOOKING_FIELDS)
+        for i in range(rows):
+            size = rng.choice([2, 4, 6])
+            writer.writerow([f"B{i:08x}", f"U{rng.randint(1, 50000):05d}", f"R{rng.randint(1, 200):03d}",
+                             (first_day + timedelta(days=rng.randrange(1095))).isoformat(),
+                             f"{rng.randint(11, 21):02d}:{rng.choice(['00', '30'])}", f"T{size}_{rng.randint(1, 4)}",
+                             rng.randint(1, size), rng.choice(['active'] * 8 + ['cancelled', 'no_show']), ''])
+
+def read_dicts(path):
+    with open(path, newline='') as file:
+        return list(csv.DictReader(file))
+
+def read_bookings(path):
+    with open(path, newline='') as file:
+        reader = csv.reader(file)
+        return Booking.from_csv_rows(reader, next(reader))
+
+def read_table(path):
+    return BookingTable.from_bookings(read_bookings(path))
+
+#Seconds to build, then bytes still held by the result (measured in a second run under tracemalloc)
+def measure(build, path):
+    gc.collect()
+    started = time.perf_counter()
+    result = build(path)
+    seconds = time.perf_counter() - started
+    del result
+    gc.collect()
+    tracemalloc.start()
+    result = build(path)
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return seconds, held
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bookings.csv')
+        write_bookings(path, ROWS, random.Random(15))
+        print(f"{ROWS} bookings, {os.path.getsize(path) / 1e6:.1f} MB CSV")
+        print(f"{'':34}{'load s':>8}{'MB':>9}{'bytes/booking':>15}")
+        cases = [
+            ('csv.DictReader dict rows', read_dicts),
+            ('Booking records', read_bookings),
+            ('BookingTable columns (+ IDs)', read_table),
+            ('BookingStore (records + indexes)', BookingStore),
+        ]
+        for name, build in cases:
+            seconds, held = measure(build, path)
+            print(f"{name:34}{seconds:8.2f}{held / 1e6:9.1f}{held / ROWS:15.0f}")
+
+if __name__ == "__main__":
+    main()
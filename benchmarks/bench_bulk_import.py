@@ -0,0 +1,81 @@
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from booking_store import BOOKING_FIELDS, BookingStore
+from bulk_bookings import export_bookings, import_bookings
+from restaurant_functions import load_restaurants
+from sqlite_store import SQLiteBackend
+from storage import CSVBackend, set_backend
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+SINGLE_ROWS = 2000
+FIRST_DAY = date(2025, 1, 1)
+DAYS = 730
+
+#Partner feed style rows spread over two years, with a few invalid ones and natural clashes
+def write_feed(path, restaurants, rows, rng):
+    restaurants = list(restaurants.values())
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(BOOKING_FIELDS)
+        for i in range(rows):
+            restaurant = rng.choice(restaurants)
+            tables = restaurant._suitable_tables(1)
+            table_id, size = rng.choice(tables)
+            opening = int(restaurant.opening_hours[:2])
+            closing = int(restaurant.closing_hours[:2])
+            hour = rng.randint(opening, closing - 1)
+            if rng.random() < 0.01:
+                hour = (closing + 1) % 24
+            day = FIRST_DAY + timedelta(days=rng.randrange(DAYS))
+            writer.writerow([f"P{i:07d}", f"U{rng.randint(1, 5000):05d}", restaurant.restaurant_id, day.isoformat(),
+                             f"{hour:02d}:{rng.choice(['00', '30'])}", table_id, rng.randint(1, size), 'active', ''])
+
+def rate(rows, seconds):
+    return f"{rows / seconds:,.0f} rows/s"
+
+def main():
+    rng = random.Random(14)
+    set_backend(CSVBackend(os.path.join(ROOT, 'restaurants.csv'), os.path.join(ROOT, 'users.csv'), os.devnull))
+    restaurants = load_restaurants()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        feed = os.path.join(tmp, 'feed.csv')
+        write_feed(feed, restaurants, ROWS, rng)
+        print(f"{ROWS} synthetic rows, {os.path.getsize(feed) / 1e6:.1f} MB")
+
+        # One reserve() per row, what calling make_reservation in a loop costs
+        store = BookingStore(os.path.join(tmp, 'single.csv'))
+        with open(feed, newline='') as file:
+            sample = [row for _, row in zip(range(SINGLE_ROWS), csv.DictReader(file))]
+        started = time.perf_counter()
+        for row in sample:
+            row['duration'] = row['duration'] or '90'
+            try:
+                store.reserve(row)
+            except Exception:
+                pass
+        print(f"reserve() per row, first {SINGLE_ROWS} rows: {rate(SINGLE_ROWS, time.perf_counter() - started)}")
+
+        for name, store in [('CSV', BookingStore(os.path.join(tmp, 'bookings.csv'))),
+                            ('SQLite', SQLiteBackend(os.path.join(tmp, 'bookings.db')).bookings)]:
+            report = import_bookings(feed, restaurants, store)
+            print(f"{name} bulk import: {report}")
+
+            started = time.perf_counter()
+            count = export_bookings(os.path.join(tmp, 'export.csv'), store=store)
+            print(f"{name} export all: {count} rows, {rate(count, time.perf_counter() - started)}")
+            started = time.perf_counter()
+            count = export_bookings(os.path.join(tmp, 'export.csv'), ['R001', 'R002'], '2025-03-01', '2025-05-31', store=store)
+            print(f"{name} export 2 restaurants, 3 months: {count} rows in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import metrics
+from restaurant_functions import load_restaurants
+from storage import CSVBackend, get_booking_store, set_backend
+from synthetic_data import write_dataset
+
+CALLS = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+
+@metrics.timed()
+def instrumented(value):
+    return value + 1
+
+def plain(value):
+    return value + 1
+
+#Seconds per call of func over CALLS calls
+def per_call(func, *args):
+    started = time.perf_counter()
+    for _ in range(CALLS):
+        func(*args)
+    return (time.perf_counter() - started) / CALLS
+
+#Cost of the instrumentation layer: an empty function with and without it, then
+#get_available_tables with metrics off, on, and on with the sampling profiler running
+def main():
+    print(f"{'case':44}{'ns/call':>10}")
+    metrics.disable()
+    print(f"{'plain function':44}{per_call(plain, 1) * 1e9:10.0f}")
+    print(f"{'@timed function, metrics off':44}{per_call(instrumented, 1) * 1e9:10.0f}")
+    metrics.enable()
+    print(f"{'@timed function, metrics on':44}{per_call(instrumented, 1) * 1e9:10.0f}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_dataset(tmp, 200, 1000, 50000, seed=22)
+        set_backend(CSVBackend(paths['restaurants'], paths['users'], paths['bookings']))
+        restaurant = next(iter(load_restaurants().values()))
+        get_booking_store()
+        args = ('2025-11-10', '19:00', 2)
+
+        metrics.disable()
+        print(f"{'get_available_tables, metrics off':44}{per_call(restaurant.get_available_tables, *args) * 1e9:10.0f}")
+        metrics.enable()
+        print(f"{'get_available_tables, metrics on':44}{per_call(restaurant.get_available_tables, *args) * 1e9:10.0f}")
+        metrics.start_profiler()
+        print(f"{'get_available_tables, metrics + profiler':44}{per_call(restaurant.get_available_tables, *args) * 1e9:10.0f}")
+        metrics.stop_profiler()
+    print()
+    print(metrics.format_table())
+
+if __name__ == "__main__":
+    main()
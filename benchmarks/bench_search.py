@@ -0,0 +1,64 @@
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from restaurant_classes import Restaurant
+from restaurant_functions import search_restaurants
+from search_index import RestaurantSearchIndex
+
+COMMON_WORDS = ['grand', 'kitchen', 'spice', 'garden', 'sushi', 'express', 'bistro', 'dragon', 'palace', 'golden',
+                'house', 'table', 'corner', 'olive', 'lotus', 'harbour', 'smoke', 'fire', 'bamboo', 'saffron']
+SYLLABLES = ['ka', 'lo', 'mi', 'ra', 'tu', 'vel', 'an', 'zo', 'ri', 'no', 'sa', 'be', 'dor', 'fin', 'gal', 'has']
+
+#Common restaurant words plus a long tail of made-up words, like real names
+def make_words(rng, count=3000):
+    words = set(COMMON_WORDS)
+    while len(words) < count:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+CUISINES = ['Italian', 'Indian', 'Japanese', 'French', 'Chinese', 'Mexican', 'Thai', 'Greek', 'Korean', 'Lebanese']
+AREAS = ['Downtown', 'Midtown', 'Uptown', 'Suburb', 'Riverside', 'Old Town', 'Harbourside']
+
+def make_restaurants(count, rng):
+    words = make_words(rng)
+    restaurants = {}
+    for i in range(count):
+        name = ' '.join(rng.sample(words, 2) if rng.random() < 0.8 else rng.sample(COMMON_WORDS, 2)).title()
+        location = f"{rng.randint(1, 999)} {rng.choice(words).title()} St, {rng.choice(AREAS)}"
+        restaurants[f"R{i:06d}"] = Restaurant(f"R{i:06d}", name, rng.choice(CUISINES), round(rng.uniform(3, 5), 1),
+                                              location, 10, "2:4,4:4,6:2", "11:00", "23:00")
+    return restaurants
+
+#Every prefix of a word, as the search box sees it while someone types
+def keystrokes(word):
+    return [word[:i] for i in range(1, len(word) + 1)]
+
+def bench(count, rng):
+    restaurants = make_restaurants(count, rng)
+    started = time.perf_counter()
+    index = RestaurantSearchIndex(restaurants.values())
+    build = time.perf_counter() - started
+
+    print(f"{count:>7} restaurants, index built in {build * 1e3:.0f} ms")
+    # Narrow queries (a name being typed) and broad ones (a whole cuisine or area)
+    for label, words in (('name', ['saffron', 'kalori', 'dorfin']), ('broad', ['japanese', 'riverside'])):
+        for lengths, queries in (('1-2 letters', [q for word in words for q in keystrokes(word)[:2]]),
+                                 ('3+ letters', [q for word in words for q in keystrokes(word)[2:]])):
+            timings = {}
+            for name, search in (('linear', lambda q: search_restaurants(restaurants, q)),
+                                 ('index', lambda q: search_restaurants(restaurants, q, index)),
+                                 ('index top 50', lambda q: index.search(q, limit=50))):
+                started = time.perf_counter()
+                for _ in range(3):
+                    for query in queries:
+                        search(query)
+                timings[name] = (time.perf_counter() - started) / (3 * len(queries)) * 1e3
+            print(f"    {label:5s} queries, {lengths:11s} ms per keystroke: " + ', '.join(f"{name} {value:.2f}" for name, value in timings.items()))
+
+if __name__ == "__main__":
+    rng = random.Random(7)
+    for count in (1000, 10000, 50000):
+        bench(count, rng)
@@ -0,0 +1,82 @@
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from booking_service import BookingService
+from booking_store import BookingConflictError
+from run_benchmarks import percentile
+from storage import CSVBackend, set_backend
+from synthetic_data import CUISINES, write_dataset
+
+CLIENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+SESSIONS = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+# Share of availability checks that go to the ten most popular restaurants on the busiest days
+HOT_SHARE = 0.5
+DATES = [f"2025-10-{day:02d}" for day in range(1, 29)]
+
+
+#One simulated user: search, check a few restaurants, book one, look at the
+#history and sometimes cancel, `sessions` times over
+async def client(service, user_id, rng, latencies, outcomes, sessions):
+    async def call(kind, coroutine):
+        started = time.perf_counter()
+        try:
+            return await coroutine
+        except (ValueError, BookingConflictError) as exc:
+            outcomes[type(exc).__name__] = outcomes.get(type(exc).__name__, 0) + 1
+        finally:
+            latencies.setdefault(kind, []).append(time.perf_counter() - started)
+
+    restaurant_ids = list(service.restaurants)
+    for _ in range(sessions):
+        await call('search', service.search(rng.choice(CUISINES).lower(), limit=20))
+        party_size = rng.choice([2, 2, 2, 4, 4, 6])
+        if rng.random() < HOT_SHARE:
+            restaurant_id, date = rng.choice(restaurant_ids[:10]), rng.choice(DATES[:3])
+        else:
+            restaurant_id, date = rng.choice(restaurant_ids), rng.choice(DATES)
+        availability = await call('availability', service.availability(restaurant_id, date, party_size))
+        if availability and availability['slots'] and rng.random() < 0.5:
+            slot = rng.choice(availability['slots'][:-1] or availability['slots'])
+            booking_id = await call('book', service.book(user_id, restaurant_id, date, slot, party_size))
+            if booking_id and rng.random() < 0.2:
+                await call('cancel', service.cancel(user_id, booking_id))
+        await call('history', service.history(user_id, limit=20))
+
+async def load_test(service, clients, sessions):
+    rng = random.Random(19)
+    user_ids = list(service.users)
+    latencies, outcomes = {}, {}
+    started = time.perf_counter()
+    await asyncio.gather(*(client(service, rng.choice(user_ids), random.Random(i), latencies, outcomes, sessions)
+                           for i in range(clients)))
+    return time.perf_counter() - started, latencies, outcomes
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_dataset(tmp, 300, 20000, 60000, seed=19)
+        set_backend(CSVBackend(paths['restaurants'], paths['users'], paths['bookings']))
+        service = BookingService()
+        seconds, latencies, outcomes = asyncio.run(load_test(service, CLIENTS, SESSIONS))
+        service.close()
+
+    requests = sum(len(values) for values in latencies.values())
+    print(f"{CLIENTS} concurrent clients x {SESSIONS} sessions: {requests} requests in {seconds:.2f}s, {requests / seconds:,.0f} requests/s")
+    print(f"{'':14}{'requests':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for kind, values in latencies.items():
+        values.sort()
+        print(f"{kind:14}{len(values):10}{percentile(values, 0.5):10.2f}{percentile(values, 0.95):10.2f}{percentile(values, 0.99):10.2f}{values[-1] * 1000:10.2f}")
+    stats = service.stats
+    print(f"availability requests {stats['availability_requests']}, day reads {stats['day_reads']} "
+          f"({stats['availability_requests'] / max(stats['day_reads'], 1):.1f} requests per read)")
+    if outcomes:
+        print(f"rejected: {outcomes}")
+
+if __name__ == "__main__":
+    main()
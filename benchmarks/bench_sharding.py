@@ -0,0 +1,77 @@
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from restaurant_functions import load_restaurants
+from sharded_engine import ShardedEngine
+from storage import CSVBackend
+from synthetic_data import write_dataset
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 40000
+CLIENTS = 8
+BATCH = 100
+DATES = [f"2025-10-{day:02d}" for day in range(1, 29)]
+
+
+#Availability checks with one booking attempt in ten, spread over all restaurants
+def make_requests(restaurants, count, rng):
+    restaurants = list(restaurants.values())
+    requests = []
+    for i in range(count):
+        restaurant = rng.choice(restaurants)
+        slot = rng.choice(restaurant.get_time_slots()[:-4])
+        date = rng.choice(DATES)
+        if i % 10 == 0:
+            table_id = rng.choice(restaurant._suitable_tables(1))[0]
+            requests.append(('make_reservation', (f"U{rng.randint(1, 20000):06d}", restaurant.restaurant_id, date, slot, table_id, 2)))
+        else:
+            requests.append(('get_available_tables', (restaurant.restaurant_id, date, slot, rng.choice([2, 4]))))
+    return requests
+
+#CLIENTS threads each sending their share of the requests in batches of BATCH
+def drive(engine, requests):
+    def client(share):
+        for start in range(0, len(share), BATCH):
+            engine.run_batch(share[start:start + BATCH])
+    threads = [threading.Thread(target=client, args=(requests[i::CLIENTS],)) for i in range(CLIENTS)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+def main():
+    cores = os.cpu_count() or 1
+    counts = sorted({1, 2, 4, cores})
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_dataset(tmp, 400, 20000, 100000, seed=20)
+        restaurants = load_restaurants(CSVBackend(paths['restaurants'], os.devnull, os.devnull))
+        requests = make_requests(restaurants, REQUESTS, random.Random(20))
+        print(f"{REQUESTS} requests from {CLIENTS} client threads in batches of {BATCH}, {cores} CPU cores")
+
+        first = None
+        for shards in counts:
+            engine = ShardedEngine(os.path.join(tmp, f"shards{shards}"), shards, paths['restaurants'], paths['bookings'])
+            try:
+                # Wait for every shard to load its segment
+                engine.find_table(DATES[0], 2)
+                seconds = drive(engine, requests)
+                started = time.perf_counter()
+                found = engine.find_table('2025-10-10', 4, '19:00')
+                fan_out = time.perf_counter() - started
+            finally:
+                engine.close()
+            rate = REQUESTS / seconds
+            first = first or rate
+            print(f"{shards} shard(s): {rate:10,.0f} requests/s (x{rate / first:.2f}), "
+                  f"find_table over {len(restaurants)} restaurants {fan_out * 1000:.1f} ms, {len(found)} with a table")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import restaurant_functions as rf
+import snapshot
+from storage import CSVBackend, set_backend
+from synthetic_data import write_dataset
+
+SCALES = [(int(r), int(u)) for r, u in (arg.split('x') for arg in sys.argv[1:])] or [(500, 5000), (5000, 50000), (20000, 200000)]
+
+#Seconds the import of a module takes in a fresh interpreter, None if it isn't installed
+def import_seconds(module):
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    return float(result.stdout) if result.returncode == 0 else None
+
+#What init_gui did before the window could appear
+def eager_load(backend):
+    restaurants = rf.build_catalog(rf.load_restaurants(backend))
+    users = rf.load_users()
+    return restaurants, users, rf.name_labels(users)
+
+#Seconds until users can be picked and until the restaurant list is filled, loading through the snapshot
+def snapshot_load(backend):
+    started = time.perf_counter()
+    data = snapshot.load_snapshot(backend)
+    users = data.users()
+    users_ready = time.perf_counter() - started
+    rf.build_catalog(data.restaurants())
+    return users_ready, time.perf_counter() - started, data.rebuilt
+
+def main():
+    tkcalendar = import_seconds('tkcalendar')
+    print(f"import tkcalendar: {'not installed' if tkcalendar is None else f'{tkcalendar * 1000:.0f} ms'}, now deferred until the window is up")
+    print("Data work before the window appears: eager = all of it, snapshot = none (it streams in on worker threads)")
+    print(f"{'restaurants':>12}{'users':>9}{'eager s':>9}{'cold users s':>14}{'cold all s':>12}{'warm users s':>14}{'warm all s':>12}{'snapshot MB':>13}")
+    for restaurant_count, user_count in SCALES:
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = write_dataset(tmp, restaurant_count, user_count, 0, seed=23)
+            backend = set_backend(CSVBackend(paths['restaurants'], paths['users'], paths['bookings']))
+            started = time.perf_counter()
+            eager_load(backend)
+            eager = time.perf_counter() - started
+            cold_users, cold_all, rebuilt = snapshot_load(backend)
+            assert rebuilt
+            warm_users, warm_all, rebuilt = snapshot_load(backend)
+            assert not rebuilt
+            size = os.path.getsize(snapshot.snapshot_path(backend)) / 1e6
+            print(f"{restaurant_count:12,}{user_count:9,}{eager:9.2f}{cold_users:14.2f}{cold_all:12.2f}{warm_users:14.2f}{warm_all:12.2f}{size:13.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from availability import minutes_to_time
+from restaurant_functions import load_restaurants
+from storage import CSVBackend, set_backend
+from synthetic_data import write_dataset
+from waitlist import Waitlist
+
+SIZES = [int(size) for size in sys.argv[1:]] or [10000, 100000, 500000]
+EVENTS = 2000
+SCAN_EVENTS = 20
+DATES = [f"2025-11-{day:02d}" for day in range(1, 31)]
+
+
+def fill(waitlist, restaurants, size, rng):
+    for i in range(size):
+        restaurant = rng.choice(restaurants)
+        slots = restaurant.get_slot_minutes()
+        first = rng.randrange(len(slots))
+        last = min(len(slots) - 1, first + rng.choice([0, 1, 2, 4]))
+        waitlist.add(f"U{i:07d}", restaurant.restaurant_id, rng.choice(DATES), minutes_to_time(slots[first]),
+                     minutes_to_time(slots[last]), rng.choice([2, 2, 4, 4, 6]), priority=rng.choice([0, 0, 0, 1]))
+
+#Freed tables at random restaurants, days and times
+def make_events(restaurants, count, rng):
+    events = []
+    for _ in range(count):
+        restaurant = rng.choice(restaurants)
+        table_id, _ = rng.choice(restaurant._suitable_tables(1))
+        events.append((restaurant.restaurant_id, rng.choice(DATES), rng.choice(restaurant.get_slot_minutes()), restaurant.default_duration, table_id))
+    return events
+
+#What matching costs without the slot index: look at every waiting request
+def scan_match(waitlist, restaurant_id, date, start, duration, table_id):
+    stay = waitlist.restaurants[restaurant_id].default_duration
+    best = None
+    for request in waitlist.requests.values():
+        if request.status != 'waiting' or request.restaurant_id != restaurant_id or request.date != date:
+            continue
+        if request.latest <= start - stay or request.earliest >= start + duration:
+            continue
+        key = (request.priority, request.sequence)
+        if best is None or key < best:
+            best = key
+    return best
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_dataset(tmp, 200, 100, 0, seed=21)
+        set_backend(CSVBackend(paths['restaurants'], paths['users'], paths['bookings']))
+        restaurants = load_restaurants()
+        restaurant_list = list(restaurants.values())
+        print(f"{len(restaurants)} restaurants x {len(DATES)} days, {EVENTS} freed tables per size")
+        # No bookings, so every table is free and an event serves whoever fits; us/served is the cost of one match
+        print(f"{'waiting':>10}{'fill s':>9}{'us/event':>10}{'served/event':>14}{'us/served':>11}{'buckets/event':>15}{'scan us/match':>15}")
+        for size in SIZES:
+            rng = random.Random(21)
+            # Offers only, so nothing is written and every size sees the same free tables
+            waitlist = Waitlist(restaurants, listen=False)
+            started = time.perf_counter()
+            fill(waitlist, restaurant_list, size, rng)
+            fill_seconds = time.perf_counter() - started
+
+            events = make_events(restaurant_list, EVENTS, rng)
+            served = 0
+            started = time.perf_counter()
+            for event in events:
+                served += len(waitlist.table_freed(*event))
+            per_event = (time.perf_counter() - started) / EVENTS
+
+            started = time.perf_counter()
+            for event in events[:SCAN_EVENTS]:
+                scan_match(waitlist, *event)
+            scan_per_event = (time.perf_counter() - started) / SCAN_EVENTS
+            print(f"{size:10,}{fill_seconds:9.1f}{per_event * 1e6:10.0f}{served / EVENTS:14.1f}{per_event * EVENTS / max(served, 1) * 1e6:11.0f}"
+                  f"{waitlist.stats['buckets_checked'] / EVENTS:15.1f}{scan_per_event * 1e6:15.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from statistics import median
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from restaurant_functions import build_catalog, load_restaurants, load_users, search_restaurants
+from storage import CSVBackend, get_booking_store, set_backend
+from synthetic_data import CUISINES, write_dataset
+
+# (restaurants, users, bookings) per scale
+SCALES = {
+    'small': (50, 1000, 10000),
+    'medium': (500, 10000, 100000),
+    'large': (2000, 50000, 500000),
+}
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+# A p50 or p95 this many times the baseline's is reported as a regression,
+# unless it is less than MIN_CHANGE_MS slower, which is within timer noise
+# for calls taking a few microseconds
+TOLERANCE = 1.5
+MIN_CHANGE_MS = 0.05
+# Each entry point is timed this many times on fresh arguments, and the median
+# of every statistic is kept, so one noisy run doesn't decide the result
+REPEATS = 5
+
+
+#Latency percentile (nearest rank) of sorted seconds, in milliseconds
+def percentile(latencies, fraction):
+    index = min(len(latencies) - 1, max(0, round(fraction * len(latencies)) - 1))
+    return latencies[index] * 1000
+
+#Call `operation` on every argument tuple, one timing per call
+def measure(operation, calls):
+    latencies = []
+    clock = time.perf_counter
+    started = clock()
+    for args in calls:
+        before = clock()
+        operation(*args)
+        latencies.append(clock() - before)
+    total = clock() - started
+    latencies.sort()
+    return {
+        'ops': len(latencies),
+        'ops_per_s': round(len(latencies) / total, 1) if total else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50), 4),
+        'p95_ms': round(percentile(latencies, 0.95), 4),
+        'p99_ms': round(percentile(latencies, 0.99), 4),
+        'max_ms': round(latencies[-1] * 1000, 4),
+    }
+
+#Time `operation` once per list of calls and keep the median of each statistic
+def measure_repeats(operation, call_lists):
+    runs = [measure(operation, calls) for calls in call_lists]
+    return {key: runs[0][key] if key == 'ops' else round(median(run[key] for run in runs), 4) for key in runs[0]}
+
+
+#Arguments for each entry point, drawn from the generated data with a fixed seed
+def availability_calls(restaurants, store, ops, rng):
+    dates = sorted({row['date'] for row in store.rows[:5000]})
+    calls = []
+    for restaurant in rng.sample(list(restaurants.values()) * (ops // len(restaurants) + 1), ops):
+        slot = rng.choice(restaurant.get_time_slots()[:-3] or restaurant.get_time_slots())
+        calls.append((restaurant, rng.choice(dates), slot, rng.choice([2, 2, 4, 6])))
+    return calls
+
+def search_calls(restaurants, ops, rng):
+    names = [restaurant.name for restaurant in restaurants.values()]
+    terms = []
+    for _ in range(ops):
+        kind = rng.random()
+        if kind < 0.5:
+            word = rng.choice(rng.choice(names).split())
+            terms.append(word[:rng.randint(2, len(word))])
+        elif kind < 0.8:
+            terms.append(rng.choice(CUISINES).lower())
+        else:
+            terms.append(rng.choice(names))
+    return terms
+
+def history_calls(users, ops, rng):
+    users = list(users.values())
+    return [(rng.choice(users),) for _ in range(ops)]
+
+#`repeats` lists of cancellations, no booking in more than one of them
+def cancel_calls(users, store, ops, rng, repeats):
+    active = [row for row in store.rows if row['status'] == 'active']
+    ops = min(ops, len(active) // repeats)
+    chosen = rng.sample(active, ops * repeats)
+    return [[(users[row['user_id']], row['booking_id']) for row in chosen[i * ops:(i + 1) * ops]] for i in range(repeats)]
+
+
+def run_scale(name, ops, seed, repeats=REPEATS):
+    restaurant_count, user_count, booking_count = SCALES[name]
+    rng = random.Random(seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        paths = write_dataset(tmp, restaurant_count, user_count, booking_count, seed)
+        print(f"[{name}] {restaurant_count} restaurants, {user_count} users, {booking_count} bookings generated in {time.perf_counter() - started:.1f}s")
+        set_backend(CSVBackend(paths['restaurants'], paths['users'], paths['bookings']))
+
+        started = time.perf_counter()
+        restaurants = load_restaurants()
+        users = load_users()
+        store = get_booking_store()
+        results['load'] = {'ops': 1, 'seconds': round(time.perf_counter() - started, 3)}
+        catalog = build_catalog(restaurants)
+
+        runs = range(repeats)
+        results['get_available_tables'] = measure_repeats(lambda restaurant, *args: restaurant.get_available_tables(*args),
+                                                          [availability_calls(restaurants, store, ops, rng) for _ in runs])
+        results['search_restaurants'] = measure_repeats(lambda term: search_restaurants(catalog, term),
+                                                        [[(term,) for term in search_calls(restaurants, ops, rng)] for _ in runs])
+        results['search_restaurants (scan)'] = measure_repeats(lambda term: search_restaurants(restaurants, term),
+                                                               [[(term,) for term in search_calls(restaurants, ops, rng)] for _ in runs])
+        results['view_booking_history'] = measure_repeats(lambda user: user.view_booking_history(),
+                                                          [history_calls(users, ops, rng) for _ in runs])
+        # Last, because it changes the data
+        results['cancel_reservation'] = measure_repeats(lambda user, booking_id: user.cancel_reservation(booking_id),
+                                                        cancel_calls(users, store, ops, rng, repeats))
+        # Cancellations can start a background compaction, let it finish before the files go
+        store.wait_for_compaction()
+        set_backend(None)
+    return results
+
+
+def print_results(scale, results, baseline):
+    print(f"{'':28}{'ops/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}  vs baseline")
+    regressions = []
+    for operation, stats in results.items():
+        if 'seconds' in stats:
+            print(f"{operation:28}{'':12}{stats['seconds'] * 1000:10.1f}")
+            continue
+        before = baseline.get(operation)
+        note = ''
+        if before:
+            ratios = {key: stats[key] / before[key] for key in ('p50_ms', 'p95_ms') if before[key]}
+            note = '  ' + ' '.join(f"{key[:3]} x{ratio:.2f}" for key, ratio in ratios.items())
+            if any(ratio > TOLERANCE and stats[key] - before[key] > MIN_CHANGE_MS for key, ratio in ratios.items()):
+                note += '  REGRESSION'
+                regressions.append(f"{scale}/{operation}")
+        print(f"{operation:28}{stats['ops_per_s']:12,.0f}{stats['p50_ms']:10.3f}{stats['p95_ms']:10.3f}{stats['p99_ms']:10.3f}{stats['max_ms']:10.3f}{note}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the booking engine entry points on synthetic data")
+    parser.add_argument('--scales', default='small,medium', help=f"comma separated, from {', '.join(SCALES)}")
+    parser.add_argument('--ops', type=int, default=500, help="calls timed per entry point and repeat")
+    parser.add_argument('--repeats', type=int, default=REPEATS, help="timed runs per entry point, the median is reported")
+    parser.add_argument('--seed', type=int, default=18)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the new baseline")
+    parser.add_argument('--check', action='store_true', help="exit with status 1 on a regression")
+    args = parser.parse_args()
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baselines = json.load(file)
+
+    regressions = []
+    measured = {}
+    for scale in args.scales.split(','):
+        measured[scale] = run_scale(scale, args.ops, args.seed, args.repeats)
+        regressions += print_results(scale, measured[scale], baselines.get('scales', {}).get(scale, {}))
+
+    if args.save_baseline:
+        baselines.setdefault('scales', {}).update(measured)
+        baselines['machine'] = f"{platform.python_implementation()} {platform.python_version()}, {platform.machine()}"
+        baselines['ops'] = args.ops
+        baselines['repeats'] = args.repeats
+        baselines['seed'] = args.seed
+        with open(args.baseline, 'w') as file:
+            json.dump(baselines, file, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    if regressions:
+        print(f"Slower than baseline (over x{TOLERANCE} and {MIN_CHANGE_MS} ms): {', '.join(regressions)}")
+        if args.check:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import csv
+import os
+import random
+import sys
+from datetime import date, timedelta
+from itertools import accumulate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from booking_record import BOOKING_FIELDS
+
+RESTAURANT_FIELDS = ['restaurant_id', 'name', 'cuisine_type', 'rating', 'location', 'total_tables', 'table_configuration', 'opening_hours', 'closing_hours', 'dining_duration']
+USER_FIELDS = ['user_id', 'name', 'email', 'phone_number']
+
+CUISINES = ['Italian', 'Indian', 'Japanese', 'French', 'Chinese', 'Mexican', 'Thai', 'Greek', 'Korean', 'Lebanese', 'American', 'Spanish']
+AREAS = ['Downtown', 'Midtown', 'Uptown', 'Suburb', 'Riverside', 'Old Town', 'Harbourside', 'University', 'Market Square']
+NAME_WORDS = ['Grand', 'Kitchen', 'Spice', 'Garden', 'Sushi', 'Express', 'Bistro', 'Dragon', 'Palace', 'Golden',
+              'House', 'Table', 'Corner', 'Olive', 'Lotus', 'Harbour', 'Smoke', 'Fire', 'Bamboo', 'Saffron']
+SYLLABLES = ['ka', 'lo', 'mi', 'ra', 'tu', 'vel', 'an', 'zo', 'ri', 'no', 'sa', 'be', 'dor', 'fin', 'gal', 'has']
+FIRST_NAMES = ['John', 'Emma', 'Michael', 'Sarah', 'David', 'Aisha', 'Wei', 'Priya', 'Carlos', 'Yuki', 'Olga', 'Tom', 'Fatima', 'Liam', 'Mia']
+LAST_NAMES = ['Smith', 'Wilson', 'Brown', 'Davis', 'Chen', 'Patel', 'Garcia', 'Kim', 'Nguyen', 'Muller', 'Rossi', 'Okafor', 'Silva']
+
+# (table configuration, total tables) of small, medium and large restaurants
+TABLE_LAYOUTS = [("2:4,4:3", 7), ("2:3,4:4,6:3", 10), ("2:2,4:3,6:3", 8), ("2:6,4:8,6:4,8:2", 20), ("2:8,4:12,6:6,8:2,10:2", 30)]
+LAYOUT_WEIGHTS = [2, 4, 3, 2, 1]
+# (opening, closing, dining duration)
+OPENING_HOURS = [("10:00", "22:00", 90), ("11:00", "23:00", 90), ("12:00", "22:00", 120), ("17:00", "23:00", 120), ("08:00", "16:00", 60)]
+OPENING_WEIGHTS = [4, 4, 2, 2, 1]
+
+# Relative demand per hour of the day, lunch and dinner peaks
+HOUR_WEIGHTS = {8: 1, 9: 1, 10: 1, 11: 3, 12: 8, 13: 7, 14: 3, 15: 1, 16: 1, 17: 3, 18: 7, 19: 10, 20: 9, 21: 4, 22: 1}
+# Monday first, busier towards the weekend
+WEEKDAY_WEIGHTS = [5, 5, 6, 7, 10, 11, 8]
+PARTY_SIZES = [1, 2, 3, 4, 5, 6, 7, 8, 10]
+PARTY_WEIGHTS = [4, 40, 10, 25, 5, 8, 2, 4, 2]
+
+# Slots of this many minutes are used to keep generated bookings from overlapping
+GRID_MINUTES = 15
+
+FIRST_DAY = date(2025, 1, 1)
+DAYS = 365
+TODAY = date(2025, 9, 1)
+
+
+def _word(rng):
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).title()
+
+#Restaurant rows as restaurants.csv holds them, with a long tail of made-up name words
+def make_restaurants(count, rng):
+    rows = []
+    for i in range(count):
+        name = ' '.join(rng.sample(NAME_WORDS, 2) if rng.random() < 0.6 else [rng.choice(NAME_WORDS), _word(rng)])
+        configuration, total_tables = rng.choices(TABLE_LAYOUTS, LAYOUT_WEIGHTS)[0]
+        opening, closing, duration = rng.choices(OPENING_HOURS, OPENING_WEIGHTS)[0]
+        rows.append({
+            'restaurant_id': f"R{i + 1:05d}",
+            'name': name,
+            'cuisine_type': rng.choice(CUISINES),
+            'rating': round(min(5.0, max(1.0, rng.gauss(4.0, 0.5))), 1),
+            'location': f"{rng.randint(1, 999)} {_word(rng)} St, {rng.choice(AREAS)}",
+            'total_tables': total_tables,
+            'table_configuration': configuration,
+            'opening_hours': opening,
+            'closing_hours': closing,
+            'dining_duration': duration,
+        })
+    return rows
+
+def make_users(count, rng):
+    rows = []
+    for i in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        rows.append({
+            'user_id': f"U{i + 1:06d}",
+            'name': f"{first} {last}",
+            'email': f"{first.lower()}.{last.lower()}{i + 1}@example.com",
+            'phone_number': f"555-{i % 10000:04d}",
+        })
+    return rows
+
+
+def _minutes(time_str):
+    hours, minutes = time_str.split(':')
+    return int(hours) * 60 + int(minutes)
+
+#Tables of a restaurant as (table_id, size), smallest first
+def _tables(configuration):
+    tables = []
+    for pair in configuration.split(','):
+        size, count = (int(value) for value in pair.split(':'))
+        tables += [(f"T{size}_{i + 1}", size) for i in range(count)]
+    return sorted(tables, key=lambda table: table[1])
+
+#Bookable start times (minutes) with their demand weight, the last one a stay before closing
+def _start_times(restaurant):
+    opening = _minutes(restaurant['opening_hours'])
+    last = _minutes(restaurant['closing_hours']) - restaurant['dining_duration']
+    starts = list(range(opening, last + 1, 30))
+    return starts, [HOUR_WEIGHTS.get(start // 60, 1) for start in starts]
+
+#Booking rows that never double book a table. Popular restaurants, evenings,
+#weekends and parties of two get most of the demand; bookings before TODAY are
+#mostly completed, some cancelled or no-shows. Requests that find no free table
+#are retried elsewhere, so fewer than `count` rows come back only when the
+#restaurants are close to full.
+def make_bookings(count, restaurants, user_count, rng, first_day=FIRST_DAY, days=DAYS):
+    # Zipf-like popularity, a few restaurants take a large share of the bookings
+    popularity = list(accumulate(1 / (rank + 1) ** 0.8 for rank in range(len(restaurants))))
+    layouts = [(_tables(restaurant['table_configuration']),) + _start_times(restaurant) for restaurant in restaurants]
+    day_weights = list(accumulate(WEEKDAY_WEIGHTS[(first_day + timedelta(days=offset)).weekday()] for offset in range(days)))
+    indexes, day_numbers = range(len(restaurants)), range(days)
+    # (restaurant index, day, table_id) -> bitset of taken GRID_MINUTES slots
+    taken = {}
+
+    rows = []
+    attempts = 0
+    while len(rows) < count and attempts < count * 3:
+        attempts += 1
+        index = rng.choices(indexes, cum_weights=popularity)[0]
+        restaurant = restaurants[index]
+        tables, starts, start_weights = layouts[index]
+        if not starts:
+            continue
+        day = rng.choices(day_numbers, cum_weights=day_weights)[0]
+        start = rng.choices(starts, start_weights)[0]
+        party_size = rng.choices(PARTY_SIZES, PARTY_WEIGHTS)[0]
+        booking_day = first_day + timedelta(days=day)
+        if booking_day < TODAY:
+            status = rng.choices(['completed', 'cancelled', 'no_show'], [86, 10, 4])[0]
+        else:
+            status = rng.choices(['active', 'cancelled'], [92, 8])[0]
+
+        first = start // GRID_MINUTES
+        span = ((1 << -(-restaurant['dining_duration'] // GRID_MINUTES)) - 1) << first
+        table_id = None
+        for candidate, size in tables:
+            if size < party_size:
+                continue
+            key = (index, day, candidate)
+            if status == 'cancelled' or not taken.get(key, 0) & span:
+                table_id = candidate
+                break
+        if table_id is None:
+            continue
+        if status != 'cancelled':
+            taken[(index, day, table_id)] = taken.get((index, day, table_id), 0) | span
+
+        rows.append({
+            'booking_id': f"B{len(rows) + 1:08d}",
+            'user_id': f"U{rng.randint(1, user_count):06d}",
+            'restaurant_id': restaurant['restaurant_id'],
+            'date': booking_day.isoformat(),
+            'time': f"{start // 60:02d}:{start % 60:02d}",
+            'table_id': table_id,
+            'party_size': party_size,
+            'status': status,
+            'duration': restaurant['dining_duration'],
+        })
+    return rows
+
+
+def _write_csv(path, fields, rows):
+    with open(path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+#Write restaurants.csv, users.csv and bookings.csv into `directory`. The same
+#sizes and seed always give the same files. Returns their paths.
+def write_dataset(directory, restaurants=100, users=2000, bookings=20000, seed=0):
+    rng = random.Random(seed)
+    restaurant_rows = make_restaurants(restaurants, rng)
+    paths = {name: os.path.join(directory, f"{name}.csv") for name in ('restaurants', 'users', 'bookings')}
+    _write_csv(paths['restaurants'], RESTAURANT_FIELDS, restaurant_rows)
+    _write_csv(paths['users'], USER_FIELDS, make_users(users, rng))
+    _write_csv(paths['bookings'], BOOKING_FIELDS, make_bookings(bookings, restaurant_rows, users, rng))
+    return paths
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python benchmarks/synthetic_data.py DIRECTORY [RESTAURANTS USERS BOOKINGS [SEED]]")
+        sys.exit(2)
+    sizes = [int(value) for value in sys.argv[2:6]]
+    os.makedirs(sys.argv[1], exist_ok=True)
+    paths = write_dataset(sys.argv[1], *sizes)
+    for name, path in paths.items():
+        print(f"{path}: {os.path.getsize(path) / 1e6:.1f} MB")
@@ -0,0 +1,212 @@
+import numpy as np
+from availability import minutes_to_time
+from booking_record import BookingTable, pack_date
+from booking_store import DEFAULT_DURATION
+from storage import get_booking_store
+from table_allocation import split_table_id
+
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+# Statuses of bookings where the party turned up, or is expected to
+SEATED = ('active', 'completed')
+
+#YYYYMMDD ints -> numpy datetime64[D]
+def _to_days(dates):
+    years = (dates // 10000 - 1970).astype('datetime64[Y]')
+    months = years.astype('datetime64[M]') + (dates // 100 % 100 - 1)
+    return months.astype('datetime64[D]') + (dates % 100 - 1)
+
+#Unique keys with the sum of `weights` for each, as (keys, sums)
+def _group_sum(keys, weights=None):
+    unique, inverse = np.unique(keys, return_inverse=True)
+    return unique, np.bincount(inverse, weights=weights, minlength=len(unique))
+
+
+#Operational reports over the booking history, computed on NumPy columns.
+#refresh() only packs bookings appended since the last call and re-reads the
+#statuses of the bookings the store logged as changed, so it can be called
+#before every report.
+#Every report takes an optional inclusive date range ('YYYY-MM-DD').
+class BookingAnalytics:
+    def __init__(self, restaurants, store=None):
+        self.restaurants = restaurants
+        self.store = store or get_booking_store()
+        self.table = BookingTable()
+        self._rows = None
+        # How much of the store's status_log is already applied
+        self._status_seen = 0
+        self._columns = None
+        self.refresh()
+
+    #Bring the columns up to date with the store, returns the number of bookings added
+    def refresh(self):
+        rows = getattr(self.store, 'rows', None)
+        if rows is None:
+            # Stores without an in-memory copy (SQLite) are read again in full
+            self.table = BookingTable.from_bookings(self.store.iter_bookings())
+            self._columns = None
+            return len(self.table)
+
+        status_log = self.store.status_log
+        if rows is not self._rows:
+            # First refresh, or the store reloaded its file. Rows are packed
+            # with their current status, so earlier changes are already in.
+            self.table = BookingTable()
+            self._rows = rows
+            self._status_seen = len(status_log)
+        known = len(self.table)
+        count = len(rows)
+        # Slices, islice would step through the rows already packed
+        for booking in rows[known:count]:
+            self.table.append(booking)
+        logged = len(status_log)
+        if logged != self._status_seen:
+            changed = [position for position in status_log[self._status_seen:logged] if position < count]
+            self._status_seen = logged
+            self.table.update_statuses(rows, changed)
+            self._columns = None
+        if count != known:
+            self._columns = None
+        return count - known
+
+    #NumPy columns plus derived ones, rebuilt only after the table changed
+    def _get_columns(self):
+        if self._columns is not None:
+            return self._columns
+        table = self.table
+        columns = table.to_numpy()
+        restaurants = [self.restaurants.get(restaurant_id) for restaurant_id in table.restaurant_ids]
+        # Blank durations mean the restaurant's default dining duration
+        defaults = np.array([r.default_duration if r is not None else DEFAULT_DURATION for r in restaurants] or [0], dtype=np.int64)
+        duration = columns['duration'].astype(np.int64)
+        blank = duration == 0
+        duration[blank] = defaults[columns['restaurant'][blank]]
+        columns['duration'] = duration
+        columns['total_tables'] = np.array([r.total_tables if r is not None else 0 for r in restaurants] or [0], dtype=np.int64)
+        # Joined tables like 'T4_1+T4_2' hold more than one table
+        columns['tables_held'] = np.array([len(split_table_id(table_id)) for table_id in table.table_ids] or [0], dtype=np.int64)[columns['table']]
+        self._columns = columns
+        return columns
+
+    #Row mask for a date range and statuses, rows with dates that didn't parse are left out
+    def _select(self, columns, start_date=None, end_date=None, statuses=None):
+        dates = columns['date']
+        mask = dates > 0
+        if start_date:
+            mask &= dates >= pack_date(start_date)
+        if end_date:
+            mask &= dates <= pack_date(end_date)
+        if statuses is not None:
+            codes = [code for code, status in enumerate(self.table.statuses) if status in statuses]
+            mask &= np.isin(columns['status'], codes)
+        return mask
+
+    def _date_str(self, date_key):
+        date_key = int(date_key)
+        return f"{date_key // 10000:04d}-{date_key // 100 % 100:02d}-{date_key % 100:02d}"
+
+    #Seated guests per restaurant per day, {restaurant_id: {date: covers}}
+    def covers_per_day(self, start_date=None, end_date=None):
+        columns = self._get_columns()
+        mask = self._select(columns, start_date, end_date, SEATED)
+        keys = columns['restaurant'][mask].astype(np.int64) * 100000000 + columns['date'][mask]
+        unique, covers = _group_sum(keys, columns['party_size'][mask])
+
+        report = {}
+        for key, total in zip(unique.tolist(), covers.tolist()):
+            restaurant_id = self.table.restaurant_ids[key // 100000000]
+            report.setdefault(restaurant_id, {})[self._date_str(key % 100000000)] = int(total)
+        return report
+
+    #Share of total_tables held in each half hour of the day, per restaurant.
+    #`profile` is the mean over the days the restaurant had bookings, `peak_slot`
+    #the busiest slot by that mean, `max_utilisation` the busiest single day at that slot.
+    def peak_slot_utilisation(self, start_date=None, end_date=None):
+        columns = self._get_columns()
+        mask = self._select(columns, start_date, end_date, SEATED)
+        restaurant = columns['restaurant'][mask].astype(np.int64)
+        dates = columns['date'][mask].astype(np.int64)
+        first = columns['start'][mask].astype(np.int64) // SLOT_MINUTES
+        spans = np.maximum(1, -(-columns['duration'][mask] // SLOT_MINUTES))
+        held = columns['tables_held'][mask]
+
+        # One entry per (booking, slot it covers)
+        rows = np.repeat(np.arange(len(first)), spans)
+        offsets = np.arange(len(rows)) - np.repeat(np.cumsum(spans) - spans, spans)
+        slots = first[rows] + offsets
+        inside = slots < SLOTS_PER_DAY
+        rows, slots = rows[inside], slots[inside]
+
+        day_keys = restaurant[rows] * 100000000 + dates[rows]
+        unique, busy = _group_sum(day_keys * SLOTS_PER_DAY + slots, held[rows])
+        slot_restaurant = unique // SLOTS_PER_DAY // 100000000
+        utilisation = busy / np.maximum(columns['total_tables'][slot_restaurant], 1)
+
+        # Days with at least one booking per restaurant, for the mean
+        days, _ = _group_sum(restaurant * 100000000 + dates)
+        day_counts = np.bincount(days // 100000000, minlength=len(self.table.restaurant_ids))
+        profile_keys = slot_restaurant * SLOTS_PER_DAY + unique % SLOTS_PER_DAY
+        size = len(self.table.restaurant_ids) * SLOTS_PER_DAY
+        totals = np.bincount(profile_keys, weights=utilisation, minlength=size).reshape(-1, SLOTS_PER_DAY)
+        peaks = np.zeros(size)
+        np.maximum.at(peaks, profile_keys, utilisation)
+        peaks = peaks.reshape(-1, SLOTS_PER_DAY)
+
+        report = {}
+        for code, restaurant_id in enumerate(self.table.restaurant_ids):
+            if day_counts[code] == 0 or columns['total_tables'][code] == 0:
+                continue
+            profile = totals[code] / day_counts[code]
+            peak = int(profile.argmax())
+            report[restaurant_id] = {
+                'peak_slot': minutes_to_time(peak * SLOT_MINUTES),
+                'utilisation': float(profile[peak]),
+                'max_utilisation': float(peaks[code, peak]),
+                'days': int(day_counts[code]),
+                'profile': {minutes_to_time(slot * SLOT_MINUTES): float(profile[slot]) for slot in np.flatnonzero(profile).tolist()},
+            }
+        return report
+
+    #Share of bookings cancelled per restaurant
+    def cancellation_rates(self, start_date=None, end_date=None):
+        columns = self._get_columns()
+        mask = self._select(columns, start_date, end_date)
+        restaurant = columns['restaurant'][mask]
+        cancelled = self._select(columns, statuses=('cancelled',))[mask]
+        size = len(self.table.restaurant_ids)
+        totals = np.bincount(restaurant, minlength=size)
+        cancellations = np.bincount(restaurant[cancelled], minlength=size)
+
+        return {restaurant_id: {'bookings': int(totals[code]), 'cancelled': int(cancellations[code]), 'rate': float(cancellations[code] / totals[code])}
+                for code, restaurant_id in enumerate(self.table.restaurant_ids) if totals[code]}
+
+    #Restaurant, weekday and hour combinations with the highest no-show rate among
+    #bookings that weren't cancelled, ignoring ones with fewer than `min_bookings`
+    def no_show_hot_spots(self, start_date=None, end_date=None, top=10, min_bookings=20):
+        columns = self._get_columns()
+        mask = self._select(columns, start_date, end_date, SEATED + ('no_show',))
+        no_show = self._select(columns, statuses=('no_show',))[mask]
+        weekday = (_to_days(columns['date'][mask].astype(np.int64)).astype(np.int64) + 3) % 7
+        hour = columns['start'][mask].astype(np.int64) // 60
+        keys = (columns['restaurant'][mask].astype(np.int64) * 7 + weekday) * 24 + hour
+        unique, totals = _group_sum(keys)
+        _, no_shows = _group_sum(keys, no_show.astype(np.float64))
+
+        eligible = np.flatnonzero(totals >= min_bookings)
+        rates = no_shows[eligible] / totals[eligible]
+        # Highest rate first, more no-shows first on ties
+        order = eligible[np.lexsort((-no_shows[eligible], -rates))][:top]
+        spots = []
+        for index in order.tolist():
+            key = int(unique[index])
+            spots.append({
+                'restaurant_id': self.table.restaurant_ids[key // 24 // 7],
+                'weekday': WEEKDAYS[key // 24 % 7],
+                'hour': f"{key % 24:02d}:00",
+                'bookings': int(totals[index]),
+                'no_shows': int(no_shows[index]),
+                'rate': float(no_shows[index] / totals[index]),
+            })
+        return spots
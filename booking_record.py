@@ -0,0 +1,304 @@
+import sys
+from array import array
+from enum import IntEnum
+
+BOOKING_FIELDS = ['booking_id', 'user_id', 'restaurant_id', 'date', 'time', 'table_id', 'party_size', 'status', 'duration']
+
+
+class BookingStatus(IntEnum):
+    ACTIVE = 0
+    CANCELLED = 1
+    COMPLETED = 2
+    NO_SHOW = 3
+
+    #Name as written in bookings.csv, e.g. 'no_show'
+    @property
+    def label(self):
+        return self.name.lower()
+
+
+STATUS_BY_LABEL = {status.label: status for status in BookingStatus}
+
+# Dates and times repeat across bookings, so conversions are memoized, which
+# also makes every booking on a day share one int and one string. The caches
+# stop growing at CACHE_LIMIT entries. Dates and times have caches of their own,
+# a string is never looked up as the other kind.
+CACHE_LIMIT = 1 << 16
+_packed_dates = {}
+_packed_times = {}
+_unpacked_dates = {}
+_unpacked_times = {}
+
+def _remember(cache, key, value):
+    if len(cache) < CACHE_LIMIT:
+        cache[key] = value
+    return value
+
+#'2024-12-28' -> 20241228, the string itself if it isn't a date in that form
+def pack_date(date_str):
+    packed = _packed_dates.get(date_str)
+    if packed is not None:
+        return packed
+    if len(date_str) == 10 and date_str[4] == '-' and date_str[7] == '-' and date_str.isascii():
+        year, month, day = date_str[:4], date_str[5:7], date_str[8:]
+        if year.isdigit() and month.isdigit() and day.isdigit():
+            return _remember(_packed_dates, date_str, int(year) * 10000 + int(month) * 100 + int(day))
+    return date_str
+
+def unpack_date(date_key):
+    if isinstance(date_key, str):
+        return date_key
+    unpacked = _unpacked_dates.get(date_key)
+    if unpacked is None:
+        unpacked = _remember(_unpacked_dates, date_key, f"{date_key // 10000:04d}-{date_key // 100 % 100:02d}-{date_key % 100:02d}")
+    return unpacked
+
+#'19:30' -> 1170 minutes since midnight, the string itself if it isn't a time of
+#day as HH:MM, so '24:00' or '19:75' are kept as written
+def pack_time(time_str):
+    packed = _packed_times.get(time_str)
+    if packed is not None:
+        return packed
+    if len(time_str) == 5 and time_str[2] == ':' and time_str.isascii() and time_str[:2].isdigit() and time_str[3:].isdigit():
+        hours, minutes = int(time_str[:2]), int(time_str[3:])
+        if hours < 24 and minutes < 60:
+            return _remember(_packed_times, time_str, hours * 60 + minutes)
+    return time_str
+
+def unpack_time(start):
+    if isinstance(start, str):
+        return start
+    unpacked = _unpacked_times.get(start)
+    if unpacked is None:
+        unpacked = _remember(_unpacked_times, start, f"{start // 60:02d}:{start % 60:02d}")
+    return unpacked
+
+#Whole number without leading zeros -> int, '' -> None, anything else kept as the string
+def _pack_number(value):
+    if value == '':
+        return None
+    if value.isdigit() and (value[0] != '0' or value == '0'):
+        return int(value)
+    return value
+
+def _unpack_number(value):
+    return '' if value is None else str(value)
+
+def _pack_status(status):
+    packed = STATUS_BY_LABEL.get(status)
+    return packed if packed is not None else sys.intern(status)
+
+def _unpack_status(status):
+    return status.label if isinstance(status, BookingStatus) else status
+
+
+#One booking in a fraction of the memory of a csv.DictReader row.
+#IDs are interned so every booking of a user or restaurant shares one string,
+#the date is packed as YYYYMMDD, the time as minutes since midnight and the
+#status as a BookingStatus. Values that don't parse are kept as the original
+#string so every row writes back out exactly as it was read.
+#booking['date'] and the other BOOKING_FIELDS items give the CSV strings, so a
+#Booking reads like the dict rows it replaces and dict(booking) gives one.
+class Booking:
+    __slots__ = ('booking_id', 'user_id', 'restaurant_id', 'date_key', 'start', 'table_id', 'party_size', 'status', 'duration', 'extra')
+
+    def __init__(self, booking_id, user_id, restaurant_id, date_key, start, table_id, party_size, status, duration=None, extra=None):
+        self.booking_id = booking_id
+        self.user_id = user_id
+        self.restaurant_id = restaurant_id
+        self.date_key = date_key
+        self.start = start
+        self.table_id = table_id
+        self.party_size = party_size
+        self.status = status
+        self.duration = duration
+        # Overflow columns of a malformed CSV line
+        self.extra = extra
+
+    #Build from a row of strings as csv.DictReader gives them
+    @classmethod
+    def from_row(cls, row):
+        get = row.get
+        intern = sys.intern
+        return cls(
+            get('booking_id') or '',
+            intern(get('user_id') or ''),
+            intern(get('restaurant_id') or ''),
+            pack_date(get('date') or ''),
+            pack_time(get('time') or ''),
+            intern(get('table_id') or ''),
+            _pack_number(get('party_size') or ''),
+            _pack_status(get('status') or ''),
+            _pack_number(get('duration') or ''),
+            get(None),
+        )
+
+    #Build records from csv.reader rows laid out as `header`, skipping blank
+    #lines and keeping overflow values like csv.DictReader does. Columns that
+    #aren't BOOKING_FIELDS go in `extra` in header order, ahead of any overflow;
+    #BOOKING_FIELDS the header lacks read as blank.
+    @classmethod
+    def from_csv_rows(cls, rows, header):
+        width = len(header)
+        # Column of each BOOKING_FIELDS entry, None for columns the file doesn't have
+        positions = None if header == BOOKING_FIELDS else [header.index(field) if field in header else None for field in BOOKING_FIELDS]
+        other_positions = [i for i, field in enumerate(header) if field not in BOOKING_FIELDS]
+        padding = [''] * width
+        intern = sys.intern
+        bookings = []
+        for values in rows:
+            if not values:
+                continue
+            extra = values[width:]
+            if len(values) < width:
+                values = values + padding[len(values):]
+            if positions is not None:
+                extra = [values[i] for i in other_positions] + extra
+                values = [values[i] if i is not None else '' for i in positions]
+            extra = extra or None
+            booking_id, user_id, restaurant_id, date, time, table_id, party_size, status, duration = values[:9]
+            bookings.append(cls(booking_id, intern(user_id), intern(restaurant_id), pack_date(date), pack_time(time),
+                                intern(table_id), _pack_number(party_size), _pack_status(status), _pack_number(duration), extra))
+        return bookings
+
+    @property
+    def is_active(self):
+        return self.status is BookingStatus.ACTIVE
+
+    def __getitem__(self, field):
+        try:
+            getter = _GETTERS[field]
+        except KeyError:
+            raise KeyError(field) from None
+        return getter(self)
+
+    def __setitem__(self, field, value):
+        try:
+            setter = _SETTERS[field]
+        except KeyError:
+            raise KeyError(field) from None
+        setter(self, value)
+
+    def get(self, field, default=None):
+        if field is None:
+            return self.extra if self.extra is not None else default
+        getter = _GETTERS.get(field)
+        return getter(self) if getter is not None else default
+
+    def keys(self):
+        return BOOKING_FIELDS
+
+    def __iter__(self):
+        return iter(BOOKING_FIELDS)
+
+    def __len__(self):
+        return len(BOOKING_FIELDS)
+
+    #Field values in BOOKING_FIELDS order, as written to the CSV file
+    def values(self):
+        return [getter(self) for getter in _ORDERED_GETTERS]
+
+    def __repr__(self):
+        return f"Booking({dict(self)!r})"
+
+
+_GETTERS = {
+    'booking_id': lambda booking: booking.booking_id,
+    'user_id': lambda booking: booking.user_id,
+    'restaurant_id': lambda booking: booking.restaurant_id,
+    'date': lambda booking: unpack_date(booking.date_key),
+    'time': lambda booking: unpack_time(booking.start),
+    'table_id': lambda booking: booking.table_id,
+    'party_size': lambda booking: _unpack_number(booking.party_size),
+    'status': lambda booking: _unpack_status(booking.status),
+    'duration': lambda booking: _unpack_number(booking.duration),
+}
+_ORDERED_GETTERS = [_GETTERS[field] for field in BOOKING_FIELDS]
+
+_SETTERS = {
+    'booking_id': lambda booking, value: setattr(booking, 'booking_id', value),
+    'user_id': lambda booking, value: setattr(booking, 'user_id', sys.intern(value)),
+    'restaurant_id': lambda booking, value: setattr(booking, 'restaurant_id', sys.intern(value)),
+    'date': lambda booking, value: setattr(booking, 'date_key', pack_date(value)),
+    'time': lambda booking, value: setattr(booking, 'start', pack_time(value)),
+    'table_id': lambda booking, value: setattr(booking, 'table_id', sys.intern(value)),
+    'party_size': lambda booking, value: setattr(booking, 'party_size', _pack_number(value)),
+    'status': lambda booking, value: setattr(booking, 'status', _pack_status(value)),
+    'duration': lambda booking, value: setattr(booking, 'duration', _pack_number(value)),
+}
+
+
+#Bookings as parallel typed arrays, one entry per booking, for analytics scans.
+#IDs and statuses are stored as small integer codes into the `*_ids` and
+#`statuses` lists. Rows whose date, time or numbers didn't parse get 0.
+#to_numpy() gives the same columns as NumPy arrays when NumPy is installed.
+class BookingTable:
+    COLUMNS = ['restaurant', 'user', 'table', 'date', 'start', 'party_size', 'status', 'duration']
+
+    def __init__(self):
+        self.booking_ids = []
+        self.restaurant_ids = []
+        self.user_ids = []
+        self.table_ids = []
+        self.statuses = []
+        self._codes = {'restaurant': {}, 'user': {}, 'table': {}, 'status': {}}
+        self.restaurant = array('I')
+        self.user = array('I')
+        self.table = array('I')
+        self.date = array('I')
+        self.start = array('H')
+        self.party_size = array('I')
+        self.status = array('B')
+        self.duration = array('I')
+
+    @classmethod
+    def from_bookings(cls, bookings, default_duration=0):
+        table = cls()
+        for booking in bookings:
+            table.append(booking, default_duration)
+        return table
+
+    def _code(self, column, names, value):
+        codes = self._codes[column]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(names)
+            names.append(value)
+        return code
+
+    #Add a Booking (or a dict row, which is packed first)
+    def append(self, booking, default_duration=0):
+        if not isinstance(booking, Booking):
+            booking = Booking.from_row(booking)
+        self.booking_ids.append(booking.booking_id)
+        self.restaurant.append(self._code('restaurant', self.restaurant_ids, booking.restaurant_id))
+        self.user.append(self._code('user', self.user_ids, booking.user_id))
+        self.table.append(self._code('table', self.table_ids, booking.table_id))
+        self.status.append(self._code('status', self.statuses, _unpack_status(booking.status)))
+        self.date.append(booking.date_key if isinstance(booking.date_key, int) else 0)
+        self.start.append(booking.start if isinstance(booking.start, int) else 0)
+        self.party_size.append(booking.party_size if isinstance(booking.party_size, int) else 0)
+        duration = booking.duration if booking.duration is not None else default_duration
+        self.duration.append(duration if isinstance(duration, int) else 0)
+
+    def __len__(self):
+        return len(self.booking_ids)
+
+    #Re-read the status of the bookings at some positions, `bookings` holding every
+    #booking in the order they were appended
+    def update_statuses(self, bookings, positions):
+        code = self._code
+        statuses = self.statuses
+        status = self.status
+        for position in positions:
+            status[position] = code('status', statuses, _unpack_status(bookings[position].status))
+
+    #Bytes held by the column arrays, not counting the ID lists
+    def nbytes(self):
+        return sum(getattr(self, column).itemsize * len(self) for column in self.COLUMNS)
+
+    #Copy of the columns as NumPy arrays, raises ImportError without NumPy.
+    #A copy, because an array exporting its buffer can't be appended to.
+    def to_numpy(self):
+        import numpy
+        return {column: numpy.frombuffer(getattr(self, column), dtype=getattr(self, column).typecode).copy() for column in self.COLUMNS}
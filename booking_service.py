@@ -0,0 +1,132 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from booking_store import BookingConflictError
+from restaurant_functions import build_catalog, filter_restaurants, load_restaurants, load_users, search_restaurants
+from storage import get_booking_store
+
+# Times book() picks another table when the one it picked was taken meanwhile
+ALLOCATION_RETRIES = 3
+
+
+#Restaurant as the service returns it
+def restaurant_info(restaurant):
+    info = restaurant.display_restaurant_info()
+    info['tables'] = dict(info['tables'])
+    return info
+
+
+#Headless booking API for many concurrent clients, one coroutine per request.
+#Every request passes the user and restaurant it is about, so no request
+#shares state with another the way the GUI's current_user and table_mapping do.
+#Store reads and writes run on a thread pool so the event loop never blocks on
+#file or database I/O. Concurrent availability requests for the same
+#restaurant and day share one read of that day's bookings.
+#Bad input raises ValueError; a table taken meanwhile raises BookingConflictError.
+class BookingService:
+    def __init__(self, restaurants=None, users=None, workers=8):
+        self.restaurants = restaurants if restaurants is not None else load_restaurants()
+        self.users = users if users is not None else load_users()
+        self.catalog = build_catalog(self.restaurants)
+        self.store = get_booking_store()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='booking-service')
+        # (restaurant_id, date) -> future of the day's bookings being read
+        self._day_reads = {}
+        self.stats = {'availability_requests': 0, 'day_reads': 0}
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    def _restaurant(self, restaurant_id):
+        restaurant = self.restaurants.get(restaurant_id)
+        if restaurant is None:
+            raise ValueError(f"Unknown restaurant {restaurant_id}")
+        return restaurant
+
+    def _user(self, user_id):
+        user = self.users.get(user_id)
+        if user is None:
+            raise ValueError(f"Unknown user {user_id}")
+        return user
+
+    #The day's (table_id, start, duration) bookings, joining a read already in flight
+    async def _day_bookings(self, restaurant_id, date):
+        key = (restaurant_id, date)
+        read = self._day_reads.get(key)
+        if read is None:
+            self.stats['day_reads'] += 1
+            read = asyncio.ensure_future(self._run(self.store.day_bookings, restaurant_id, date))
+            self._day_reads[key] = read
+            read.add_done_callback(lambda done: self._day_reads.pop(key, None) if self._day_reads.get(key) is done else None)
+        # shield, so one cancelled request doesn't cancel the read for the others
+        return await asyncio.shield(read)
+
+    #Restaurants matching a search term (ranked) and filters, as info dicts
+    async def search(self, term='', cuisine_type=None, min_rating=None, limit=None):
+        if term:
+            results = search_restaurants(self.catalog, term)
+            if cuisine_type or min_rating is not None:
+                allowed = {r.restaurant_id for r in filter_restaurants(self.catalog, cuisine_type, min_rating)}
+                results = [r for r in results if r.restaurant_id in allowed]
+        else:
+            results = list(filter_restaurants(self.catalog, cuisine_type, min_rating))
+        return [restaurant_info(r) for r in results[:limit]]
+
+    #Bookable slots of a day for a party, plus the free tables at `time` when given
+    async def availability(self, restaurant_id, date, party_size, time=None):
+        restaurant = self._restaurant(restaurant_id)
+        self.stats['availability_requests'] += 1
+        bookings = await self._day_bookings(restaurant_id, date)
+        party_size = int(party_size)
+        # Every table, so slots where only joined tables seat the party are offered too
+        matrix = restaurant.availability_matrix(date, 1, bookings=bookings)
+        result = {'restaurant_id': restaurant_id, 'date': date, 'party_size': party_size, 'slots': matrix.seatable_slots(party_size)}
+        if time is not None:
+            if not restaurant.check_valid_booking_time(time):
+                raise ValueError(f"{time} is outside opening hours {restaurant.opening_hours}-{restaurant.closing_hours}")
+            result['time'] = time
+            if time in matrix.slots:
+                result['tables'] = [table for table in matrix.free_tables(time) if table['size'] >= party_size]
+            else:
+                result['tables'] = await self._run(restaurant.get_available_tables, date, time, party_size)
+        return result
+
+    #Book a table, the best fitting free one when table_id isn't given. Returns the booking ID.
+    async def book(self, user_id, restaurant_id, date, time, party_size, table_id=None):
+        user = self._user(user_id)
+        restaurant = self._restaurant(restaurant_id)
+        party_size = int(party_size)
+        if not restaurant.check_valid_booking_time(time):
+            raise ValueError(f"{time} is outside opening hours {restaurant.opening_hours}-{restaurant.closing_hours}")
+        attempts = 1 if table_id is not None else ALLOCATION_RETRIES
+        for attempt in range(attempts):
+            chosen = table_id
+            if chosen is None:
+                chosen = await self._run(restaurant.allocate_table, date, time, party_size)
+                if chosen is None:
+                    raise ValueError(f"No table for {party_size} at {restaurant_id} on {date} {time}")
+            try:
+                booking_id = await self._run(user.make_reservation, restaurant_id, date, time, chosen, party_size, restaurant.default_duration)
+            except BookingConflictError:
+                if attempt == attempts - 1:
+                    raise
+                continue
+            # Requests from now on must see the new booking
+            self._day_reads.pop((restaurant_id, date), None)
+            return booking_id
+
+    #Cancel one of the user's bookings, False if it isn't theirs or isn't active
+    async def cancel(self, user_id, booking_id):
+        user = self._user(user_id)
+        booking = await self._run(self.store.get_booking, booking_id)
+        cancelled = await self._run(user.cancel_reservation, booking_id)
+        if cancelled and booking is not None:
+            self._day_reads.pop((booking['restaurant_id'], booking['date']), None)
+        return cancelled
+
+    #A page of the user's bookings as dicts, newest first by default
+    async def history(self, user_id, active_only=False, start_date=None, end_date=None, newest_first=True, offset=0, limit=50):
+        user = self._user(user_id)
+        return await self._run(lambda: [dict(booking) for booking in user.booking_history(active_only, start_date, end_date, newest_first, offset, limit)])
+
+    def close(self):
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,689 @@
+import csv
+import io
+import os
+import threading
+import metrics
+from bisect import bisect_left, insort
+from contextlib import contextmanager
+from itertools import islice
+from booking_record import BOOKING_FIELDS, Booking, pack_date
+from table_allocation import split_table_id
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+JOURNAL_FIELDS = ['booking_id', 'user_id', 'status']
+
+# Minutes a party holds a table when a booking doesn't say otherwise
+DEFAULT_DURATION = 90
+
+#Convert 'HH:MM' to minutes since midnight
+def time_to_minutes(time_str):
+    hours, minutes = time_str.split(':')
+    return int(hours) * 60 + int(minutes)
+
+#Dining duration of a booking row, `default` (the restaurant's) when it is blank,
+#as it is for bookings made before durations existed
+def booking_duration(row, default=DEFAULT_DURATION):
+    duration = row.get('duration')
+    return int(duration) if duration else default
+
+#Packed key of a 'YYYY-MM-DD' date used as a history bound, ValueError for any
+#other form, which wouldn't compare with the stored dates
+def date_bound(date_str):
+    date_key = pack_date(date_str)
+    if isinstance(date_key, str):
+        raise ValueError(f"Invalid date {date_str}")
+    return date_key
+
+#Journal file that sits next to a bookings file, e.g. bookings_journal.csv
+def journal_path_for(path):
+    root, ext = os.path.splitext(path)
+    return f"{root}_journal{ext or '.csv'}"
+
+
+#Raised when a table is already booked for the requested slot
+class BookingConflictError(Exception):
+    def __init__(self, restaurant_id, date, time, table_id):
+        super().__init__(f"Table {table_id} at {restaurant_id} is already booked for {date} {time}")
+        self.restaurant_id = restaurant_id
+        self.date = date
+        self.time = time
+        self.table_id = table_id
+
+    # Rebuild from the fields, so the error survives pickling between processes
+    def __reduce__(self):
+        return type(self), (self.restaurant_id, self.date, self.time, self.table_id)
+
+
+#Exclusive lock on a file shared by every process using the same bookings file
+class FileLock:
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._depth = 0
+
+    def __enter__(self):
+        if self._depth == 0:
+            self._file = open(self.path, 'a+')
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self._depth -= 1
+        if self._depth == 0:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            self._file.close()
+            self._file = None
+
+
+#Sorted booking intervals of one table on one day.
+#Writers replace the entries list instead of changing it in place, so readers
+#that don't hold the store lock always see one consistent list.
+class TableSchedule:
+    __slots__ = ('entries', 'longest')
+
+    def __init__(self):
+        # Sorted (start, duration, booking_id)
+        self.entries = []
+        self.longest = 0
+
+    def add(self, start, duration, booking_id):
+        entries = list(self.entries)
+        insort(entries, (start, duration, booking_id))
+        self.longest = max(self.longest, duration)
+        self.entries = entries
+
+    def remove(self, start, booking_id):
+        entries = self.entries
+        index = bisect_left(entries, (start,))
+        while index < len(entries) and entries[index][0] == start:
+            if entries[index][2] == booking_id:
+                self.entries = entries[:index] + entries[index + 1:]
+                return True
+            index += 1
+        return False
+
+    #Check if any booking overlaps [start, end)
+    def overlaps(self, start, end):
+        entries = self.entries
+        # Only bookings starting before `end` and no more than the longest
+        # duration before `start` can overlap, so walk back from the bisect point
+        index = bisect_left(entries, (end,)) - 1
+        earliest = start - self.longest
+        while index >= 0:
+            entry_start, duration, _ = entries[index]
+            if entry_start <= earliest:
+                break
+            if entry_start + duration > start:
+                return True
+            index -= 1
+        return False
+
+    def __len__(self):
+        return len(self.entries)
+
+
+#In-memory copy of bookings.csv, loaded once and kept in sync by every write.
+#Status changes are appended to a journal instead of rewriting the bookings
+#file; compact() folds the journal back into a fresh bookings file.
+#Writes hold a lock file, and first pick up whatever other processes appended
+#since the last write, so several processes can share one bookings file.
+class BookingStore:
+    def __init__(self, path='bookings.csv', compact_threshold=1000, default_durations=None):
+        self.path = path
+        # restaurant_id -> minutes a booking there lasts when it doesn't say
+        self.default_durations = default_durations or {}
+        self.journal_path = journal_path_for(path)
+        self.compact_threshold = compact_threshold
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(path + '.lock')
+        self._compact_lock = threading.Lock()
+        self._pending_journal = None
+        self._reloads = 0
+        self.release_listeners = []
+        with self._locked():
+            self._load()
+
+    #Call listener(booking dict) whenever a status change made through this store
+    #frees an active booking's table. Listeners run after the store's locks are released.
+    def add_release_listener(self, listener):
+        self.release_listeners.append(listener)
+
+    def _reset(self):
+        self.rows = []
+        self.bookings = {}
+        # (restaurant_id, date) -> {table_id: TableSchedule} of active bookings
+        self.day_index = {}
+        # user_id -> sorted (packed date, start minute, position in rows) of every booking they made
+        self.by_user = {}
+        self.journal_size = 0
+        # Bumped on every status change, so readers can tell their copy is stale
+        self.status_changes = 0
+        # Position in rows of the booking of every status change, in the order they
+        # were made. Readers keep how far they read to pick up only the new ones.
+        self.status_log = []
+        # path -> (inode, size) of the part of the file already applied
+        self._seen = {}
+        # Header of the bookings file, None until one is read
+        self._header = None
+        # Columns rows are written with: BOOKING_FIELDS, then any other columns the file has
+        self.fields = list(BOOKING_FIELDS)
+
+    #Read the bookings file and replay the journal on top of it. The files are
+    #only read, a file from an older version is upgraded by upgrade().
+    def _load(self):
+        self._reset()
+        for booking in self._read_new_bookings():
+            self._add_row(booking)
+        for record in self._read_new(self.journal_path, JOURNAL_FIELDS):
+            self._apply_journal_record(record)
+
+    #Check if the bookings file lacks some BOOKING_FIELDS column or has them in another order
+    def needs_upgrade(self):
+        return self._header is not None and self._header != self.fields
+
+    #Rewrite a bookings file from an older version with every BOOKING_FIELDS
+    #column, keeping the other columns it has, and fold the journal into it.
+    #Writes call this first, since new rows need the file's columns to match.
+    #Returns False if the file was already up to date.
+    def upgrade(self):
+        with self._compact_lock, self._locked():
+            self._refresh()
+            if not self.needs_upgrade():
+                return False
+            _write_rows_atomic(self.path, self.fields, [_row_values(row) for row in self.rows])
+            _write_rows_atomic(self.journal_path, JOURNAL_FIELDS, [])
+            self.journal_size = 0
+            self._header = list(self.fields)
+            self._mark_seen(self.path, self.journal_path)
+        return True
+
+    #Upgrade the file before writing to it, see upgrade()
+    def _prepare_write(self):
+        if self.needs_upgrade():
+            self.upgrade()
+
+    #Apply rows other processes wrote since we last looked at the files
+    def _refresh(self):
+        for path in (self.path, self.journal_path):
+            state = _file_state(path)
+            seen = self._seen.get(path)
+            if state == seen:
+                continue
+            # A replaced or shrunk file means another process compacted it
+            if seen is not None and (state is None or state[0] != seen[0] or state[1] < seen[1]):
+                self._reloads += 1
+                self._load()
+                return
+
+        for booking in self._read_new_bookings():
+            self._add_row(booking)
+        for record in self._read_new(self.journal_path, JOURNAL_FIELDS):
+            self._apply_journal_record(record)
+
+    #Read the part of a file after the last position we read.
+    #Returns (offset read from, text), text is None if the file doesn't exist.
+    def _read_tail(self, path):
+        seen = self._seen.get(path)
+        offset = seen[1] if seen is not None else 0
+        try:
+            with open(path, 'rb') as file:
+                stat = os.fstat(file.fileno())
+                state = (stat.st_ino, stat.st_size)
+                file.seek(offset)
+                data = file.read(state[1] - offset)
+        except FileNotFoundError:
+            return offset, None
+        self._seen[path] = state
+        metrics.add('bytes_read', len(data))
+        return offset, data.decode('utf-8')
+
+    #Parse the part of a CSV file after the last position we read
+    def _read_new(self, path, fieldnames):
+        offset, text = self._read_tail(path)
+        if text is None:
+            return []
+        # The header is only present when reading from the start of the file
+        rows = list(csv.DictReader(io.StringIO(text, newline=''), fieldnames=None if offset == 0 else fieldnames))
+        metrics.add('rows_scanned', len(rows))
+        return rows
+
+    #Parse new lines of the bookings file straight into Booking records
+    def _read_new_bookings(self):
+        offset, text = self._read_tail(self.path)
+        if text is None:
+            return []
+        reader = csv.reader(io.StringIO(text, newline=''))
+        if offset == 0:
+            self._header = next(reader, None)
+            if self._header is not None:
+                self.fields = BOOKING_FIELDS + [field for field in self._header if field not in BOOKING_FIELDS]
+        bookings = Booking.from_csv_rows(reader, self._header or BOOKING_FIELDS)
+        metrics.add('rows_scanned', len(bookings))
+        return bookings
+
+    def _mark_seen(self, *paths):
+        for path in paths:
+            self._seen[path] = _file_state(path)
+
+    #Store a row as a compact Booking record and index it
+    def _add_row(self, row):
+        booking = row if isinstance(row, Booking) else Booking.from_row(row)
+        insort(self.by_user.setdefault(booking.user_id, []), _history_key(booking, len(self.rows)))
+        self.rows.append(booking)
+        self.bookings[booking.booking_id] = booking
+        if booking.is_active:
+            self._hold_table(booking)
+
+    def _apply_journal_record(self, record):
+        self._apply_status(record['booking_id'], record['user_id'], record['status'])
+        self.journal_size += 1
+        if self._pending_journal is not None:
+            self._pending_journal.append([record[field] for field in JOURNAL_FIELDS])
+
+    def _apply_status(self, booking_id, user_id, status):
+        row = self.bookings.get(booking_id)
+        if row is None or row['user_id'] != user_id or row['status'] == status:
+            return False
+        if row['status'] == 'active':
+            self._release_table(row)
+        elif status == 'active':
+            self._hold_table(row)
+        row['status'] = status
+        self.status_changes += 1
+        self.status_log.append(self._position(row))
+        return True
+
+    #Position of a booking in rows, found through its user's sorted history entries
+    def _position(self, booking):
+        entries = self.by_user[booking.user_id]
+        rows = self.rows
+        index = bisect_left(entries, _history_key(booking, 0))
+        while rows[entries[index][2]] is not booking:
+            index += 1
+        return entries[index][2]
+
+    #Minutes a booking at a restaurant lasts when it doesn't say, the restaurant's dining_duration
+    def default_duration(self, restaurant_id):
+        return self.default_durations.get(restaurant_id, DEFAULT_DURATION)
+
+    #Index a booking under every table it uses, joined tables have IDs like 'T4_1+T4_2'
+    def _hold_table(self, booking):
+        try:
+            start, duration = _stay(booking, self.default_duration(booking.restaurant_id))
+        except ValueError:
+            return
+        tables = self.day_index.setdefault((booking.restaurant_id, booking['date']), {})
+        for table_id in split_table_id(booking.table_id):
+            schedule = tables.get(table_id)
+            if schedule is None:
+                schedule = tables[table_id] = TableSchedule()
+            schedule.add(start, duration, booking.booking_id)
+
+    def _release_table(self, booking):
+        key = (booking.restaurant_id, booking['date'])
+        tables = self.day_index.get(key)
+        if tables is None:
+            return
+        try:
+            start, _ = _stay(booking, self.default_duration(booking.restaurant_id))
+        except ValueError:
+            return
+        for table_id in split_table_id(booking.table_id):
+            if table_id not in tables:
+                continue
+            tables[table_id].remove(start, booking.booking_id)
+            if not tables[table_id]:
+                del tables[table_id]
+        if not tables:
+            del self.day_index[key]
+
+    def _busy_tables(self, restaurant_id, date, start, end):
+        tables = self.day_index.get((restaurant_id, date), {})
+        metrics.add('rows_scanned', len(tables))
+        return {table_id for table_id, schedule in list(tables.items()) if schedule.overlaps(start, end)}
+
+    #Hold the in-process and the cross-process write lock
+    @contextmanager
+    def _locked(self):
+        with self._lock, self._file_lock:
+            yield
+
+    #Get the tables held at any point of a `duration` minute stay starting at `time`,
+    #by default as long as the restaurant's usual stay
+    def get_booked_tables(self, restaurant_id, date, time, duration=None):
+        start = time_to_minutes(time)
+        return self._busy_tables(restaurant_id, date, start, start + (duration or self.default_duration(restaurant_id)))
+
+    #Get (table_id, start, duration) of every active booking at a restaurant on a day
+    def day_bookings(self, restaurant_id, date):
+        tables = self.day_index.get((restaurant_id, date), {})
+        return [(table_id, start, duration) for table_id, schedule in list(tables.items()) for start, duration, _ in schedule.entries]
+
+    #Append a new booking to the file and index it, without a conflict check
+    def add_booking(self, booking_data):
+        row = {field: str(booking_data.get(field, '')) for field in BOOKING_FIELDS}
+        self._prepare_write()
+        with self._locked():
+            self._refresh()
+            self._write_row(row)
+        return row
+
+    #Check the table is free for the whole stay and book it as one atomic step.
+    #A booking without a duration gets the restaurant's default one.
+    #Raises BookingConflictError if the table is taken at any point of it.
+    def reserve(self, booking_data):
+        booking_data = dict(booking_data)
+        if not booking_data.get('duration'):
+            booking_data['duration'] = self.default_duration(booking_data['restaurant_id'])
+        row = {field: str(booking_data[field]) for field in BOOKING_FIELDS}
+        start = time_to_minutes(row['time'])
+        end = start + booking_duration(row)
+        day = (row['restaurant_id'], row['date'])
+        self._prepare_write()
+
+        # Cheap rejection without the write lock, the schedules are safe to read
+        # unlocked. Only trusted while nobody has journalled a cancellation we
+        # haven't seen yet.
+        if (self._table_busy(day, row['table_id'], start, end) and
+            _file_state(self.journal_path) == self._seen.get(self.journal_path)):
+            raise BookingConflictError(*day, row['time'], row['table_id'])
+
+        with self._locked():
+            # Another process may have taken the table since we last looked
+            self._refresh()
+            if self._table_busy(day, row['table_id'], start, end):
+                raise BookingConflictError(*day, row['time'], row['table_id'])
+            self._write_row(row)
+        return row
+
+    def _table_busy(self, day, table_id, start, end):
+        return _schedules_busy(self.day_index.get(day, {}), table_id, start, end)
+
+    #Book a batch of rows holding the write lock once and appending them in one write.
+    #Active rows are checked against existing bookings and the earlier rows of the
+    #batch, rows without a duration get the restaurant's default one.
+    #Returns (accepted rows, [(row, reason)] for the rejected ones).
+    def reserve_many(self, rows):
+        accepted = []
+        rejected = []
+        self._prepare_write()
+        with self._locked():
+            self._refresh()
+            batch_ids = set()
+            # (restaurant_id, date) -> {table_id: TableSchedule} of the accepted rows
+            batch_index = {}
+            for booking_data in rows:
+                row = {field: str(booking_data.get(field, '')) for field in BOOKING_FIELDS}
+                row['duration'] = row['duration'] or str(self.default_duration(row['restaurant_id']))
+                booking_id = row['booking_id']
+                if booking_id in self.bookings or booking_id in batch_ids:
+                    rejected.append((row, f"Duplicate booking ID {booking_id}"))
+                    continue
+                if row['status'] == 'active':
+                    try:
+                        start = time_to_minutes(row['time'])
+                        end = start + booking_duration(row)
+                    except ValueError:
+                        rejected.append((row, f"Invalid time or duration for {booking_id}"))
+                        continue
+                    day = (row['restaurant_id'], row['date'])
+                    tables = batch_index.setdefault(day, {})
+                    if self._table_busy(day, row['table_id'], start, end) or _schedules_busy(tables, row['table_id'], start, end):
+                        rejected.append((row, str(BookingConflictError(*day, row['time'], row['table_id']))))
+                        continue
+                    for table_id in split_table_id(row['table_id']):
+                        tables.setdefault(table_id, TableSchedule()).add(start, end - start, booking_id)
+                batch_ids.add(booking_id)
+                accepted.append(row)
+
+            if accepted:
+                _append_rows(self.path, self.fields, [self._new_row_values(row) for row in accepted])
+                for row in accepted:
+                    self._add_row(row)
+                self._mark_seen(self.path)
+        return accepted, rejected
+
+    #Values of a new row in the file's column order, other columns left blank
+    def _new_row_values(self, row):
+        return [row[field] for field in BOOKING_FIELDS] + [''] * (len(self.fields) - len(BOOKING_FIELDS))
+
+    def _write_row(self, row):
+        _append_rows(self.path, self.fields, [self._new_row_values(row)])
+        self._add_row(row)
+        self._mark_seen(self.path)
+
+    #Mark a user's active booking as cancelled, returns False if nothing changed
+    def cancel_booking(self, booking_id, user_id):
+        return self.set_status(booking_id, user_id, 'cancelled', expected='active')
+
+    #Record a status change in the journal, the bookings file is left untouched
+    def set_status(self, booking_id, user_id, status, expected=None):
+        with self._locked():
+            self._refresh()
+            row = self.bookings.get(booking_id)
+            if row is None or row['user_id'] != user_id:
+                return False
+            if expected is not None and row['status'] != expected:
+                return False
+            released = row['status'] == 'active' and status != 'active'
+            if not self._apply_status(booking_id, user_id, status):
+                return False
+            freed = dict(row) if released and self.release_listeners else None
+
+            record = [booking_id, user_id, status]
+            _append_rows(self.journal_path, JOURNAL_FIELDS, [record])
+            self._mark_seen(self.journal_path)
+            self.journal_size += 1
+            if self._pending_journal is not None:
+                self._pending_journal.append(record)
+
+        if self.compact_threshold and self.journal_size >= self.compact_threshold:
+            self.compact_in_background()
+        if freed is not None:
+            for listener in self.release_listeners:
+                listener(freed)
+        return True
+
+    #Fold the journal into a new bookings file, swapped in with an atomic rename.
+    #The locks are only held to note how many rows there are and for the final
+    #swap; the rows are written out without them. A status changed meanwhile may
+    #already show in the new file, it is also in the new journal, and replaying
+    #it on top is a no-op.
+    def compact(self):
+        if not self._compact_lock.acquire(blocking=False):
+            return False
+        try:
+            with self._locked():
+                self._refresh()
+                rows = self.rows
+                count = len(rows)
+                fields = list(self.fields)
+                self._pending_journal = []
+                reloads = self._reloads
+
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(fields)
+                writer.writerows(_row_values(row) for row in islice(rows, count))
+
+            with self._locked():
+                self._refresh()
+                if self._reloads != reloads:
+                    # Someone else compacted meanwhile, our snapshot is stale
+                    self._pending_journal = None
+                    os.remove(tmp_path)
+                    return False
+
+                # Rows booked while the snapshot was being written
+                with open(tmp_path, 'a', newline='') as file:
+                    csv.writer(file).writerows(_row_values(row) for row in self.rows[count:])
+                    file.flush()
+                    os.fsync(file.fileno())
+                os.replace(tmp_path, self.path)
+                self._header = fields
+
+                # Status changes made after the snapshot still need the journal
+                pending = self._pending_journal
+                self._pending_journal = None
+                _write_rows_atomic(self.journal_path, JOURNAL_FIELDS, pending)
+                self.journal_size = len(pending)
+                self._mark_seen(self.path, self.journal_path)
+            return True
+        finally:
+            self._compact_lock.release()
+
+    #Run compact() on a daemon thread so the caller doesn't wait for it
+    def compact_in_background(self):
+        if self._compact_lock.locked():
+            return None
+        thread = threading.Thread(target=self.compact, daemon=True)
+        thread.start()
+        return thread
+
+    #Wait for a compaction running on another thread to finish
+    def wait_for_compaction(self):
+        with self._compact_lock:
+            pass
+
+    #Retrieve booking details by booking ID
+    def get_booking(self, booking_id):
+        row = self.bookings.get(booking_id)
+        return dict(row) if row is not None else None
+
+    #Iterate bookings in file order, optionally only some restaurants and an inclusive date range
+    def iter_bookings(self, restaurant_ids=None, start_date=None, end_date=None):
+        with self._lock:
+            rows = self.rows
+            count = len(rows)
+        restaurant_ids = set(restaurant_ids) if restaurant_ids is not None else None
+        for row in islice(rows, count):
+            if restaurant_ids is not None and row['restaurant_id'] not in restaurant_ids:
+                continue
+            if (start_date and row['date'] < start_date) or (end_date and row['date'] > end_date):
+                continue
+            yield dict(row)
+
+    #Get all bookings made by a user, in file order
+    def user_bookings(self, user_id):
+        with self._lock:
+            positions = sorted(position for _, _, position in self.by_user.get(user_id, ()))
+            return [dict(self.rows[position]) for position in positions]
+
+    #Lazily iterate a user's bookings ordered by date and time, newest first unless
+    #newest_first is False. Dates ('YYYY-MM-DD', ValueError otherwise) are inclusive;
+    #offset and limit select a page. Only the user's own bookings in the date range are looked at.
+    def user_history(self, user_id, active_only=False, start_date=None, end_date=None, newest_first=True, offset=0, limit=None):
+        with self._lock:
+            # Copy the range so writes made while the caller iterates don't shift it
+            entries = self._user_entries(user_id, start_date, end_date)
+            rows = self.rows
+        if newest_first:
+            entries.reverse()
+        stop = None if limit is None else offset + limit
+        if not active_only:
+            # Every entry is a row of the result, so the page is a slice
+            return _history_rows(rows, entries[offset:stop], False)
+        return islice(_history_rows(rows, entries, True), offset, stop)
+
+    #Number of bookings user_history gives for the same user, filter and dates
+    def user_history_count(self, user_id, active_only=False, start_date=None, end_date=None):
+        with self._lock:
+            entries = self._user_entries(user_id, start_date, end_date)
+            if not active_only:
+                return len(entries)
+            rows = self.rows
+            return sum(1 for _, _, position in entries if rows[position].is_active)
+
+    #Copy of a user's history entries within an inclusive date range
+    def _user_entries(self, user_id, start_date, end_date):
+        entries = self.by_user.get(user_id, [])
+        lo = bisect_left(entries, (date_bound(start_date),)) if start_date else 0
+        hi = bisect_left(entries, (date_bound(end_date) + 1,)) if end_date else len(entries)
+        return entries[lo:hi]
+
+
+#Check if any of the tables making up table_id has a booking overlapping [start, end)
+def _schedules_busy(tables, table_id, start, end):
+    for part in split_table_id(table_id):
+        schedule = tables.get(part)
+        if schedule is not None and schedule.overlaps(start, end):
+            return True
+    return False
+
+#(start minute, duration) of a booking, `default` minutes if it has no duration.
+#Raises ValueError if they don't parse, Booking keeps values that aren't in the
+#usual form as strings.
+def _stay(booking, default=DEFAULT_DURATION):
+    start = booking.start if isinstance(booking.start, int) else time_to_minutes(booking.start)
+    duration = booking.duration
+    if duration is None:
+        duration = default
+    elif not isinstance(duration, int):
+        duration = int(duration)
+    return start, duration
+
+#Sort key of a booking in a user's history. Dates or times that didn't parse sort first.
+def _history_key(booking, position):
+    date_key = booking.date_key if isinstance(booking.date_key, int) else 0
+    start = booking.start if isinstance(booking.start, int) else 0
+    return (date_key, start, position)
+
+def _history_rows(rows, entries, active_only):
+    for _, _, position in entries:
+        booking = rows[position]
+        if active_only and not booking.is_active:
+            continue
+        yield dict(booking)
+
+
+def _file_state(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_size)
+
+def _row_values(booking):
+    # Keep the file's other columns, and overflow values of malformed rows, as they were
+    return booking.values() + (booking.extra or [])
+
+#Append rows to a CSV file, writing the header if the file is new
+def _append_rows(path, fieldnames, rows):
+    with open(path, 'a+', newline='') as file:
+        file.seek(0, os.SEEK_END)
+        size = file.tell()
+        writer = csv.writer(file)
+        if size == 0:
+            writer.writerow(fieldnames)
+        else:
+            # Don't glue the new row onto a last line without a newline
+            file.seek(size - 1)
+            if file.read(1) not in ('\n', '\r'):
+                file.write('\n')
+        writer.writerows(rows)
+
+#Replace a CSV file through a temporary file and rename
+def _write_rows_atomic(path, fieldnames, rows):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(fieldnames)
+        writer.writerows(rows)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
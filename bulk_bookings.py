@@ -0,0 +1,183 @@
+import csv
+import time
+from datetime import datetime
+from itertools import islice
+from booking_record import STATUS_BY_LABEL
+from booking_store import BOOKING_FIELDS
+from storage import get_booking_store
+from table_allocation import split_table_id
+
+# Rows validated and written per batch, bounds the memory an import needs
+CHUNK_SIZE = 5000
+
+REQUIRED_FIELDS = ['booking_id', 'user_id', 'restaurant_id', 'date', 'time', 'table_id', 'party_size']
+DATE_FORMAT = '%Y-%m-%d'
+TIME_FORMAT = '%H:%M'
+
+
+#Outcome of a bulk import. Only the first `max_errors` rejected rows are kept,
+#`rejected` counts all of them.
+class ImportReport:
+    def __init__(self, max_errors=1000):
+        self.max_errors = max_errors
+        self.rows_read = 0
+        self.imported = 0
+        self.rejected = 0
+        # (line number, booking_id, reason)
+        self.errors = []
+        self.seconds = 0.0
+
+    def reject(self, line, booking_id, reason):
+        self.rejected += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line, booking_id, reason))
+
+    @property
+    def rows_per_second(self):
+        return self.rows_read / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return f"{self.rows_read} rows read, {self.imported} imported, {self.rejected} rejected in {self.seconds:.2f}s ({self.rows_per_second:,.0f} rows/s)"
+
+
+#Stream booking rows from a CSV file, one dict at a time
+def read_booking_rows(path):
+    with open(path, newline='') as file:
+        yield from csv.DictReader(file)
+
+#Check a date is written YYYY-MM-DD like every stored booking, other spellings
+#of a valid date such as 20261101 or 2026-11-1 don't count
+def valid_date(value):
+    try:
+        return datetime.strptime(value, DATE_FORMAT).strftime(DATE_FORMAT) == value
+    except ValueError:
+        return False
+
+#Check a time is written HH:MM like every stored booking, so 9:30 or 09:5
+#aren't stored as they are
+def valid_time(value):
+    try:
+        return datetime.strptime(value, TIME_FORMAT).strftime(TIME_FORMAT) == value
+    except ValueError:
+        return False
+
+#Split an iterable into lists of at most `size` items
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+#Validates booking rows against the restaurants they are for: opening hours,
+#table IDs from the table configuration and party size. Slot conflicts are
+#checked by the booking store when the batch is written.
+class BookingValidator:
+    def __init__(self, restaurants):
+        self.restaurants = restaurants
+        # restaurant_id -> {table_id: size}
+        self._tables = {}
+        self._times = {}
+
+    def _table_sizes(self, restaurant):
+        sizes = self._tables.get(restaurant.restaurant_id)
+        if sizes is None:
+            sizes = self._tables[restaurant.restaurant_id] = dict(restaurant._suitable_tables(1))
+        return sizes
+
+    #Why a booking time is rejected, None if it isn't. Checked once per
+    #distinct (restaurant, time).
+    def _time_error(self, restaurant, time_str):
+        key = (restaurant.restaurant_id, time_str)
+        if key not in self._times:
+            if not valid_time(time_str):
+                self._times[key] = f"Invalid time {time_str}"
+            elif not restaurant.check_valid_booking_time(time_str):
+                self._times[key] = f"{time_str} is outside opening hours {restaurant.opening_hours}-{restaurant.closing_hours}"
+            else:
+                self._times[key] = None
+        return self._times[key]
+
+    #Fill in defaults and return the row ready to store, or raise ValueError with the reason
+    def clean(self, row):
+        missing = [field for field in REQUIRED_FIELDS if not row.get(field)]
+        if missing:
+            raise ValueError(f"Missing {', '.join(missing)}")
+        restaurant = self.restaurants.get(row['restaurant_id'])
+        if restaurant is None:
+            raise ValueError(f"Unknown restaurant {row['restaurant_id']}")
+        if not valid_date(row['date']):
+            raise ValueError(f"Invalid date {row['date']}")
+        time_error = self._time_error(restaurant, row['time'])
+        if time_error:
+            raise ValueError(time_error)
+
+        sizes = self._table_sizes(restaurant)
+        seats = 0
+        for table_id in split_table_id(row['table_id']):
+            if table_id not in sizes:
+                raise ValueError(f"Unknown table {table_id} at {restaurant.restaurant_id}")
+            seats += sizes[table_id]
+        try:
+            party_size = int(row['party_size'])
+        except ValueError:
+            raise ValueError(f"Invalid party size {row['party_size']}")
+        if not 0 < party_size <= seats:
+            raise ValueError(f"Party of {party_size} doesn't fit table {row['table_id']} ({seats} seats)")
+
+        cleaned = {field: (row.get(field) or '').strip() for field in BOOKING_FIELDS}
+        cleaned['status'] = cleaned['status'] or 'active'
+        if cleaned['status'] not in STATUS_BY_LABEL:
+            raise ValueError(f"Unknown status {cleaned['status']}")
+        cleaned['duration'] = cleaned['duration'] or str(restaurant.default_duration)
+        return cleaned
+
+
+#Import bookings from a CSV path or an iterable of row dicts, `chunk_size` rows at a time.
+#Each chunk is validated, then written by the booking store in one batch that also
+#rejects slot conflicts. Returns an ImportReport.
+def import_bookings(source, restaurants, store=None, chunk_size=CHUNK_SIZE, max_errors=1000):
+    store = store or get_booking_store()
+    rows = read_booking_rows(source) if isinstance(source, str) else source
+    validator = BookingValidator(restaurants)
+    report = ImportReport(max_errors)
+    started = time.perf_counter()
+
+    # Line 1 of a CSV file is the header
+    line = 1
+    for chunk in chunked(rows, chunk_size):
+        valid = []
+        lines = {}
+        for row in chunk:
+            line += 1
+            report.rows_read += 1
+            try:
+                cleaned = validator.clean(row)
+            except ValueError as exc:
+                report.reject(line, row.get('booking_id'), str(exc))
+                continue
+            lines[cleaned['booking_id']] = line
+            valid.append(cleaned)
+
+        accepted, rejected = store.reserve_many(valid)
+        report.imported += len(accepted)
+        for row, reason in rejected:
+            report.reject(lines.get(row['booking_id']), row['booking_id'], reason)
+
+    report.seconds = time.perf_counter() - started
+    return report
+
+#Stream bookings to a CSV file, optionally only some restaurants and an inclusive
+#date range ('YYYY-MM-DD'). Returns the number of rows written.
+def export_bookings(path, restaurant_ids=None, start_date=None, end_date=None, store=None):
+    store = store or get_booking_store()
+    count = 0
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(BOOKING_FIELDS)
+        for chunk in chunked(store.iter_bookings(restaurant_ids, start_date, end_date), CHUNK_SIZE):
+            writer.writerows([row.get(field, '') for field in BOOKING_FIELDS] for row in chunk)
+            count += len(chunk)
+    return count
@@ -0,0 +1,88 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from metrics import timed
+
+#Runs slow reads and writes on worker threads so the Tk window keeps responding.
+#Tk widgets may only be touched from the main thread, so finished jobs go on a
+#queue that the main loop drains every `poll_ms` with root.after, and the
+#on_done / on_error callbacks run there.
+#Jobs are submitted under a key. Submitting again under the same key makes the
+#earlier job stale: it is cancelled if it hasn't started yet, otherwise its
+#result is dropped when it comes back.
+#Each job is measured as the metric 'task.<key>'.
+class BackgroundTasks:
+    def __init__(self, root, workers=2, poll_ms=30):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='gui-task')
+        self._results = queue.Queue()
+        # key -> generation of the newest job, older generations are stale
+        self._generations = {}
+        self._futures = {}
+        self._timers = {}
+        self._poll_id = root.after(poll_ms, self._poll)
+
+    #Run func(*args) on a worker, then on_done(result) or on_error(exception) on the Tk thread
+    def submit(self, key, func, *args, on_done=None, on_error=None):
+        generation = self._generations.get(key, 0) + 1
+        self._generations[key] = generation
+        previous = self._futures.get(key)
+        if previous is not None:
+            previous.cancel()
+
+        future = self.executor.submit(timed(f"task.{key}")(func), *args)
+        self._futures[key] = future
+        future.add_done_callback(lambda done: self._results.put((key, generation, done, on_done, on_error)))
+        return future
+
+    #Make the job under a key stale, so its result is dropped
+    def cancel(self, key):
+        self._generations[key] = self._generations.get(key, 0) + 1
+        future = self._futures.pop(key, None)
+        if future is not None:
+            future.cancel()
+
+    #Check if the newest job under a key hasn't reported back yet
+    def pending(self, key):
+        return key in self._futures
+
+    #Call callback(*args) once no new call for the same key came in for delay_ms
+    def debounce(self, key, delay_ms, callback, *args):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            self.root.after_cancel(timer)
+        self._timers[key] = self.root.after(delay_ms, self._fire, key, callback, args)
+
+    def _fire(self, key, callback, args):
+        self._timers.pop(key, None)
+        callback(*args)
+
+    def _poll(self):
+        while True:
+            try:
+                key, generation, future, on_done, on_error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if future.cancelled() or self._generations.get(key) != generation:
+                continue
+            del self._futures[key]
+            error = future.exception()
+            try:
+                if error is None:
+                    if on_done is not None:
+                        on_done(future.result())
+                elif on_error is not None:
+                    on_error(error)
+                else:
+                    self.root.report_callback_exception(type(error), error, error.__traceback__)
+            except Exception as exc:
+                self.root.report_callback_exception(type(exc), exc, exc.__traceback__)
+        self._poll_id = self.root.after(self.poll_ms, self._poll)
+
+    #Stop polling and drop queued jobs, a write already running is left to finish
+    def shutdown(self):
+        self.root.after_cancel(self._poll_id)
+        for timer in self._timers.values():
+            self.root.after_cancel(timer)
+        self._timers.clear()
+        self.executor.shutdown(wait=False, cancel_futures=True)
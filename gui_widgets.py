@@ -0,0 +1,159 @@
+#Read-only sequence of `count` items loaded a page at a time with
+#fetch(offset, limit), for lists too long to copy before showing them.
+#Pages are kept once loaded. Items past the end of what fetch returns
+#(the source shrank meanwhile) are left out of slices.
+class PagedItems:
+    def __init__(self, count, fetch, page_size=100):
+        self.count = count
+        self.fetch = fetch
+        self.page_size = page_size
+        self._pages = {}
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            items = []
+            for i in range(*index.indices(self.count)):
+                try:
+                    items.append(self[i])
+                except IndexError:
+                    break
+            return items
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        number, position = divmod(index, self.page_size)
+        page = self._pages.get(number)
+        if page is None:
+            page = self._pages[number] = list(self.fetch(number * self.page_size, self.page_size))
+        return page[position]
+
+
+#Treeview that only holds the rows around what is on screen.
+#The full result list stays in Python; the Treeview gets the visible page plus
+#`buffer` rows either side, and the scrollbar is driven over the full list.
+#Each refresh diffs the new window against the rows already in the widget and
+#only inserts, deletes, moves or updates what changed, so the Tk work per refresh
+#is bounded by the window size rather than the number of results.
+class VirtualTreeview:
+    def __init__(self, tree, scrollbar, buffer=50, page_size=30):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.buffer = buffer
+        self.visible = page_size
+        self.items = []
+        # item -> (iid, values, tags)
+        self.make_row = None
+        self.window = (0, 0)
+        # iids currently in the Treeview, in display order, with what they show
+        self._shown = []
+        self._shown_rows = {}
+        self._rendering = False
+        self._pending = None
+
+        tree.configure(yscrollcommand=self._on_tree_scroll)
+        scrollbar.configure(command=self.yview)
+
+    #Replace the list shown. make_row(item) gives (iid, values, tags) and is only
+    #called for items inside the rendered window.
+    def set_items(self, items, make_row):
+        self.items = items
+        self.make_row = make_row
+        self._render(self._top_row())
+
+    #Re-render the current window, e.g. after the items changed in place
+    def refresh(self):
+        self._render(self._top_row())
+
+    #Index in `items` of the first row on screen
+    def _top_row(self):
+        first, last = self.window
+        if last <= first:
+            return 0
+        return first + int(round(self.tree.yview()[0] * (last - first)))
+
+    def _render(self, top):
+        total = len(self.items)
+        top = max(0, min(top, max(0, total - self.visible)))
+        first = max(0, top - self.buffer)
+        last = min(total, top + self.visible + self.buffer)
+        wanted = [self.make_row(item) for item in self.items[first:last]]
+        wanted_iids = {iid for iid, _, _ in wanted}
+
+        self._rendering = True
+        try:
+            stale = [iid for iid in self._shown if iid not in wanted_iids]
+            if stale:
+                self.tree.delete(*stale)
+                for iid in stale:
+                    del self._shown_rows[iid]
+            order = [iid for iid in self._shown if iid in wanted_iids]
+
+            for index, (iid, values, tags) in enumerate(wanted):
+                shown = self._shown_rows.get(iid)
+                if shown is None:
+                    self.tree.insert('', index, iid=iid, values=values, tags=tags)
+                    order.insert(index, iid)
+                else:
+                    if shown != (values, tags):
+                        self.tree.item(iid, values=values, tags=tags)
+                    if order[index] != iid:
+                        self.tree.move(iid, '', index)
+                        order.remove(iid)
+                        order.insert(index, iid)
+                self._shown_rows[iid] = (values, tags)
+
+            self._shown = order
+            self.window = (first, last)
+            if last > first:
+                self.tree.yview_moveto((top - first) / (last - first))
+        finally:
+            self._rendering = False
+        self._update_scrollbar(top)
+
+    def _update_scrollbar(self, top):
+        total = len(self.items)
+        if total == 0:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(top / total, min(1.0, (top + self.visible) / total))
+
+    #Treeview scrolled itself (mouse wheel, arrow keys), move the window along if needed
+    def _on_tree_scroll(self, low, high):
+        first, last = self.window
+        count = last - first
+        if count == 0:
+            self._update_scrollbar(0)
+            return
+        low, high = float(low), float(high)
+        self.visible = max(1, int(round((high - low) * count)))
+        top = first + int(round(low * count))
+        self._update_scrollbar(top)
+        if self._rendering or self._pending is not None:
+            return
+
+        near_start = first > 0 and top - first < self.buffer // 2
+        near_end = last < len(self.items) and last - (top + self.visible) < self.buffer // 2
+        if near_start or near_end:
+            self._pending = self.tree.after_idle(self._shift_window)
+
+    def _shift_window(self):
+        self._pending = None
+        self._render(self._top_row())
+
+    #Scrollbar command, positions are fractions of the full list
+    def yview(self, *args):
+        total = len(self.items)
+        if not args or total == 0:
+            return
+        if args[0] == 'moveto':
+            top = int(float(args[1]) * total)
+        elif args[0] == 'scroll':
+            step = self.visible if args[2] == 'pages' else 1
+            top = self._top_row() + int(args[1]) * step
+        else:
+            return
+        self._render(top)
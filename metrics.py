@@ -0,0 +1,277 @@
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+
+# Metrics are off unless RESTAURANT_METRICS=1, RESTAURANT_METRICS_FILE is set or
+# enable() is called. Turned off, a timed function costs one extra call and a flag check.
+_enabled = os.environ.get('RESTAURANT_METRICS', '0') == '1'
+_metrics = {}
+_lock = threading.Lock()
+_local = threading.local()
+
+# Latency histogram buckets: bucket i counts calls under 2**i microseconds
+BUCKETS = 32
+
+
+#Call count, errors, latency histogram and counters (rows_scanned, bytes_read, ...) of one operation
+class Metric:
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.buckets = [0] * BUCKETS
+        self.counters = Counter()
+
+    def record(self, seconds, failed=False):
+        self.calls += 1
+        if failed:
+            self.errors += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+        bucket = int(seconds * 1e6).bit_length()
+        self.buckets[bucket if bucket < BUCKETS else BUCKETS - 1] += 1
+
+    def clear(self):
+        self.__init__(self.name)
+
+    #Latency below which `fraction` of the calls fell, in seconds, to the bucket's upper bound
+    def percentile(self, fraction):
+        if not self.calls:
+            return 0.0
+        wanted = fraction * self.calls
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if seen >= wanted:
+                return min(self.max, (1 << i) / 1e6)
+        return self.max
+
+    def as_dict(self):
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'total_s': round(self.total, 6),
+            'mean_ms': round(self.total / self.calls * 1000, 4) if self.calls else 0.0,
+            'min_ms': round(self.min * 1000, 4) if self.calls else 0.0,
+            'p50_ms': round(self.percentile(0.50) * 1000, 4),
+            'p95_ms': round(self.percentile(0.95) * 1000, 4),
+            'p99_ms': round(self.percentile(0.99) * 1000, 4),
+            'max_ms': round(self.max * 1000, 4),
+            'histogram_us': {f"<{1 << i}": count for i, count in enumerate(self.buckets) if count},
+            'counters': dict(self.counters),
+        }
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+def disable():
+    global _enabled
+    _enabled = False
+
+def enabled():
+    return _enabled
+
+def get_metric(name):
+    metric = _metrics.get(name)
+    if metric is None:
+        with _lock:
+            metric = _metrics.setdefault(name, Metric(name))
+    return metric
+
+#Forget everything recorded so far. Metrics are zeroed in place because
+#decorated functions hold on to theirs.
+def reset():
+    with _lock:
+        for metric in _metrics.values():
+            metric.clear()
+
+# Metrics of the operations being measured on this thread, innermost last
+def _stack():
+    try:
+        return _local.stack
+    except AttributeError:
+        _local.stack = []
+        return _local.stack
+
+#Name of the innermost operation being measured on this thread, None outside one
+def current():
+    stack = _stack()
+    return stack[-1].name if stack else None
+
+#Add to a counter of the operation being measured on this thread, e.g. add('rows_scanned', 120)
+def add(counter, amount=1):
+    if not _enabled:
+        return
+    stack = _stack()
+    if stack:
+        counters = stack[-1].counters
+        with _lock:
+            counters[counter] += amount
+
+def _finish(metric, stack, started, failed):
+    seconds = time.perf_counter() - started
+    stack.pop()
+    with _lock:
+        metric.record(seconds, failed)
+
+#Measure a block of code as the operation `name`
+@contextmanager
+def measure(name):
+    if not _enabled:
+        yield
+        return
+    metric = get_metric(name)
+    stack = _stack()
+    stack.append(metric)
+    started = time.perf_counter()
+    failed = True
+    try:
+        yield
+        failed = False
+    finally:
+        _finish(metric, stack, started, failed)
+
+#Decorator measuring every call of a function, named after it unless `name` is given
+def timed(name=None):
+    def decorate(func):
+        metric = get_metric(name or func.__qualname__)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            stack = _stack()
+            stack.append(metric)
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                _finish(metric, stack, started, True)
+                raise
+            _finish(metric, stack, started, False)
+            return result
+        return wrapper
+    return decorate
+
+
+#Every metric as a dict, slowest total first
+def snapshot():
+    with _lock:
+        metrics = sorted((metric for metric in _metrics.values() if metric.calls), key=lambda metric: metric.total, reverse=True)
+        return {metric.name: metric.as_dict() for metric in metrics}
+
+#Metrics as a fixed-width text table, for the stats panel or a terminal
+def format_table():
+    lines = [f"{'operation':34}{'calls':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'rows':>10}{'bytes':>11}"]
+    for name, metric in snapshot().items():
+        counters = metric['counters']
+        lines.append(f"{name[:33]:34}{metric['calls']:8}{metric['p50_ms']:9.3f}{metric['p95_ms']:9.3f}{metric['p99_ms']:9.3f}"
+                     f"{metric['max_ms']:9.3f}{counters.get('rows_scanned', 0):10}{counters.get('bytes_read', 0):11}")
+    if _profiler is not None:
+        lines.append('')
+        lines.append(f"Sampling profiler: {_profiler.samples} samples")
+        lines += [f"{count:8}  {function}" for function, count in _profiler.top(10)]
+    return '\n'.join(lines)
+
+#Write the metrics, and the profile if one is running, to a JSON file
+def export(path='metrics.json'):
+    data = {'exported_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'enabled': _enabled, 'metrics': snapshot()}
+    if _profiler is not None:
+        data['profile'] = {'samples': _profiler.samples, 'interval_s': _profiler.interval,
+                           'top': [[function, count] for function, count in _profiler.top(50)]}
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump(data, file, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+#Statistical profiler: a daemon thread looks at every other thread's stack
+#every `interval` seconds and counts the functions it finds, the innermost one
+#as 'self' time. Costs nothing while stopped and little while running.
+class SamplingProfiler:
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = 0
+        # 'file:line function' -> samples where it was the running function
+        self.self_counts = Counter()
+        # 'file:line function' -> samples where it was anywhere on the stack
+        self.total_counts = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                self.samples += 1
+                self.self_counts[_frame_label(frame)] += 1
+                seen = set()
+                while frame is not None:
+                    label = _frame_label(frame)
+                    if label not in seen:
+                        seen.add(label)
+                        self.total_counts[label] += 1
+                    frame = frame.f_back
+
+    #Functions with the most samples, counting time spent in their callees too
+    def top(self, count=20):
+        return self.total_counts.most_common(count)
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_firstlineno} {code.co_name}"
+
+_profiler = None
+
+#Start sampling every `interval` seconds, replacing any profile taken before
+def start_profiler(interval=0.005):
+    global _profiler
+    stop_profiler()
+    _profiler = SamplingProfiler(interval)
+    _profiler.start()
+    return _profiler
+
+#Stop sampling, the profile stays available to format_table() and export()
+def stop_profiler():
+    if _profiler is not None:
+        _profiler.stop()
+    return _profiler
+
+def profiler_running():
+    return _profiler is not None and _profiler._thread is not None
+
+
+# RESTAURANT_METRICS_FILE=path collects metrics, unless RESTAURANT_METRICS=0,
+# and writes them there when the program exits
+if os.environ.get('RESTAURANT_METRICS_FILE'):
+    if os.environ.get('RESTAURANT_METRICS') != '0':
+        enable()
+    atexit.register(export, os.environ['RESTAURANT_METRICS_FILE'])
@@ -0,0 +1,175 @@
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import Mapping
+from search_index import RestaurantSearchIndex
+
+# Minimum ratings offered as filter choices
+RATING_BANDS = [3.0, 4.0, 4.5]
+
+#Area part of an address, '123 Main St, Downtown' -> 'Downtown'
+def location_area(location):
+    return location.rsplit(',', 1)[-1].strip()
+
+
+#Restaurants keyed by ID with facet indexes kept up to date on every change:
+#cuisine -> ids, area -> ids, a rating-sorted list for range queries, and the
+#search index. Filters cost time in proportion to the smallest matching facet,
+#not to the size of the catalogue. Reads like the plain {id: Restaurant} dict
+#returned by load_restaurants().
+class RestaurantCatalog(Mapping):
+    def __init__(self, restaurants=()):
+        self.restaurants = {}
+        self.by_cuisine = {}
+        self.by_area = {}
+        # Lowercased name -> ids, names aren't unique
+        self.by_name = {}
+        # Sorted (rating, restaurant_id) pairs
+        self.ratings = []
+        self.search_index = RestaurantSearchIndex()
+        self._cuisine_names = {}
+        self._cuisine_types = None
+        # id -> (cuisine, area, name, rating) it is indexed under, so it can be
+        # removed after its details were changed in place
+        self._indexed = {}
+        # Order restaurants were added in, so filtered lists keep catalogue order
+        self._positions = {}
+        self._next_position = 0
+        for restaurant in restaurants:
+            self.add(restaurant)
+
+    def __getitem__(self, restaurant_id):
+        return self.restaurants[restaurant_id]
+
+    def __iter__(self):
+        return iter(self.restaurants)
+
+    def __len__(self):
+        return len(self.restaurants)
+
+    #Add a restaurant, or re-index one whose details changed
+    def add(self, restaurant):
+        if restaurant.restaurant_id in self.restaurants:
+            self.remove(restaurant.restaurant_id)
+        restaurant_id = restaurant.restaurant_id
+        self.restaurants[restaurant_id] = restaurant
+        self._positions[restaurant_id] = self._next_position
+        self._next_position += 1
+
+        cuisine = restaurant.cuisine_type.lower()
+        area = location_area(restaurant.location)
+        name = restaurant.name.lower()
+        self._indexed[restaurant_id] = (cuisine, area, name, restaurant.rating)
+        self.by_cuisine.setdefault(cuisine, set()).add(restaurant_id)
+        self._cuisine_names.setdefault(cuisine, restaurant.cuisine_type)
+        self.by_area.setdefault(area, set()).add(restaurant_id)
+        self.by_name.setdefault(name, set()).add(restaurant_id)
+        insort(self.ratings, (restaurant.rating, restaurant_id))
+        self.search_index.add(restaurant)
+        self._cuisine_types = None
+
+    def update(self, restaurant):
+        self.add(restaurant)
+
+    #Remove a restaurant and the index entries it was added with
+    def remove(self, restaurant_id):
+        restaurant = self.restaurants.pop(restaurant_id)
+        del self._positions[restaurant_id]
+        cuisine, area, name, rating = self._indexed.pop(restaurant_id)
+        _discard(self.by_cuisine, cuisine, restaurant_id)
+        if cuisine not in self.by_cuisine:
+            del self._cuisine_names[cuisine]
+        _discard(self.by_area, area, restaurant_id)
+        _discard(self.by_name, name, restaurant_id)
+        del self.ratings[bisect_left(self.ratings, (rating, restaurant_id))]
+        self.search_index.remove(restaurant_id)
+        self._cuisine_types = None
+        return restaurant
+
+    #Restaurants with a given name, ignoring case, in catalogue order
+    def find_by_name(self, name):
+        ids = sorted(self.by_name.get(name.lower(), ()), key=self._positions.__getitem__)
+        return [self.restaurants[restaurant_id] for restaurant_id in ids]
+
+    #Sorted list of unique cuisine types
+    def cuisine_types(self):
+        if self._cuisine_types is None:
+            self._cuisine_types = sorted(self._cuisine_names.values())
+        return self._cuisine_types
+
+    #Sorted list of areas
+    def areas(self):
+        return sorted(self.by_area)
+
+    #Bounds of the ratings list slice for a rating range
+    def _rating_range(self, min_rating, max_rating):
+        lo = 0 if min_rating is None else bisect_left(self.ratings, (float(min_rating),))
+        hi = len(self.ratings) if max_rating is None else bisect_right(self.ratings, (float(max_rating), '\U0010ffff'))
+        return lo, hi
+
+    #IDs matching every given filter. Walks the smallest candidate set and checks
+    #the other filters on each restaurant, so the cost follows the result size.
+    def _matching_ids(self, cuisine_type=None, min_rating=None, max_rating=None, area=None):
+        candidates = []
+        if cuisine_type:
+            candidates.append(self.by_cuisine.get(cuisine_type.lower(), set()))
+        if area:
+            candidates.append(self.by_area.get(area, set()))
+        if min_rating is not None or max_rating is not None:
+            lo, hi = self._rating_range(min_rating, max_rating)
+            candidates.append(range(lo, hi))
+
+        if not candidates:
+            return list(self.restaurants)
+
+        smallest = min(candidates, key=len)
+        if isinstance(smallest, range):
+            ids = (self.ratings[i][1] for i in smallest)
+        else:
+            ids = smallest
+        checks = [candidate for candidate in candidates if candidate is not smallest and not isinstance(candidate, range)]
+        low = float(min_rating) if min_rating is not None else None
+        high = float(max_rating) if max_rating is not None else None
+
+        matching = []
+        for restaurant_id in ids:
+            if any(restaurant_id not in check for check in checks):
+                continue
+            rating = self._indexed[restaurant_id][3]
+            if (low is not None and rating < low) or (high is not None and rating > high):
+                continue
+            matching.append(restaurant_id)
+        matching.sort(key=self._positions.__getitem__)
+        return matching
+
+    #Restaurants matching every given filter. With a search term the results
+    #come in search rank order, otherwise in catalogue order.
+    def filter(self, cuisine_type=None, min_rating=None, max_rating=None, area=None, search=None):
+        if search and search.strip():
+            results = self.search_index.search(search)
+            if not (cuisine_type or area or min_rating is not None or max_rating is not None):
+                return results
+            matching = set(self._matching_ids(cuisine_type, min_rating, max_rating, area))
+            return [restaurant for restaurant in results if restaurant.restaurant_id in matching]
+        return [self.restaurants[restaurant_id] for restaurant_id in self._matching_ids(cuisine_type, min_rating, max_rating, area)]
+
+    #Result counts per cuisine, area and minimum rating band. Each facet is counted
+    #with all the other filters applied, so the counts say what picking that value would give.
+    def facet_counts(self, cuisine_type=None, min_rating=None, max_rating=None, area=None, search=None):
+        counts = {'cuisine': {}, 'area': {}, 'rating': {}}
+        for restaurant in self.filter(None, min_rating, max_rating, area, search):
+            cuisine = self._cuisine_names[self._indexed[restaurant.restaurant_id][0]]
+            counts['cuisine'][cuisine] = counts['cuisine'].get(cuisine, 0) + 1
+        for restaurant in self.filter(cuisine_type, min_rating, max_rating, None, search):
+            restaurant_area = location_area(restaurant.location)
+            counts['area'][restaurant_area] = counts['area'].get(restaurant_area, 0) + 1
+        ratings = [restaurant.rating for restaurant in self.filter(cuisine_type, None, max_rating, area, search)]
+        for band in RATING_BANDS:
+            counts['rating'][band] = sum(1 for rating in ratings if rating >= band)
+        return counts
+
+
+def _discard(index, key, restaurant_id):
+    ids = index.get(key)
+    if ids is not None:
+        ids.discard(restaurant_id)
+        if not ids:
+            del index[key]
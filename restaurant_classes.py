@@ -1,9 +1,32 @@
-import csv
 from datetime import datetime
+from functools import lru_cache
 import uuid
+from availability import AvailabilityMatrix, minutes_to_time
+from booking_record import pack_time
+from booking_store import DEFAULT_DURATION
+from metrics import timed
+from storage import get_booking_store
+from table_allocation import allocate, assign_batch, table_options
+
+#'HH:MM' (or anything strptime's '%H:%M' accepts) -> minutes since midnight, None if it isn't a time.
+#Booking times repeat across restaurants and queries, so results are memoized.
+@lru_cache(maxsize=4096)
+def parse_minutes(time_str):
+    packed = pack_time(time_str)
+    if isinstance(packed, int) and packed < 24 * 60 and int(time_str[3:]) < 60:
+        return packed
+    try:
+        parsed = datetime.strptime(time_str, '%H:%M')
+    except (TypeError, ValueError):
+        return None
+    return parsed.hour * 60 + parsed.minute
+
 
 class Restaurant:
-    def __init__(self, restaurant_id, name, cuisine_type, rating, location,total_tables, table_configuration, opening_hours, closing_hours):
+    __slots__ = ('restaurant_id', 'name', 'cuisine_type', 'rating', 'location', 'total_tables', '_table_configuration', '_opening_hours', '_closing_hours', 'default_duration',
+                 '_hours', '_slot_grids', '_tables')
+
+    def __init__(self, restaurant_id, name, cuisine_type, rating, location,total_tables, table_configuration, opening_hours, closing_hours, default_duration=DEFAULT_DURATION):
         self.restaurant_id = restaurant_id
         self.name = name
         self.cuisine_type = cuisine_type
@@ -13,6 +36,66 @@ class Restaurant:
         self.table_configuration = self._parse_table_config(table_configuration)
         self.opening_hours = opening_hours
         self.closing_hours = closing_hours
+        # Minutes a party keeps its table unless the booking says otherwise
+        self.default_duration = int(default_duration or DEFAULT_DURATION)
+
+    # The parsed hours, slot grids and table list are cached on first use.
+    # Assigning opening_hours, closing_hours or table_configuration clears them,
+    # call clear_caches() after changing the table_configuration dict in place.
+    @property
+    def opening_hours(self):
+        return self._opening_hours
+
+    @opening_hours.setter
+    def opening_hours(self, value):
+        self._opening_hours = value
+        self.clear_caches()
+
+    @property
+    def closing_hours(self):
+        return self._closing_hours
+
+    @closing_hours.setter
+    def closing_hours(self, value):
+        self._closing_hours = value
+        self.clear_caches()
+
+    @property
+    def table_configuration(self):
+        return self._table_configuration
+
+    @table_configuration.setter
+    def table_configuration(self, value):
+        self._table_configuration = value
+        self.clear_caches()
+
+    #Forget the cached hours, slots and tables
+    def clear_caches(self):
+        # (opening, closing) in minutes since midnight, False if not parsed yet, None if invalid
+        self._hours = False
+        # step -> (slot minutes, slot strings)
+        self._slot_grids = {}
+        # party size -> tuple of (table_id, size)
+        self._tables = {}
+
+    #(opening, closing) in minutes since midnight, None if either isn't a valid time
+    def _parsed_hours(self):
+        if self._hours is False:
+            opening = parse_minutes(self._opening_hours)
+            closing = parse_minutes(self._closing_hours)
+            self._hours = (opening, closing) if opening is not None and closing is not None else None
+        return self._hours
+
+    #Slot minutes and 'HH:MM' strings every `step` minutes from opening to closing
+    def _slot_grid(self, step=30):
+        grid = self._slot_grids.get(step)
+        if grid is None:
+            hours = self._parsed_hours()
+            if hours is None:
+                raise ValueError(f"Invalid opening hours {self._opening_hours}-{self._closing_hours}")
+            minutes = tuple(range(hours[0], hours[1] + 1, step))
+            grid = self._slot_grids[step] = (minutes, tuple(minutes_to_time(slot) for slot in minutes))
+        return grid
 
     #Convert string table configuration to dictionary
     def _parse_table_config(self, config_str):
@@ -25,48 +108,85 @@ class Restaurant:
             config[int(seats)] = int(count)
         return config
 
-    #Check table availability for given date, time and party size
-    def get_available_tables(self, date, time, party_size):
+    #Check table availability for given date, time and party size.
+    #A table counts as booked if any booking overlaps the stay of `duration` minutes.
+    def get_available_tables(self, date, time, party_size, duration=None):
         # Read current bookings
-        booked_tables = self._get_booked_tables(date, time)
-        
-        # Find suitable table size for party
-        suitable_sizes = [size for size in self.table_configuration.keys() if size >= party_size]
-        if not suitable_sizes:
-            return []
+        booked_tables = self._get_booked_tables(date, time, duration)
         
-        min_suitable_size = min(suitable_sizes)
         available_tables = []
-        
-        # Generate available table IDs
-        for size in suitable_sizes:
-            for i in range(self.table_configuration[size]):
-                table_id = f"T{size}_{i+1}"
-                if table_id not in booked_tables:
-                    available_tables.append({'table_id': table_id,'size': size})
+        for table_id, size in self._suitable_tables(party_size):
+            if table_id not in booked_tables:
+                available_tables.append({'table_id': table_id,'size': size})
                     
         return available_tables
 
-    #Get list of booked tables for given date and time
-    def _get_booked_tables(self, date, time):
-        booked_tables = set()
-        with open('bookings.csv', 'r') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                if (row['restaurant_id'] == self.restaurant_id and row['date'] == date and row['time'] == time and row['status'] == 'active'):
-                    booked_tables.add(row['table_id'])
+    #Get (table_id, size) of every table that seats the party, as a cached tuple
+    def _suitable_tables(self, party_size):
+        tables = self._tables.get(party_size)
+        if tables is None:
+            suitable_sizes = [size for size in self.table_configuration.keys() if size >= party_size]
+            tables = self._tables[party_size] = tuple((f"T{size}_{i+1}", size) for size in suitable_sizes for i in range(self.table_configuration[size]))
+        return tables
 
-        return booked_tables
+    #Get every free table at a slot, whatever its size
+    def _free_tables(self, date, time, duration=None):
+        booked_tables = self._get_booked_tables(date, time, duration)
+        return [{'table_id': table_id, 'size': size} for table_id, size in self._suitable_tables(1) if table_id not in booked_tables]
+
+    #Ways to seat a party at a slot, best fitting first. Only tables of the smallest
+    #size that fits are offered; adjacent tables are joined when no single table fits.
+    def get_table_options(self, date, time, party_size, duration=None, allow_join=True):
+        free_tables = self._free_tables(date, time, duration)
+        options = table_options(free_tables, party_size, allow_join=False)
+        if options:
+            return [option.as_dict() for option in options if option.seats == options[0].seats]
+        if allow_join:
+            return [option.as_dict() for option in table_options(free_tables, party_size)]
+        return []
+
+    #Pick the best table (or joined tables) for a party, None if it can't be seated
+    def allocate_table(self, date, time, party_size, duration=None, allow_join=True):
+        option = allocate(self._free_tables(date, time, duration), party_size, allow_join)
+        return option.table_id if option is not None else None
+
+    #Seat a batch of pending party sizes for one slot so that the most covers get a table.
+    #Returns a table ID (or None) per party, in the same order.
+    def assign_requests(self, date, time, party_sizes, duration=None, allow_join=True):
+        assignment = assign_batch(self._free_tables(date, time, duration), party_sizes, allow_join)
+        return [option.table_id if option is not None else None for option in assignment]
+
+    #Get the start of every 30 minute slot between opening and closing, in minutes since midnight
+    def get_slot_minutes(self, step=30):
+        return list(self._slot_grid(step)[0])
+
+    #Same slots as 'HH:MM' strings
+    def get_time_slots(self, step=30):
+        return list(self._slot_grid(step)[1])
+
+    #Build the slot x table occupancy grid for a day from one read of its bookings.
+    #`bookings` takes (table_id, start, duration) tuples already read from the store.
+    def availability_matrix(self, date, party_size, duration=None, bookings=None):
+        if bookings is None:
+            bookings = get_booking_store().day_bookings(self.restaurant_id, date)
+        return AvailabilityMatrix.build(self.restaurant_id, date, self._slot_grid()[0], self._suitable_tables(party_size), bookings, duration or self.default_duration)
+
+    #Get the slots of a day where a party can be seated, joining tables when no single table fits
+    def bookable_slots(self, date, party_size, duration=None, allow_join=True, bookings=None):
+        return self.availability_matrix(date, 1, duration, bookings).seatable_slots(party_size, allow_join)
+
+    #Get list of tables booked at any point of a stay starting at the given time
+    @timed()
+    def _get_booked_tables(self, date, time, duration=None):
+        return set(get_booking_store().get_booked_tables(self.restaurant_id, date, time, duration or self.default_duration))
 
     #Verify if time is within operating hours
     def check_valid_booking_time(self, time):
-        try:
-            booking_time = datetime.strptime(time, '%H:%M').time()
-            opening = datetime.strptime(self.opening_hours, '%H:%M').time()
-            closing = datetime.strptime(self.closing_hours, '%H:%M').time()
-            return opening <= booking_time <= closing
-        except ValueError:
+        hours = self._parsed_hours()
+        booking_time = parse_minutes(time)
+        if hours is None or booking_time is None:
             return False
+        return hours[0] <= booking_time <= hours[1]
 
     #Format restaurant details for display
     def display_restaurant_info(self):
@@ -96,14 +216,17 @@ class Restaurant:
         ]
 
 class User:
+    __slots__ = ('user_id', 'name', 'email', 'phone_number')
+
     def __init__(self, user_id, name, email, phone_number):
         self.user_id = user_id
         self.name = name
         self.email = email
         self.phone_number = phone_number
 
-    #Create a new reservation
-    def make_reservation(self, restaurant_id, date, time, table_id, party_size):
+    #Create a new reservation, raises BookingConflictError if the table was taken meanwhile
+    @timed()
+    def make_reservation(self, restaurant_id, date, time, table_id, party_size, duration=None):
         booking_id = f"B{str(uuid.uuid4())[:8]}"
         booking_data = {
             'booking_id': booking_id,
@@ -113,51 +236,30 @@ class User:
             'time': time,
             'table_id': table_id,
             'party_size': party_size,
-            'status': 'active'
+            'status': 'active',
+            'duration': duration
         }
         
-        with open('bookings.csv', 'a', newline='') as file:
-            writer = csv.DictWriter(file, fieldnames=booking_data.keys())
-            if file.tell() == 0:
-                writer.writeheader()
-            writer.writerow(booking_data)
-        
+        get_booking_store().reserve(booking_data)
         return booking_id
 
     #Cancel an existing reservation
+    @timed()
     def cancel_reservation(self, booking_id):
-        bookings = []
-        cancelled = False
-        
-        with open('bookings.csv', 'r') as file:
-            reader = csv.DictReader(file)
-            bookings = list(reader)
-            
-        for booking in bookings:
-            if (booking['booking_id'] == booking_id and 
-                booking['user_id'] == self.user_id and
-                booking['status'] == 'active'):
-
-                booking['status'] = 'cancelled'
-                cancelled = True
-                
-        if cancelled:
-            with open('bookings.csv', 'w', newline='') as file:
-                writer = csv.DictWriter(file, fieldnames=bookings[0].keys())
-                writer.writeheader()
-                writer.writerows(bookings)
-                
-        return cancelled
+        return get_booking_store().cancel_booking(booking_id, self.user_id)
 
     #View booking history for user
+    @timed()
     def view_booking_history(self):
-        bookings = []
-        with open('bookings.csv', 'r') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                if row['user_id'] == self.user_id:
-                    bookings.append(row)
-        return bookings
+        return get_booking_store().user_bookings(self.user_id)
+
+    #Page through booking history, newest first, as a lazy iterator
+    def booking_history(self, active_only=False, start_date=None, end_date=None, newest_first=True, offset=0, limit=None):
+        return get_booking_store().user_history(self.user_id, active_only, start_date, end_date, newest_first, offset, limit)
+
+    #Number of bookings booking_history gives with the same filters
+    def booking_history_count(self, active_only=False, start_date=None, end_date=None):
+        return get_booking_store().user_history_count(self.user_id, active_only, start_date, end_date)
 
     #Format user details for display
     def to_csv_format(self):
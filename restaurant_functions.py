@@ -1,30 +1,57 @@
-import csv
-from datetime import datetime,timedelta
+from datetime import datetime
+from metrics import timed
 from restaurant_classes import Restaurant, User
+from restaurant_catalog import RestaurantCatalog
+from search_index import RestaurantSearchIndex
+from storage import get_backend, get_booking_store
 
-#Load all restaurants from CSV file
-def load_restaurants():
+#Load all restaurants from the storage backend, the active one unless `backend` is given
+@timed()
+def load_restaurants(backend=None):
     restaurants = {}
-    with open('restaurants.csv', 'r') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            restaurant = Restaurant(row['restaurant_id'],row['name'],row['cuisine_type'],row['rating'],row['location'],row['total_tables'],row['table_configuration'],row['opening_hours'],row['closing_hours'])
+    for row in (backend or get_backend()).restaurant_rows():
+        restaurant = Restaurant(row['restaurant_id'],row['name'],row['cuisine_type'],row['rating'],row['location'],row['total_tables'],row['table_configuration'],row['opening_hours'],row['closing_hours'],row.get('dining_duration'))
 
-            restaurants[row['restaurant_id']] = restaurant
+        restaurants[row['restaurant_id']] = restaurant
     return restaurants
 
-#Load all users from CSV file
+#Load all users from the storage backend
+@timed()
 def load_users():
     users = {}
-    with open('users.csv', 'r') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            user = User(row['user_id'],row['name'],row['email'],row['phone_number'])
-            users[row['user_id']] = user
+    for row in get_backend().user_rows():
+        user = User(row['user_id'],row['name'],row['email'],row['phone_number'])
+        users[row['user_id']] = user
     return users
 
+#Wrap loaded restaurants in a RestaurantCatalog, which indexes them for filtering and search
+def build_catalog(restaurants):
+    return RestaurantCatalog(restaurants.values())
+
+#Get restaurants by name, ignoring case. Names aren't unique so this returns a list.
+def find_restaurants_by_name(restaurants, name):
+    if isinstance(restaurants, RestaurantCatalog):
+        return restaurants.find_by_name(name)
+    return [r for r in restaurants.values() if r.name.lower() == name.lower()]
+
+#Map a unique label to each record ID for pick lists, the name, or 'name (ID)'
+#when several records share the name
+def name_labels(records):
+    return unique_labels({record_id: record.name for record_id, record in records.items()})
+
+#Same labels from a {record_id: name} dict
+def unique_labels(names):
+    counts = {}
+    for name in names.values():
+        counts[name] = counts.get(name, 0) + 1
+    return {name if counts[name] == 1 else f"{name} ({record_id})": record_id
+            for record_id, name in names.items()}
+
 #Filter restaurants based on cuisine type and minimum rating
 def filter_restaurants(restaurants, cuisine_type=None, min_rating=None):
+    if isinstance(restaurants, RestaurantCatalog):
+        return restaurants.filter(cuisine_type, min_rating)
+
     filtered = restaurants.values()
     
     if cuisine_type:
@@ -35,19 +62,23 @@ def filter_restaurants(restaurants, cuisine_type=None, min_rating=None):
         
     return filtered
 
-#Search restaurants by name
-def search_restaurants(restaurants, search_term):
+#Search restaurants by name, cuisine or location.
+#With a RestaurantSearchIndex the results are ranked and allow prefixes and typos.
+def search_restaurants(restaurants, search_term, index=None):
+    if index is None and isinstance(restaurants, RestaurantCatalog):
+        index = restaurants.search_index
+    if index is not None:
+        return index.search(search_term)
     search_term = search_term.lower()
     return [r for r in restaurants.values() if search_term in r.name.lower() or search_term in r.cuisine_type.lower() or search_term in r.location.lower()]
 
+#Build the search index used by search_restaurants
+def build_search_index(restaurants):
+    return RestaurantSearchIndex(restaurants.values())
+
 #Retrieve booking details by booking ID
 def get_booking_by_id(booking_id):
-    with open('bookings.csv', 'r') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            if row['booking_id'] == booking_id:
-                return row
-    return None
+    return get_booking_store().get_booking(booking_id)
 
 #Validate if booking date and time are in the future
 def validate_booking_time(date_str, time_str):
@@ -60,17 +91,24 @@ def validate_booking_time(date_str, time_str):
 
 #Get list of unique cuisine types
 def get_cuisine_types(restaurants):
+    if isinstance(restaurants, RestaurantCatalog):
+        return list(restaurants.cuisine_types())
     return sorted(list(set(r.cuisine_type for r in restaurants.values())))
 
 #Get available time slots for a given restaurant and date
 def get_available_time_slots(restaurant, date):
-    opening = datetime.strptime(restaurant.opening_hours, '%H:%M')
-    closing = datetime.strptime(restaurant.closing_hours, '%H:%M')
-    
-    time_slots = []
-    current = opening
-    while current <= closing:
-        time_slots.append(current.strftime('%H:%M'))
-        current = datetime.strptime((datetime.combine(datetime.today(), current.time()) + timedelta(minutes=30)).strftime('%H:%M'),'%H:%M')
-    
-    return time_slots
\ No newline at end of file
+    return restaurant.get_time_slots()
+
+#Build the availability grid of every restaurant for a day
+def availability_matrices(restaurants, date, party_size):
+    return {restaurant_id: restaurant.availability_matrix(date, party_size) for restaurant_id, restaurant in restaurants.items()}
+
+#Find the earliest bookable slot at or after a time in every restaurant, soonest first
+def find_any_table(restaurants, date, party_size, after='00:00'):
+    results = []
+    for restaurant_id, matrix in availability_matrices(restaurants, date, party_size).items():
+        for slot in matrix.bookable_slots():
+            if slot >= after:
+                results.append({'restaurant': restaurants[restaurant_id], 'time': slot, 'tables': matrix.free_tables(slot)})
+                break
+    return sorted(results, key=lambda result: result['time'])
\ No newline at end of file
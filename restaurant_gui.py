@@ -1,41 +1,171 @@
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox
-from tkcalendar import DateEntry
 import restaurant_functions as rf
+import metrics
+import snapshot
+from alternatives import AlternativesEngine
+from booking_store import BookingConflictError
+from gui_widgets import PagedItems, VirtualTreeview
+from gui_tasks import BackgroundTasks
+from metrics import timed
+from storage import CSVBackend, get_backend
 
 # Global variables to maintain state
 restaurants = {}
 users = {}
+# Label shown in the user picker -> user_id, labels stay unique when names repeat
+user_labels = {}
 current_user = None
 table_mapping = {}
  
 # Main GUI elements that need to be accessed by multiple functions
 root = None
+tasks = None
 restaurant_list = None
 bookings_list = None
+restaurant_view = None
+bookings_view = None
 date_picker = None
+date_frame = None
 time_combo = None
 party_size_var = None
 table_combo = None
 search_var = None
 cuisine_var = None
 rating_var = None
+area_var = None
 user_var = None
 table_var = None
+alternatives_list = None
+# Alternatives shown in alternatives_list, in the same order
+alternatives = []
+alternatives_engine = None
+stats_window = None
+cuisine_combo = None
+area_combo = None
+user_combo = None
+status_var = None
+# perf_counter() when init_gui started, startup times are measured from it
+startup_began = None
 
 def init_gui():
-    global root, restaurants, users
+    global root, tasks, restaurants, users, user_labels, startup_began
+    startup_began = time.perf_counter()
     root = tk.Tk()
     root.title("Restaurant Booking System")
     root.geometry("1200x800")
     
-    # Load data
-    restaurants = rf.load_restaurants()
-    users = rf.load_users()
+    # Bookings are read and written off the Tk thread
+    tasks = BackgroundTasks(root)
+    root.protocol("WM_DELETE_WINDOW", on_close)
     
+    # The window comes up empty and the data streams in from worker threads:
+    # users first, then the restaurant catalogue
+    restaurants = rf.build_catalog({})
+    users = {}
+    user_labels = {}
+    
+    setup_menu()
     setup_main_interface()
+    root.after_idle(on_window_shown)
+    tasks.submit('load_data', load_data, on_done=show_users)
     return root
 
+#Record how long the empty window took to appear, then build the date picker,
+#whose tkcalendar import is slow
+def on_window_shown():
+    record_startup('startup.window')
+    setup_date_picker()
+
+def record_startup(name):
+    if metrics.enabled():
+        metrics.get_metric(name).record(time.perf_counter() - startup_began)
+
+#Restaurants and users: from the snapshot of the CSV files, which skips CSV
+#parsing and materialises users on first use, or straight from other backends
+def load_data():
+    if isinstance(get_backend(), CSVBackend):
+        data = snapshot.load_snapshot()
+        return data.restaurants(), data.users(), data.user_labels
+    loaded_users = rf.load_users()
+    return rf.load_restaurants(), loaded_users, rf.name_labels(loaded_users)
+
+def show_users(data):
+    global users, user_labels
+    loaded_restaurants, users, user_labels = data
+    user_combo['values'] = list(user_labels)
+    status_var.set(f"Loaded {len(users)} users, indexing {len(loaded_restaurants)} restaurants...")
+    # Indexing for search and filters is the slow part, so it runs on a worker too
+    tasks.submit('catalog', index_restaurants, loaded_restaurants, on_done=show_restaurants)
+
+def index_restaurants(loaded_restaurants):
+    catalog = rf.build_catalog(loaded_restaurants)
+    return catalog, AlternativesEngine(catalog)
+
+def show_restaurants(indexed):
+    global restaurants, alternatives_engine
+    restaurants, alternatives_engine = indexed
+    cuisine_combo['values'] = ["All"] + rf.get_cuisine_types(restaurants)
+    area_combo['values'] = ["All"] + restaurants.areas()
+    update_restaurant_list()
+    # History rows shown before the catalogue loaded only had restaurant IDs
+    bookings_view.refresh()
+    status_var.set(f"{len(restaurants)} restaurants, {len(users)} users")
+    record_startup('startup.data')
+
+def setup_menu():
+    menubar = tk.Menu(root)
+    view_menu = tk.Menu(menubar, tearoff=0)
+    view_menu.add_command(label="Performance Stats", command=show_stats_panel)
+    menubar.add_cascade(label="View", menu=view_menu)
+    root.config(menu=menubar)
+
+#Window with the live metrics table, refreshed every second while open
+def show_stats_panel():
+    global stats_window
+    if stats_window is not None and stats_window.winfo_exists():
+        stats_window.lift()
+        return
+    
+    stats_window = tk.Toplevel(root)
+    stats_window.title("Performance Stats")
+    stats_window.geometry("900x500")
+    
+    controls = ttk.Frame(stats_window, padding="5")
+    controls.pack(fill=tk.X)
+    metrics_var = tk.BooleanVar(value=metrics.enabled())
+    profiler_var = tk.BooleanVar(value=metrics.profiler_running())
+    
+    def toggle_metrics():
+        metrics.enable() if metrics_var.get() else metrics.disable()
+    
+    def toggle_profiler():
+        metrics.start_profiler() if profiler_var.get() else metrics.stop_profiler()
+    
+    def export():
+        path = metrics.export()
+        messagebox.showinfo("Export", f"Metrics written to {path}", parent=stats_window)
+    
+    ttk.Checkbutton(controls, text="Collect metrics", variable=metrics_var,
+                    command=toggle_metrics).pack(side=tk.LEFT, padx=5)
+    ttk.Checkbutton(controls, text="Sampling profiler", variable=profiler_var,
+                    command=toggle_profiler).pack(side=tk.LEFT, padx=5)
+    ttk.Button(controls, text="Export", command=export).pack(side=tk.RIGHT, padx=5)
+    ttk.Button(controls, text="Reset", command=metrics.reset).pack(side=tk.RIGHT, padx=5)
+    
+    text = tk.Text(stats_window, font=("Courier", 10), wrap=tk.NONE)
+    text.pack(fill=tk.BOTH, expand=True)
+    
+    def refresh():
+        if not stats_window.winfo_exists():
+            return
+        text.delete('1.0', tk.END)
+        text.insert(tk.END, metrics.format_table())
+        stats_window.after(1000, refresh)
+    
+    refresh()
+
 def setup_main_interface():
     # Create main frames
     left_frame = ttk.Frame(root, padding="10")
@@ -50,7 +180,10 @@ def setup_main_interface():
     setup_user_section(right_frame)
 
 def setup_search_filters(parent):
-    global search_var, cuisine_var, rating_var
+    global search_var, cuisine_var, rating_var, area_var, cuisine_combo, area_combo, status_var
+    
+    status_var = tk.StringVar(value="Loading restaurants and users...")
+    ttk.Label(parent, textvariable=status_var).pack(fill=tk.X)
     
     # Search bar
     search_frame = ttk.Frame(parent)
@@ -70,20 +203,28 @@ def setup_search_filters(parent):
     ttk.Label(filter_frame, text="Cuisine:").pack(side=tk.LEFT)
     cuisine_var = tk.StringVar(value="All")
     cuisine_types = ["All"] + rf.get_cuisine_types(restaurants)
-    ttk.Combobox(filter_frame, textvariable=cuisine_var, 
-                 values=cuisine_types).pack(side=tk.LEFT, padx=5)
+    cuisine_combo = ttk.Combobox(filter_frame, textvariable=cuisine_var, 
+                                 values=cuisine_types)
+    cuisine_combo.pack(side=tk.LEFT, padx=5)
     
     ttk.Label(filter_frame, text="Min Rating:").pack(side=tk.LEFT)
     rating_var = tk.StringVar(value="All")
     ttk.Combobox(filter_frame, textvariable=rating_var,
                  values=["All", "3+", "4+", "4.5+"]).pack(side=tk.LEFT, padx=5)
     
+    ttk.Label(filter_frame, text="Area:").pack(side=tk.LEFT)
+    area_var = tk.StringVar(value="All")
+    area_combo = ttk.Combobox(filter_frame, textvariable=area_var,
+                              values=["All"] + restaurants.areas())
+    area_combo.pack(side=tk.LEFT, padx=5)
+    
     # Bind filter changes
     cuisine_var.trace('w', apply_filters)
     rating_var.trace('w', apply_filters)
+    area_var.trace('w', apply_filters)
 
 def setup_restaurant_list(parent):
-    global restaurant_list
+    global restaurant_list, restaurant_view
     
     list_frame = ttk.Frame(parent)
     list_frame.pack(fill=tk.BOTH, expand=True)
@@ -93,8 +234,9 @@ def setup_restaurant_list(parent):
     restaurant_list.heading('Cuisine', text='Cuisine')
     restaurant_list.heading('Rating', text='Rating')
     
-    scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=restaurant_list.yview)
-    restaurant_list.configure(yscrollcommand=scrollbar.set)
+    # Only the rows around the visible page live in the Treeview
+    scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL)
+    restaurant_view = VirtualTreeview(restaurant_list, scrollbar)
     
     restaurant_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
     scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
@@ -103,18 +245,15 @@ def setup_restaurant_list(parent):
     update_restaurant_list()
 
 def setup_booking_form(parent):
-    global date_picker, time_combo, party_size_var, table_combo, table_var
+    global date_frame, time_combo, party_size_var, table_combo, table_var, alternatives_list
     
     booking_frame = ttk.LabelFrame(parent, text="Make a Reservation", padding="10")
     booking_frame.pack(fill=tk.X, pady=10)
     
-    # Date selection
+    # Date selection, the picker itself is added by setup_date_picker once the window is up
     date_frame = ttk.Frame(booking_frame)
     date_frame.pack(fill=tk.X, pady=5)
     ttk.Label(date_frame, text="Date:").pack(side=tk.LEFT)
-    date_picker = DateEntry(date_frame, width=12, background='darkblue',
-                           foreground='white', borderwidth=2)
-    date_picker.pack(side=tk.LEFT, padx=5)
     
     # Time selection
     time_frame = ttk.Frame(booking_frame)
@@ -141,17 +280,30 @@ def setup_booking_form(parent):
     table_combo = ttk.Combobox(table_frame, textvariable=table_var)
     table_combo.pack(side=tk.LEFT, padx=5)
     
+    # Suggestions when nothing is free at the chosen time, double-click to book one
+    ttk.Label(booking_frame, text="Alternatives:").pack(anchor=tk.W)
+    alternatives_list = tk.Listbox(booking_frame, height=5)
+    alternatives_list.pack(fill=tk.X, pady=5)
+    alternatives_list.bind('<Double-Button-1>', book_alternative)
+    
     # Add bindings
-    date_picker.bind('<<DateEntrySelected>>', update_available_tables)
     time_combo.bind('<<ComboboxSelected>>', update_available_tables)
-    party_size_var.trace('w', update_available_tables)
+    party_size_var.trace('w', on_booking_details_change)
     
     # Book button
     ttk.Button(booking_frame, text="Make Reservation", 
                command=make_reservation).pack(pady=10)
 
+def setup_date_picker():
+    global date_picker
+    from tkcalendar import DateEntry
+    date_picker = DateEntry(date_frame, width=12, background='darkblue',
+                           foreground='white', borderwidth=2)
+    date_picker.pack(side=tk.LEFT, padx=5)
+    date_picker.bind('<<DateEntrySelected>>', on_booking_details_change)
+
 def setup_user_section(parent):
-    global bookings_list, user_var
+    global bookings_list, bookings_view, user_var, user_combo
     
     user_frame = ttk.LabelFrame(parent, text="User Management", padding="10")
     user_frame.pack(fill=tk.BOTH, expand=True, pady=10)
@@ -162,7 +314,7 @@ def setup_user_section(parent):
     ttk.Label(user_select_frame, text="Select User:").pack(side=tk.LEFT)
     user_var = tk.StringVar()
     user_combo = ttk.Combobox(user_select_frame, textvariable=user_var,
-                             values=[user.name for user in users.values()])
+                             values=list(user_labels))
     user_combo.pack(side=tk.LEFT, padx=5)
     user_combo.bind('<<ComboboxSelected>>', on_user_select)
     
@@ -178,9 +330,8 @@ def setup_user_section(parent):
     bookings_list.heading('Restaurant', text='Restaurant')
     bookings_list.heading('Status', text='Status')
     
-    scrollbar = ttk.Scrollbar(bookings_frame, orient=tk.VERTICAL, 
-                             command=bookings_list.yview)
-    bookings_list.configure(yscrollcommand=scrollbar.set)
+    scrollbar = ttk.Scrollbar(bookings_frame, orient=tk.VERTICAL)
+    bookings_view = VirtualTreeview(bookings_list, scrollbar)
     
     bookings_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
     scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
@@ -189,84 +340,137 @@ def setup_user_section(parent):
     ttk.Button(user_frame, text="Cancel Selected Booking", 
                command=cancel_booking).pack(pady=5)
 
+def on_close():
+    tasks.shutdown()
+    root.destroy()
+
 def on_search(*args):
-    update_restaurant_list()
+    # Wait for a pause in typing instead of filtering on every key
+    tasks.debounce('search', 150, update_restaurant_list)
 
 def apply_filters(*args):
     update_restaurant_list()
 
+@timed('gui.update_restaurant_list')
 def update_restaurant_list():
-    # Clear current list
-    for item in restaurant_list.get_children():
-        restaurant_list.delete(item)
-    
-    # Apply filters
-    filtered_restaurants = list(restaurants.values())
-    
-    # Apply cuisine filter
-    if cuisine_var.get() != "All":
-        filtered_restaurants = [r for r in filtered_restaurants 
-                             if r.cuisine_type == cuisine_var.get()]
-    
-    # Apply rating filter
+    # Search results come ranked best match first, the facet filters narrow them down
     rating_filter = rating_var.get()
-    if rating_filter != "All":
-        min_rating = float(rating_filter.replace("+", ""))
-        filtered_restaurants = [r for r in filtered_restaurants 
-                             if r.rating >= min_rating]
-    
-    # Apply search
-    search_term = search_var.get().lower()
-    if search_term:
-        filtered_restaurants = [r for r in filtered_restaurants 
-                             if search_term in r.name.lower() or 
-                             search_term in r.cuisine_type.lower()]
-    
-    # Update list
-    for restaurant in filtered_restaurants:
-        restaurant_list.insert('', 'end', values=(
-            restaurant.name,
-            restaurant.cuisine_type,
-            f"{restaurant.rating:.1f}"
-        ))
+    min_rating = float(rating_filter.replace("+", "")) if rating_filter != "All" else None
+    filtered_restaurants = restaurants.filter(
+        cuisine_type=cuisine_var.get() if cuisine_var.get() != "All" else None,
+        min_rating=min_rating,
+        area=area_var.get() if area_var.get() != "All" else None,
+        search=search_var.get()
+    )
+    
+    # Update list, only rows that changed in the visible window touch the Treeview
+    restaurant_view.set_items(filtered_restaurants, restaurant_row)
 
-def on_restaurant_select(event):
+#Treeview row for a restaurant, keyed by its ID so refreshes can be diffed
+def restaurant_row(restaurant):
+    return restaurant.restaurant_id, (
+        restaurant.name,
+        restaurant.cuisine_type,
+        f"{restaurant.rating:.1f}"
+    ), ()
+
+#Restaurant of the selected row, rows are keyed by restaurant_id
+def get_selected_restaurant():
     selection = restaurant_list.selection()
-    if not selection:
+    return restaurants.get(selection[0]) if selection else None
+
+def on_restaurant_select(event):
+    selected_restaurant = get_selected_restaurant()
+    if not selected_restaurant:
         return
     
-    restaurant_name = restaurant_list.item(selection[0])['values'][0]
-    selected_restaurant = next(r for r in restaurants.values() 
-                            if r.name == restaurant_name)
-    
     update_time_slots(selected_restaurant)
     update_available_tables()
 
+#Only offer times where the party can be seated, on one table or joined ones
 def update_time_slots(restaurant):
-    time_slots = rf.get_available_time_slots(restaurant, date_picker.get_date())
-    time_combo['values'] = time_slots
+    try:
+        party_size = int(party_size_var.get())
+    except ValueError:
+        party_size = 1
+    date_str = date_picker.get_date().strftime('%Y-%m-%d')
+    
+    def bookable_slots():
+        return restaurant.bookable_slots(date_str, party_size)
+    
+    def show(slots):
+        time_combo['values'] = slots
+    
+    tasks.submit('time_slots', bookable_slots, on_done=show)
+
+def on_booking_details_change(*args):
+    # Typing a party size fires once per key, only look up the last value
+    tasks.debounce('booking_details', 250, refresh_booking_details)
+
+def refresh_booking_details():
+    selected_restaurant = get_selected_restaurant()
+    if selected_restaurant:
+        update_time_slots(selected_restaurant)
+    update_available_tables()
 
 def update_available_tables(*args):
-    global table_mapping
-    
-    selection = restaurant_list.selection()
-    if not selection or not party_size_var.get():
+    restaurant = get_selected_restaurant()
+    if not restaurant or not party_size_var.get():
         return
     
-    restaurant_name = restaurant_list.item(selection[0])['values'][0]
-    restaurant = next(r for r in restaurants.values() if r.name == restaurant_name)
-    
     date_str = date_picker.get_date().strftime('%Y-%m-%d')
     time_str = time_combo.get()
-    party_size = int(party_size_var.get())
-    
-    available_tables = restaurant.get_available_tables(date_str, time_str, party_size)
-    
-    # Store table_id mapping
-    table_mapping = {f"Table {t['table_id']} ({t['size']} seats)": t['table_id'] 
-                    for t in available_tables}
+    if not time_str:
+        table_combo['values'] = []
+        show_alternatives([])
+        return
+    try:
+        party_size = int(party_size_var.get())
+    except ValueError:
+        return
     
-    table_combo['values'] = list(table_mapping.keys())
+    def show(available_tables):
+        global table_mapping
+        # Store table_id mapping
+        table_mapping = {f"Table {t['table_id']} ({t['size']} seats)": t['table_id'] 
+                        for t in available_tables}
+        
+        table_combo['values'] = list(table_mapping.keys())
+        if available_tables or alternatives_engine is None:
+            show_alternatives([])
+        else:
+            tasks.submit('alternatives', alternatives_engine.suggest, restaurant.restaurant_id,
+                         date_str, time_str, party_size, on_done=show_alternatives)
+    
+    # Smallest fitting tables only, so small parties don't take the big ones
+    tasks.submit('tables', restaurant.get_table_options, date_str, time_str, party_size, on_done=show)
+
+#List alternatives to a full slot, an empty list clears them
+def show_alternatives(found):
+    global alternatives
+    if not found:
+        tasks.cancel('alternatives')
+    alternatives = found
+    alternatives_list.delete(0, tk.END)
+    for alternative in found:
+        minutes = alternative['minutes_away']
+        when = f"{abs(minutes)} min {'later' if minutes > 0 else 'earlier'}" if minutes else "same time"
+        alternatives_list.insert(tk.END, f"{alternative['restaurant'].name} at {alternative['time']} ({when}), "
+                                         f"table {alternative['table_id']} ({alternative['seats']} seats)")
+
+def book_alternative(event=None):
+    selection = alternatives_list.curselection()
+    if not selection:
+        return
+    if not current_user:
+        messagebox.showerror("Error", "Please select a user first")
+        return
+    alternative = alternatives[selection[0]]
+    restaurant = alternative['restaurant']
+    date_str = date_picker.get_date().strftime('%Y-%m-%d')
+    if not messagebox.askyesno("Book Alternative", f"Book {restaurant.name} on {date_str} at {alternative['time']}?"):
+        return
+    submit_reservation(restaurant, date_str, alternative['time'], alternative['table_id'], int(party_size_var.get()))
 
 def make_reservation():
     global current_user
@@ -275,8 +479,8 @@ def make_reservation():
         messagebox.showerror("Error", "Please select a user first")
         return
         
-    selection = restaurant_list.selection()
-    if not selection:
+    restaurant = get_selected_restaurant()
+    if not restaurant:
         messagebox.showerror("Error", "Please select a restaurant")
         return
         
@@ -285,53 +489,75 @@ def make_reservation():
         messagebox.showerror("Error", "Please fill all booking details")
         return
         
-    restaurant_name = restaurant_list.item(selection[0])['values'][0]
-    restaurant = next(r for r in restaurants.values() if r.name == restaurant_name)
-    
     # Get table_id from mapping
     table_id = table_mapping.get(table_var.get())
     if not table_id:
         messagebox.showerror("Error", "Invalid table selection")
         return
     
+    submit_reservation(restaurant, date_picker.get_date().strftime('%Y-%m-%d'),
+                       time_combo.get(), table_id, int(party_size_var.get()))
+
+def submit_reservation(restaurant, date_str, time_str, table_id, party_size):
+    # A booking is already being written, don't send a second one
+    if tasks.pending('reserve'):
+        return
+    
+    def confirmed(booking_id):
+        messagebox.showinfo("Success", f"Booking confirmed! Booking ID: {booking_id}")
+        update_bookings_list()
+    
+    def failed(error):
+        if not isinstance(error, BookingConflictError):
+            raise error
+        messagebox.showerror("Error", "That table has just been booked, please pick another one")
+        update_available_tables()
+    
     # Make reservation
-    booking_id = current_user.make_reservation(
+    tasks.submit('reserve', current_user.make_reservation,
         restaurant.restaurant_id,
-        date_picker.get_date().strftime('%Y-%m-%d'),
-        time_combo.get(),
+        date_str,
+        time_str,
         table_id,
-        int(party_size_var.get())
+        party_size,
+        restaurant.default_duration,
+        on_done=confirmed, on_error=failed
     )
-    
-    messagebox.showinfo("Success", f"Booking confirmed! Booking ID: {booking_id}")
-    update_bookings_list()
 
 def on_user_select(event):
     global current_user
-    user_name = user_var.get()
-    current_user = next(u for u in users.values() if u.name == user_name)
+    user_id = user_labels.get(user_var.get())
+    if user_id is None:
+        return
+    current_user = users[user_id]
     update_bookings_list()
 
 def update_bookings_list():
-    # Clear current list
-    for item in bookings_list.get_children():
-        bookings_list.delete(item)
-        
     if not current_user:
+        bookings_view.set_items([], booking_row)
         return
         
-    # Get user's bookings
-    bookings = current_user.view_booking_history()
-    
-    # Update list
-    for booking in bookings:
-        restaurant = restaurants[booking['restaurant_id']]
-        bookings_list.insert('', 'end', values=(
-            booking['date'],
-            booking['time'],
-            restaurant.name,
-            booking['status']
-        ), tags=(booking['booking_id'],))
+    # User's bookings newest first, read a page at a time as the list scrolls.
+    # The count and first page are read on a worker.
+    user = current_user
+    def first_page():
+        bookings = PagedItems(user.booking_history_count(), lambda offset, limit: user.booking_history(offset=offset, limit=limit))
+        # Load the first page here rather than on the Tk thread
+        bookings[:bookings.page_size]
+        return bookings
+
+    tasks.submit('bookings', first_page, on_done=lambda bookings: bookings_view.set_items(bookings, booking_row))
+
+#Treeview row for a booking, keyed by its ID so refreshes can be diffed.
+#Shows the restaurant ID until the catalogue has loaded.
+def booking_row(booking):
+    restaurant = restaurants.get(booking['restaurant_id'])
+    return booking['booking_id'], (
+        booking['date'],
+        booking['time'],
+        restaurant.name if restaurant is not None else booking['restaurant_id'],
+        booking['status']
+    ), (booking['booking_id'],)
 
 def cancel_booking():
     global current_user
@@ -346,12 +572,17 @@ def cancel_booking():
         return
         
     booking_id = bookings_list.item(selection[0])['tags'][0]
+    if tasks.pending('cancel'):
+        return
     
-    if current_user.cancel_reservation(booking_id):
-        messagebox.showinfo("Success", "Booking cancelled successfully")
-        update_bookings_list()
-    else:
-        messagebox.showerror("Error", "Failed to cancel booking")
+    def cancelled(success):
+        if success:
+            messagebox.showinfo("Success", "Booking cancelled successfully")
+            update_bookings_list()
+        else:
+            messagebox.showerror("Error", "Failed to cancel booking")
+    
+    tasks.submit('cancel', current_user.cancel_reservation, booking_id, on_done=cancelled)
 
 if __name__ == "__main__":
     root = init_gui()
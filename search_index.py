@@ -0,0 +1,200 @@
+import heapq
+import re
+from bisect import bisect_left, insort
+
+# Runs of letters and digits in any script, so 'café' and '寿司' are words too
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+
+# How much a match in each field counts towards a restaurant's score
+FIELD_WEIGHTS = {'name': 3.0, 'cuisine_type': 2.0, 'location': 1.0}
+
+# How well a search term matched a token
+EXACT, PREFIX, INFIX, FUZZY = 1.0, 0.8, 0.5, 0.4
+
+#Lowercase words of a string
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+def _trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+#Trigrams a word starting with `term` shares with it, no end-of-word padding
+def _prefix_trigrams(term):
+    padded = f"  {term}"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+#Levenshtein distance, giving up early once it goes over `limit`
+def _edit_distance(a, b, limit):
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+def _typo_limit(term):
+    return 1 if len(term) <= 7 else 2
+
+
+#Token and trigram inverted index over restaurant name, cuisine and location.
+#Matches whole words, word prefixes and words containing the term; when none
+#of those match, words one or two typos away. Restaurants are ranked by where
+#and how well they matched.
+class RestaurantSearchIndex:
+    def __init__(self, restaurants=()):
+        self.restaurants = {}
+        # token -> {restaurant_id: best field weight of the token in that restaurant}
+        self.postings = {}
+        # Sorted vocabulary, for prefix lookups with bisect
+        self.vocabulary = []
+        # trigram -> tokens containing it, for infix and typo lookups
+        self.trigrams = {}
+        self._tokens_by_restaurant = {}
+        # Position of each restaurant by rating then name, to break score ties.
+        # Rebuilt lazily on the first search after the catalogue changes.
+        self._rank = None
+        # Ranked results of one and two letter queries, which match a large
+        # part of the catalogue and are typed on every new search
+        self._short_query_cache = {}
+        for restaurant in restaurants:
+            self.add(restaurant)
+
+    #Index a restaurant
+    def add(self, restaurant):
+        if restaurant.restaurant_id in self.restaurants:
+            self.remove(restaurant.restaurant_id)
+        self.restaurants[restaurant.restaurant_id] = restaurant
+        self._rank = None
+        self._short_query_cache.clear()
+
+        weights = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(getattr(restaurant, field)):
+                weights[token] = max(weights.get(token, 0), weight)
+
+        for token, weight in weights.items():
+            if token not in self.postings:
+                self.postings[token] = {}
+                insort(self.vocabulary, token)
+                for trigram in _trigrams(token):
+                    self.trigrams.setdefault(trigram, set()).add(token)
+            self.postings[token][restaurant.restaurant_id] = weight
+        self._tokens_by_restaurant[restaurant.restaurant_id] = list(weights)
+
+    #Remove a restaurant from the index
+    def remove(self, restaurant_id):
+        self.restaurants.pop(restaurant_id, None)
+        self._rank = None
+        self._short_query_cache.clear()
+        for token in self._tokens_by_restaurant.pop(restaurant_id, ()):
+            posting = self.postings[token]
+            posting.pop(restaurant_id, None)
+            if posting:
+                continue
+            del self.postings[token]
+            del self.vocabulary[bisect_left(self.vocabulary, token)]
+            for trigram in _trigrams(token):
+                tokens = self.trigrams[trigram]
+                tokens.discard(token)
+                if not tokens:
+                    del self.trigrams[trigram]
+
+    #Re-index a restaurant after its details changed
+    def update(self, restaurant):
+        self.add(restaurant)
+
+    #Tokens matching a search term, with how well they match
+    def _matching_tokens(self, term):
+        matches = {}
+        if term in self.postings:
+            matches[term] = EXACT
+
+        # Prefix: all tokens sorting between term and term + highest char
+        index = bisect_left(self.vocabulary, term)
+        while index < len(self.vocabulary) and self.vocabulary[index].startswith(term):
+            matches.setdefault(self.vocabulary[index], PREFIX)
+            index += 1
+
+        if len(term) < 3:
+            return matches
+
+        # Tokens sharing trigrams with the term are checked for containing it,
+        # and, only if nothing matched so far, for being a typo away from it
+        term_trigrams = _prefix_trigrams(term)
+        counts = {}
+        for trigram in term_trigrams:
+            for token in self.trigrams.get(trigram, ()):
+                counts[token] = counts.get(token, 0) + 1
+
+        for token in counts:
+            if token not in matches and term in token:
+                matches[token] = INFIX
+        if matches:
+            return matches
+
+        # Each typo can break at most three trigrams of the term
+        limit = _typo_limit(term)
+        needed = max(1, len(term_trigrams) - 3 * limit)
+        for token, count in counts.items():
+            if count >= needed and self._close_to_prefix(term, token, limit):
+                matches[token] = FUZZY
+        return matches
+
+    #Check if the term is within `limit` typos of the token or of one of its prefixes
+    @staticmethod
+    def _close_to_prefix(term, token, limit):
+        lengths = range(max(1, len(term) - limit), min(len(token), len(term) + limit) + 1)
+        return any(_edit_distance(term, token[:length], limit) <= limit for length in lengths)
+
+    #Search restaurants, best matches first, at most `limit` of them.
+    #Every term of the query has to match some word of the restaurant. A blank
+    #query returns every restaurant; one with no words in it, only punctuation,
+    #returns the restaurants containing it as a substring.
+    def search(self, query, limit=None):
+        terms = tokenize(query)
+        if not terms:
+            needle = query.strip().lower()
+            if not needle:
+                return list(self.restaurants.values())[:limit]
+            return [restaurant for restaurant in self.restaurants.values()
+                    if any(needle in getattr(restaurant, field).lower() for field in FIELD_WEIGHTS)][:limit]
+        if len(terms) == 1 and len(terms[0]) < 3:
+            results = self._short_query_cache.get(terms[0])
+            if results is None:
+                results = self._short_query_cache[terms[0]] = self._search(terms, None)
+            return results[:limit]
+        return self._search(terms, limit)
+
+    def _search(self, terms, limit):
+        scores = None
+        for term in terms:
+            term_scores = {}
+            for token, quality in self._matching_tokens(term).items():
+                for restaurant_id, weight in self.postings[token].items():
+                    score = quality * weight
+                    if score > term_scores.get(restaurant_id, 0):
+                        term_scores[restaurant_id] = score
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {restaurant_id: score + term_scores[restaurant_id] for restaurant_id, score in scores.items() if restaurant_id in term_scores}
+            if not scores:
+                return []
+
+        if self._rank is None:
+            ordered = sorted(self.restaurants.values(), key=lambda restaurant: (-restaurant.rating, restaurant.name))
+            self._rank = {restaurant.restaurant_id: position for position, restaurant in enumerate(ordered)}
+
+        # Fold score and tie-break into one int so sorting compares plain ints
+        rank = self._rank
+        span = len(rank) + 1
+        keys = {restaurant_id: -round(score * 1000) * span + rank[restaurant_id] for restaurant_id, score in scores.items()}
+        # Only the top `limit` need ordering when there is a limit
+        ranked = heapq.nsmallest(limit, keys, key=keys.get) if limit is not None else sorted(keys, key=keys.get)
+        return [self.restaurants[restaurant_id] for restaurant_id in ranked]
@@ -0,0 +1,255 @@
+import csv
+import json
+import multiprocessing
+import os
+import threading
+import zlib
+from booking_store import BookingStore, _row_values, journal_path_for
+from restaurant_classes import User
+from restaurant_functions import build_catalog, filter_restaurants, find_any_table, load_restaurants, search_restaurants
+from storage import CSVBackend, get_booking_store, set_backend
+
+# Position of the restaurant_id in the arguments of each method run_batch can route
+ROUTED_BY = {'get_available_tables': 0, 'allocate_table': 0, 'make_reservation': 1}
+
+#Shard that owns a restaurant, stable across runs and processes
+def shard_for(restaurant_id, shards):
+    return zlib.crc32(restaurant_id.encode()) % shards
+
+#Bookings file of one shard, e.g. bookings.2-of-4.csv
+def segment_path(directory, index, shards):
+    return os.path.join(directory, f"bookings.{index}-of-{shards}.csv")
+
+#File recording which bookings file the segments of a directory were split from
+def manifest_path(directory, shards):
+    return os.path.join(directory, f"bookings.{shards}-shards.json")
+
+#[path, size, mtime] of a bookings file and its journal, None for a missing one.
+#Segments are stale once the stamp of their source differs.
+def source_stamp(source):
+    stamp = []
+    for path in (source, journal_path_for(source)):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            stamp.append(None)
+        else:
+            stamp.append([os.path.abspath(path), st.st_size, st.st_mtime_ns])
+    return stamp
+
+#Source stamp the segments of a directory were split from, None if unknown
+def read_manifest(directory, shards):
+    try:
+        with open(manifest_path(directory, shards)) as file:
+            return json.load(file)['source']
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+#Split a bookings file into one segment per shard, with the journal's status
+#changes applied. Replaces any earlier segments and their journals, and records
+#the source in the directory's manifest. Returns the number of rows per shard.
+def split_bookings(source, directory, shards):
+    os.makedirs(directory, exist_ok=True)
+    stamp = source_stamp(source)
+    store = BookingStore(source)
+    files = [open(segment_path(directory, index, shards), 'w', newline='') for index in range(shards)]
+    counts = [0] * shards
+    try:
+        writers = [csv.writer(file) for file in files]
+        for writer in writers:
+            writer.writerow(store.fields)
+        for row in store.rows:
+            index = shard_for(row.restaurant_id, shards)
+            writers[index].writerow(_row_values(row))
+            counts[index] += 1
+    finally:
+        for file in files:
+            file.close()
+    # Status changes of the old segments don't apply to the new ones
+    for index in range(shards):
+        journal = journal_path_for(segment_path(directory, index, shards))
+        if os.path.exists(journal):
+            os.remove(journal)
+    with open(manifest_path(directory, shards), 'w') as file:
+        json.dump({'source': stamp}, file)
+    return counts
+
+
+#Main loop of a shard process. The shard loads only the restaurants it owns and
+#keeps the BookingStore of its own segment, then answers batches of
+#(method, args) requests with a list of (ok, result or exception).
+def _serve_shard(index, shards, restaurants_path, bookings_path, connection):
+    backend = set_backend(CSVBackend(restaurants_path, os.devnull, bookings_path))
+    restaurants = {restaurant_id: restaurant for restaurant_id, restaurant in load_restaurants(backend).items()
+                   if shard_for(restaurant_id, shards) == index}
+    get_booking_store()
+
+    def make_reservation(user_id, restaurant_id, date, time, table_id, party_size, duration=None):
+        return User(user_id, '', '', '').make_reservation(restaurant_id, date, time, table_id, party_size, duration)
+
+    def find_tables(restaurant_ids, date, party_size, after):
+        found = find_any_table({restaurant_id: restaurants[restaurant_id] for restaurant_id in restaurant_ids}, date, party_size, after)
+        return [{'restaurant_id': result['restaurant'].restaurant_id, 'time': result['time'], 'tables': result['tables']} for result in found]
+
+    handlers = {
+        'get_available_tables': lambda restaurant_id, *args: restaurants[restaurant_id].get_available_tables(*args),
+        'allocate_table': lambda restaurant_id, *args: restaurants[restaurant_id].allocate_table(*args),
+        'make_reservation': make_reservation,
+        'cancel_reservation': lambda user_id, booking_id: User(user_id, '', '', '').cancel_reservation(booking_id),
+        'find_tables': find_tables,
+    }
+    while True:
+        batch = connection.recv()
+        if batch is None:
+            break
+        replies = []
+        for method, args in batch:
+            try:
+                replies.append((True, handlers[method](*args)))
+            except Exception as exc:
+                replies.append((False, exc))
+        connection.send(replies)
+    connection.close()
+
+
+#Booking engine split by restaurant across worker processes. Each shard process
+#owns the bookings of its restaurants: their in-memory indexes and their own
+#segment file, so shards never contend on one bookings.csv.
+#The engine routes per-restaurant calls to the owning shard, and fans
+#cross-restaurant queries out to every shard in parallel before merging them.
+#Calls are thread safe; each shard serves one batch at a time.
+#Given a bookings_path, the segments are split from it on first use. If it has
+#changed since (including its journal) the engine raises ValueError rather than
+#serve stale segments; resplit=True splits it again, dropping the bookings made
+#through the engine since the last split.
+class ShardedEngine:
+    def __init__(self, directory, shards=None, restaurants_path='restaurants.csv', bookings_path=None, resplit=False):
+        self.shards = shards or os.cpu_count() or 1
+        self.directory = directory
+        if bookings_path is not None:
+            if not os.path.exists(segment_path(directory, 0, self.shards)):
+                split_bookings(bookings_path, directory, self.shards)
+            elif read_manifest(directory, self.shards) != source_stamp(bookings_path):
+                if not resplit:
+                    raise ValueError(f"Segments in {directory} weren't split from the current {bookings_path}, pass resplit=True to split it again")
+                split_bookings(bookings_path, directory, self.shards)
+        self.restaurants = load_restaurants(CSVBackend(restaurants_path, os.devnull, os.devnull))
+        self.catalog = build_catalog(self.restaurants)
+        # booking_id -> shard, for bookings made through this engine
+        self._booking_shards = {}
+
+        context = multiprocessing.get_context('spawn')
+        self._connections = []
+        self._processes = []
+        self._locks = []
+        for index in range(self.shards):
+            parent, child = context.Pipe()
+            process = context.Process(target=_serve_shard, name=f"booking-shard-{index}", daemon=True,
+                                      args=(index, self.shards, restaurants_path, segment_path(directory, index, self.shards), child))
+            process.start()
+            child.close()
+            self._connections.append(parent)
+            self._processes.append(process)
+            self._locks.append(threading.Lock())
+
+    def shard_of(self, restaurant_id):
+        if restaurant_id not in self.restaurants:
+            raise ValueError(f"Unknown restaurant {restaurant_id}")
+        return shard_for(restaurant_id, self.shards)
+
+    #Send each shard its batch, all before waiting for any, and return {shard: replies}
+    def _exchange(self, batches):
+        shards = sorted(batches)
+        # Locks taken in shard order so concurrent fan-outs can't deadlock
+        for shard in shards:
+            self._locks[shard].acquire()
+        try:
+            for shard in shards:
+                self._connections[shard].send(batches[shard])
+            return {shard: self._connections[shard].recv() for shard in shards}
+        finally:
+            for shard in shards:
+                self._locks[shard].release()
+
+    def _call(self, shard, method, *args):
+        ok, result = self._exchange({shard: [(method, args)]})[shard][0]
+        if not ok:
+            raise result
+        return result
+
+    #Run many (method, args) requests, args as the engine method takes them, with one
+    #round trip per shard. Returns the results in order, exceptions in place of failed ones.
+    def run_batch(self, requests):
+        batches = {}
+        positions = {}
+        for position, (method, args) in enumerate(requests):
+            shard = self.shard_of(args[ROUTED_BY[method]])
+            batches.setdefault(shard, []).append((method, tuple(args)))
+            positions.setdefault(shard, []).append(position)
+        results = [None] * len(requests)
+        for shard, replies in self._exchange(batches).items():
+            for position, (ok, result) in zip(positions[shard], replies):
+                results[position] = result
+                if ok and requests[position][0] == 'make_reservation':
+                    self._booking_shards[result] = shard
+        return results
+
+    def get_available_tables(self, restaurant_id, date, time, party_size, duration=None):
+        return self._call(self.shard_of(restaurant_id), 'get_available_tables', restaurant_id, date, time, party_size, duration)
+
+    def allocate_table(self, restaurant_id, date, time, party_size, duration=None):
+        return self._call(self.shard_of(restaurant_id), 'allocate_table', restaurant_id, date, time, party_size, duration)
+
+    #Book a table, raises BookingConflictError if it was taken meanwhile. Returns the booking ID.
+    def make_reservation(self, user_id, restaurant_id, date, time, table_id, party_size, duration=None):
+        shard = self.shard_of(restaurant_id)
+        booking_id = self._call(shard, 'make_reservation', user_id, restaurant_id, date, time, table_id, party_size, duration)
+        self._booking_shards[booking_id] = shard
+        return booking_id
+
+    #Cancel a booking. The shard is known for bookings made through this engine,
+    #others are looked for on every shard at once.
+    def cancel_reservation(self, user_id, booking_id):
+        shard = self._booking_shards.get(booking_id)
+        if shard is not None:
+            return self._call(shard, 'cancel_reservation', user_id, booking_id)
+        replies = self._exchange({shard: [('cancel_reservation', (user_id, booking_id))] for shard in range(self.shards)})
+        return any(ok and result for ok, result in (reply[0] for reply in replies.values()))
+
+    #Restaurants matching a search, from the engine's own catalog
+    def search(self, term):
+        return search_restaurants(self.catalog, term)
+
+    #Earliest bookable slot at or after `after` in every matching restaurant, soonest first.
+    #Matching is done here, then every shard checks its matching restaurants in parallel.
+    def find_table(self, date, party_size, after='00:00', search=None, cuisine_type=None, min_rating=None):
+        candidates = self.search(search) if search else self.restaurants.values()
+        if cuisine_type or min_rating is not None:
+            allowed = {restaurant.restaurant_id for restaurant in filter_restaurants(self.catalog, cuisine_type, min_rating)}
+            candidates = [restaurant for restaurant in candidates if restaurant.restaurant_id in allowed]
+        by_shard = {}
+        for restaurant in candidates:
+            by_shard.setdefault(shard_for(restaurant.restaurant_id, self.shards), []).append(restaurant.restaurant_id)
+        batches = {shard: [('find_tables', (restaurant_ids, date, party_size, after))] for shard, restaurant_ids in by_shard.items()}
+
+        results = []
+        for replies in self._exchange(batches).values():
+            ok, found = replies[0]
+            if not ok:
+                raise found
+            for result in found:
+                result['restaurant'] = self.restaurants[result.pop('restaurant_id')]
+            results += found
+        return sorted(results, key=lambda result: result['time'])
+
+    #Stop the shard processes
+    def close(self):
+        for shard, connection in enumerate(self._connections):
+            with self._locks[shard]:
+                try:
+                    connection.send(None)
+                except (BrokenPipeError, OSError):
+                    pass
+                connection.close()
+        for process in self._processes:
+            process.join(timeout=5)
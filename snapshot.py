@@ -0,0 +1,133 @@
+import os
+import pickle
+import struct
+from collections.abc import Mapping
+from metrics import timed
+from restaurant_classes import Restaurant, User
+from restaurant_functions import load_restaurants, unique_labels
+from storage import CSVBackend, get_backend
+
+# Bump when the layout of the rows below changes, older snapshots are then rebuilt
+SNAPSHOT_VERSION = 1
+MAGIC = b'RMSNAP'
+_HEADER = struct.Struct('>6sH')
+
+#Default snapshot file, next to the restaurants CSV
+def snapshot_path(backend):
+    return os.path.join(os.path.dirname(os.path.abspath(backend.restaurants_path)), 'catalog.snapshot')
+
+#(size, mtime) of each source CSV, a snapshot is stale once any of them differs
+def source_stamp(backend):
+    stamp = []
+    for path in (backend.restaurants_path, backend.users_path):
+        st = os.stat(path)
+        stamp.append((os.path.abspath(path), st.st_size, st.st_mtime_ns))
+    return stamp
+
+
+#Records materialised the first time they are looked up. Until then a record is
+#the tuple of its constructor arguments, which is all a snapshot load builds.
+#Reads like the plain {id: record} dict returned by the load_* functions.
+class LazyRecords(Mapping):
+    def __init__(self, rows, factory):
+        # id -> constructor arguments after the id
+        self.rows = rows
+        self.factory = factory
+        self._records = {}
+
+    def __getitem__(self, record_id):
+        record = self._records.get(record_id)
+        if record is None:
+            record = self._records[record_id] = self.factory(record_id, *self.rows[record_id])
+        return record
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, record_id):
+        return record_id in self.rows
+
+    #Number of records built so far
+    def materialised(self):
+        return len(self._records)
+
+
+#Restaurants and users as read from a snapshot file
+class Snapshot:
+    def __init__(self, stamp, restaurant_rows, user_rows, user_labels):
+        self.stamp = stamp
+        # Restaurant constructor arguments with rating, tables and hours already parsed
+        self.restaurant_rows = restaurant_rows
+        # user_id -> (name, email, phone_number)
+        self.user_rows = user_rows
+        # Pick list label -> user_id, as rf.name_labels would give
+        self.user_labels = user_labels
+        self.rebuilt = False
+
+    #{restaurant_id: Restaurant}, built on every call
+    def restaurants(self):
+        return {row[0]: Restaurant(*row) for row in self.restaurant_rows}
+
+    #Users materialised on first lookup
+    def users(self):
+        return LazyRecords(self.user_rows, User)
+
+
+#Read the CSVs of a backend into a Snapshot
+def build_snapshot(backend):
+    stamp = source_stamp(backend)
+    restaurant_rows = [(r.restaurant_id, r.name, r.cuisine_type, r.rating, r.location, r.total_tables, r.table_configuration,
+                        r.opening_hours, r.closing_hours, r.default_duration) for r in load_restaurants(backend).values()]
+    user_rows = {row['user_id']: (row['name'], row['email'], row['phone_number']) for row in backend.user_rows()}
+    user_labels = unique_labels({user_id: row[0] for user_id, row in user_rows.items()})
+    return Snapshot(stamp, restaurant_rows, user_rows, user_labels)
+
+#Write a snapshot atomically: the file holds a magic and version header, then the
+#pickled source stamp, so a stale file is detected without reading the rest
+@timed()
+def write_snapshot(snapshot, path):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(_HEADER.pack(MAGIC, SNAPSHOT_VERSION))
+        pickle.dump(snapshot.stamp, file, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump((snapshot.restaurant_rows, snapshot.user_rows, snapshot.user_labels), file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+#Snapshot in `path` if it exists, has the current version and was taken from
+#files matching `stamp`, otherwise None
+@timed()
+def read_snapshot(path, stamp):
+    try:
+        with open(path, 'rb') as file:
+            magic, version = _HEADER.unpack(file.read(_HEADER.size))
+            if magic != MAGIC or version != SNAPSHOT_VERSION:
+                return None
+            if pickle.load(file) != stamp:
+                return None
+            restaurant_rows, user_rows, user_labels = pickle.load(file)
+    except (OSError, EOFError, struct.error, pickle.UnpicklingError, ValueError, TypeError):
+        return None
+    return Snapshot(stamp, restaurant_rows, user_rows, user_labels)
+
+#Restaurants and users of a CSV backend, the active one unless given, from its
+#snapshot file. The snapshot is rebuilt from the CSVs first when it is missing,
+#from another version, or older than either CSV.
+@timed()
+def load_snapshot(backend=None, path=None):
+    backend = backend or get_backend()
+    if not isinstance(backend, CSVBackend):
+        raise TypeError(f"Snapshots are taken of CSV files, not {type(backend).__name__}")
+    path = path or snapshot_path(backend)
+    snapshot = read_snapshot(path, source_stamp(backend))
+    if snapshot is None:
+        snapshot = build_snapshot(backend)
+        snapshot.rebuilt = True
+        try:
+            write_snapshot(snapshot, path)
+        except OSError:
+            # Read-only directory, the data is still good for this run
+            pass
+    return snapshot
@@ -0,0 +1,346 @@
+import sqlite3
+import sys
+import threading
+import metrics
+from booking_store import BOOKING_FIELDS, DEFAULT_DURATION, BookingConflictError, booking_duration, date_bound, time_to_minutes
+from storage import RESTAURANT_FIELDS, USER_FIELDS, CSVBackend
+from table_allocation import split_table_id
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS restaurants (
+    restaurant_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    cuisine_type TEXT,
+    rating REAL,
+    location TEXT,
+    total_tables INTEGER,
+    table_configuration TEXT,
+    opening_hours TEXT,
+    closing_hours TEXT,
+    dining_duration INTEGER
+);
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT,
+    phone_number TEXT
+);
+CREATE TABLE IF NOT EXISTS bookings (
+    booking_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    restaurant_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    table_id TEXT NOT NULL,
+    party_size INTEGER,
+    status TEXT NOT NULL,
+    duration INTEGER NOT NULL DEFAULT 90,
+    start_min INTEGER
+);
+"""
+
+INDEXES = """
+DROP INDEX IF EXISTS idx_bookings_slot;
+DROP INDEX IF EXISTS idx_bookings_user;
+CREATE INDEX IF NOT EXISTS idx_bookings_day ON bookings (restaurant_id, date, status, start_min);
+CREATE INDEX IF NOT EXISTS idx_bookings_user_date ON bookings (user_id, date, time);
+"""
+
+# start_min is the booking time as minutes since midnight, so overlap checks
+# are a range scan on idx_bookings_day
+
+# Statements are kept as constants so sqlite3's statement cache reuses the
+# prepared form on every call
+SELECT_BOOKED_TABLES = "SELECT DISTINCT table_id FROM bookings WHERE restaurant_id = ? AND date = ? AND status = 'active' AND start_min < ? AND start_min + duration > ?"
+SELECT_DAY_BOOKINGS = "SELECT table_id, start_min, duration FROM bookings WHERE restaurant_id = ? AND date = ? AND status = 'active' AND start_min IS NOT NULL"
+SELECT_BOOKING = "SELECT booking_id, user_id, restaurant_id, date, time, table_id, party_size, status, duration FROM bookings WHERE booking_id = ?"
+SELECT_USER_BOOKINGS = "SELECT booking_id, user_id, restaurant_id, date, time, table_id, party_size, status, duration FROM bookings WHERE user_id = ? ORDER BY rowid"
+# Pages of a user's history, walked along idx_bookings_user_date. The date
+# bounds default to '' and a value sorting after every date.
+SELECT_USER_HISTORY = "SELECT booking_id, user_id, restaurant_id, date, time, table_id, party_size, status, duration FROM bookings WHERE user_id = ? AND date >= ? AND date <= ? AND (? = 0 OR status = 'active') ORDER BY date {order}, time {order}, rowid {order} LIMIT ? OFFSET ?"
+SELECT_USER_HISTORY_NEWEST = SELECT_USER_HISTORY.format(order='DESC')
+SELECT_USER_HISTORY_OLDEST = SELECT_USER_HISTORY.format(order='ASC')
+COUNT_USER_HISTORY = "SELECT COUNT(*) FROM bookings WHERE user_id = ? AND date >= ? AND date <= ? AND (? = 0 OR status = 'active')"
+INSERT_BOOKING = "INSERT INTO bookings (booking_id, user_id, restaurant_id, date, time, table_id, party_size, status, duration, start_min) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+UPDATE_STATUS = "UPDATE bookings SET status = ? WHERE booking_id = ? AND user_id = ?"
+UPDATE_STATUS_EXPECTED = "UPDATE bookings SET status = ? WHERE booking_id = ? AND user_id = ? AND status = ?"
+SELECT_BOOKING_EXISTS = "SELECT 1 FROM bookings WHERE booking_id = ?"
+SELECT_DINING_DURATION = "SELECT dining_duration FROM restaurants WHERE restaurant_id = ?"
+IMPORT_BOOKING = "INSERT OR REPLACE INTO bookings (booking_id, user_id, restaurant_id, date, time, table_id, party_size, status, duration, start_min) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+INSERT_RESTAURANT = "INSERT OR REPLACE INTO restaurants VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+INSERT_USER = "INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?)"
+
+
+#Open a database with WAL journaling and the schema in place
+def connect(db_path):
+    conn = sqlite3.connect(db_path, check_same_thread=False, cached_statements=64)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript(SCHEMA)
+    _migrate(conn)
+    conn.executescript(INDEXES)
+    return conn
+
+#Add columns that databases created by older versions are missing
+def _migrate(conn):
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(bookings)')}
+    with conn:
+        if 'duration' not in columns:
+            conn.execute(f'ALTER TABLE bookings ADD COLUMN duration INTEGER NOT NULL DEFAULT {DEFAULT_DURATION}')
+        if 'start_min' not in columns:
+            conn.execute('ALTER TABLE bookings ADD COLUMN start_min INTEGER')
+            conn.execute("UPDATE bookings SET start_min = CAST(substr(time, 1, 2) AS INTEGER) * 60 + CAST(substr(time, 4, 2) AS INTEGER)")
+        if 'dining_duration' not in {row[1] for row in conn.execute('PRAGMA table_info(restaurants)')}:
+            conn.execute('ALTER TABLE restaurants ADD COLUMN dining_duration INTEGER')
+
+#Column values for inserting a booking row, a blank duration stored as `default_duration`
+def _booking_values(row, default_duration=DEFAULT_DURATION):
+    try:
+        start = time_to_minutes(row['time'])
+    except ValueError:
+        start = None
+    return [row[field] for field in BOOKING_FIELDS if field != 'duration'] + [booking_duration(row, default_duration), start]
+
+
+#Query parameters for a user's history, dates checked like BookingStore does
+def _history_params(user_id, active_only, start_date, end_date):
+    for date in (start_date, end_date):
+        if date:
+            date_bound(date)
+    return (user_id, start_date or '', end_date or '\uffff', int(active_only))
+
+def _booking_dict(values):
+    booking = dict(zip(BOOKING_FIELDS, values))
+    booking['party_size'] = str(booking['party_size'])
+    booking['duration'] = str(booking['duration'])
+    return booking
+
+
+#Booking store backed by SQLite, same methods as BookingStore
+class SQLiteBookingStore:
+    def __init__(self, conn, lock):
+        self.conn = conn
+        self._lock = lock
+        self.release_listeners = []
+
+    #Same as BookingStore.add_release_listener
+    def add_release_listener(self, listener):
+        self.release_listeners.append(listener)
+
+    #Same as BookingStore.default_duration
+    def default_duration(self, restaurant_id):
+        with self._lock:
+            row = self.conn.execute(SELECT_DINING_DURATION, (restaurant_id,)).fetchone()
+        return int(row[0]) if row and row[0] else DEFAULT_DURATION
+
+    #Get the tables held at any point of a `duration` minute stay starting at `time`,
+    #by default as long as the restaurant's usual stay
+    def get_booked_tables(self, restaurant_id, date, time, duration=None):
+        start = time_to_minutes(time)
+        duration = duration or self.default_duration(restaurant_id)
+        with self._lock:
+            rows = self.conn.execute(SELECT_BOOKED_TABLES, (restaurant_id, date, start + duration, start)).fetchall()
+        metrics.add('rows_scanned', len(rows))
+        # Joined tables are stored as one ID like 'T4_1+T4_2'
+        return {table_id for row in rows for table_id in split_table_id(row[0])}
+
+    #Get (table_id, start, duration) of every active booking at a restaurant on a day
+    def day_bookings(self, restaurant_id, date):
+        with self._lock:
+            rows = self.conn.execute(SELECT_DAY_BOOKINGS, (restaurant_id, date)).fetchall()
+        return [(table_id, start, duration) for joined, start, duration in rows for table_id in split_table_id(joined)]
+
+    #Insert a new booking, without a conflict check
+    def add_booking(self, booking_data):
+        row = {field: str(booking_data.get(field, '')) for field in BOOKING_FIELDS}
+        default_duration = self.default_duration(row['restaurant_id'])
+        with self._lock, self.conn:
+            self.conn.execute(INSERT_BOOKING, _booking_values(row, default_duration))
+        return row
+
+    #Check the table is free for the whole stay and book it in one write transaction.
+    #A booking without a duration gets the restaurant's default one.
+    #Raises BookingConflictError if the table is taken at any point of it.
+    def reserve(self, booking_data):
+        booking_data = dict(booking_data)
+        if not booking_data.get('duration'):
+            booking_data['duration'] = self.default_duration(booking_data['restaurant_id'])
+        row = {field: str(booking_data[field]) for field in BOOKING_FIELDS}
+        start = time_to_minutes(row['time'])
+        end = start + booking_duration(row)
+        with self._lock:
+            # IMMEDIATE takes the database write lock up front, so no other
+            # connection can insert between our check and our insert
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                busy = self.conn.execute(SELECT_BOOKED_TABLES, (row['restaurant_id'], row['date'], end, start)).fetchall()
+                busy_tables = {table_id for (joined,) in busy for table_id in split_table_id(joined)}
+                if not busy_tables.isdisjoint(split_table_id(row['table_id'])):
+                    raise BookingConflictError(row['restaurant_id'], row['date'], row['time'], row['table_id'])
+                self.conn.execute(INSERT_BOOKING, _booking_values(row))
+            except BaseException:
+                self.conn.rollback()
+                raise
+            self.conn.commit()
+        return row
+
+    #Book a batch of rows in one write transaction, same result as BookingStore.reserve_many
+    def reserve_many(self, rows):
+        accepted = []
+        rejected = []
+        with self._lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                for booking_data in rows:
+                    row = {field: str(booking_data.get(field, '')) for field in BOOKING_FIELDS}
+                    row['duration'] = row['duration'] or str(self.default_duration(row['restaurant_id']))
+                    if self.conn.execute(SELECT_BOOKING_EXISTS, (row['booking_id'],)).fetchone():
+                        rejected.append((row, f"Duplicate booking ID {row['booking_id']}"))
+                        continue
+                    if row['status'] == 'active':
+                        try:
+                            start = time_to_minutes(row['time'])
+                            end = start + booking_duration(row)
+                        except ValueError:
+                            rejected.append((row, f"Invalid time or duration for {row['booking_id']}"))
+                            continue
+                        # Rows inserted earlier in this transaction are seen here too
+                        busy = self.conn.execute(SELECT_BOOKED_TABLES, (row['restaurant_id'], row['date'], end, start)).fetchall()
+                        busy_tables = {table_id for (joined,) in busy for table_id in split_table_id(joined)}
+                        if not busy_tables.isdisjoint(split_table_id(row['table_id'])):
+                            rejected.append((row, str(BookingConflictError(row['restaurant_id'], row['date'], row['time'], row['table_id']))))
+                            continue
+                    self.conn.execute(INSERT_BOOKING, _booking_values(row))
+                    accepted.append(row)
+            except BaseException:
+                self.conn.rollback()
+                raise
+            self.conn.commit()
+        return accepted, rejected
+
+    #Iterate bookings in insertion order, optionally only some restaurants and an
+    #inclusive date range. Rows are fetched `chunk_size` at a time.
+    def iter_bookings(self, restaurant_ids=None, start_date=None, end_date=None, chunk_size=1000):
+        query = "SELECT rowid, booking_id, user_id, restaurant_id, date, time, table_id, party_size, status, duration FROM bookings WHERE rowid > ? AND date >= ? AND date <= ?"
+        params = [start_date or '', end_date or '\uffff']
+        if restaurant_ids is not None:
+            restaurant_ids = list(restaurant_ids)
+            query += f" AND restaurant_id IN ({', '.join('?' * len(restaurant_ids))})"
+            params += restaurant_ids
+        query += " ORDER BY rowid LIMIT ?"
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self.conn.execute(query, [last_rowid] + params + [chunk_size]).fetchall()
+            for row in rows:
+                yield _booking_dict(row[1:])
+            if len(rows) < chunk_size:
+                return
+            last_rowid = rows[-1][0]
+
+    #Mark a user's active booking as cancelled, returns False if nothing changed
+    def cancel_booking(self, booking_id, user_id):
+        return self.set_status(booking_id, user_id, 'cancelled', expected='active')
+
+    #Update a booking's status, optionally only if it currently has `expected`
+    def set_status(self, booking_id, user_id, status, expected=None):
+        freed = None
+        with self._lock, self.conn:
+            # The row before the update, only needed to tell listeners a table was freed
+            before = self.conn.execute(SELECT_BOOKING, (booking_id,)).fetchone() if self.release_listeners else None
+            if expected is None:
+                cursor = self.conn.execute(UPDATE_STATUS, (status, booking_id, user_id))
+            else:
+                cursor = self.conn.execute(UPDATE_STATUS_EXPECTED, (status, booking_id, user_id, expected))
+            if cursor.rowcount > 0 and before is not None:
+                freed = _booking_dict(before)
+        if freed is None or freed['status'] != 'active' or status == 'active':
+            return cursor.rowcount > 0
+        freed['status'] = status
+        for listener in self.release_listeners:
+            listener(freed)
+        return True
+
+    #Retrieve booking details by booking ID
+    def get_booking(self, booking_id):
+        with self._lock:
+            row = self.conn.execute(SELECT_BOOKING, (booking_id,)).fetchone()
+        return _booking_dict(row) if row is not None else None
+
+    #Get all bookings made by a user, in insertion order
+    def user_bookings(self, user_id):
+        with self._lock:
+            rows = self.conn.execute(SELECT_USER_BOOKINGS, (user_id,)).fetchall()
+        return [_booking_dict(row) for row in rows]
+
+    #Lazily iterate a user's bookings ordered by date and time, same arguments as
+    #BookingStore.user_history. Rows are fetched `chunk_size` at a time.
+    def user_history(self, user_id, active_only=False, start_date=None, end_date=None, newest_first=True, offset=0, limit=None, chunk_size=100):
+        query = SELECT_USER_HISTORY_NEWEST if newest_first else SELECT_USER_HISTORY_OLDEST
+        params = _history_params(user_id, active_only, start_date, end_date)
+        return self._history_chunks(query, params, offset, limit, chunk_size)
+
+    #Same as BookingStore.user_history_count
+    def user_history_count(self, user_id, active_only=False, start_date=None, end_date=None):
+        with self._lock:
+            return self.conn.execute(COUNT_USER_HISTORY, _history_params(user_id, active_only, start_date, end_date)).fetchone()[0]
+
+    def _history_chunks(self, query, params, offset, limit, chunk_size):
+        while True:
+            size = chunk_size if limit is None else min(chunk_size, limit)
+            with self._lock:
+                rows = self.conn.execute(query, params + (size, offset)).fetchall()
+            for row in rows:
+                yield _booking_dict(row)
+            if len(rows) < size:
+                return
+            offset += size
+            if limit is not None:
+                limit -= size
+                if limit <= 0:
+                    return
+
+
+#Storage backend keeping restaurants, users and bookings in one SQLite file
+class SQLiteBackend:
+    def __init__(self, db_path='restaurants.db'):
+        self.db_path = db_path
+        self.conn = connect(db_path)
+        self._lock = threading.RLock()
+        self.bookings = SQLiteBookingStore(self.conn, self._lock)
+
+    def restaurant_rows(self):
+        return self._rows('SELECT * FROM restaurants ORDER BY rowid', RESTAURANT_FIELDS)
+
+    def user_rows(self):
+        return self._rows('SELECT * FROM users ORDER BY rowid', USER_FIELDS)
+
+    def _rows(self, query, fields):
+        with self._lock:
+            rows = self.conn.execute(query).fetchall()
+        return [dict(zip(fields, ('' if value is None else str(value) for value in row))) for row in rows]
+
+    def close(self):
+        self.conn.close()
+
+
+#One-shot import of the CSV files (and booking journal) into a SQLite database
+def import_csv(db_path='restaurants.db', restaurants_path='restaurants.csv', users_path='users.csv', bookings_path='bookings.csv'):
+    source = CSVBackend(restaurants_path, users_path, bookings_path)
+    conn = connect(db_path)
+    try:
+        with conn:
+            conn.executemany(INSERT_RESTAURANT, ([row.get(field) for field in RESTAURANT_FIELDS] for row in source.restaurant_rows()))
+            conn.executemany(INSERT_USER, ([row[field] for field in USER_FIELDS] for row in source.user_rows()))
+            # BookingStore replays the journal, so the imported statuses are current
+            bookings = source.bookings
+            conn.executemany(IMPORT_BOOKING, (_booking_values(row, bookings.default_duration(row.restaurant_id)) for row in bookings.rows))
+        return conn.execute('SELECT COUNT(*) FROM bookings').fetchone()[0]
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'restaurants.db'
+    count = import_csv(db_path)
+    print(f"Imported {count} bookings into {db_path}")
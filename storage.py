@@ -0,0 +1,67 @@
+import csv
+import os
+import metrics
+from booking_store import BookingStore
+
+RESTAURANT_FIELDS = ['restaurant_id', 'name', 'cuisine_type', 'rating', 'location', 'total_tables', 'table_configuration', 'opening_hours', 'closing_hours', 'dining_duration']
+USER_FIELDS = ['user_id', 'name', 'email', 'phone_number']
+
+
+#Default backend, reads the CSV files from the working directory
+class CSVBackend:
+    def __init__(self, restaurants_path='restaurants.csv', users_path='users.csv', bookings_path='bookings.csv'):
+        self.restaurants_path = restaurants_path
+        self.users_path = users_path
+        self.bookings_path = bookings_path
+        self._bookings = None
+
+    #Booking store is only loaded the first time bookings are needed
+    @property
+    def bookings(self):
+        if self._bookings is None:
+            try:
+                durations = dining_durations(self.restaurant_rows())
+            except FileNotFoundError:
+                durations = {}
+            self._bookings = BookingStore(self.bookings_path, default_durations=durations)
+        return self._bookings
+
+    def restaurant_rows(self):
+        return _read_rows(self.restaurants_path)
+
+    def user_rows(self):
+        return _read_rows(self.users_path)
+
+
+#restaurant_id -> dining_duration of the restaurant rows that set one
+def dining_durations(rows):
+    return {row['restaurant_id']: int(row['dining_duration']) for row in rows if row.get('dining_duration')}
+
+def _read_rows(path):
+    with open(path, 'r', newline='') as file:
+        rows = 0
+        for row in csv.DictReader(file):
+            rows += 1
+            yield row
+        metrics.add('rows_scanned', rows)
+        metrics.add('bytes_read', os.fstat(file.fileno()).st_size)
+
+
+_backend = None
+
+#Get the active storage backend, CSV files unless set_backend() was called
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = CSVBackend()
+    return _backend
+
+#Switch the storage backend used by load_* functions and booking methods
+def set_backend(backend):
+    global _backend
+    _backend = backend
+    return backend
+
+#Get the booking store of the active backend
+def get_booking_store():
+    return get_backend().bookings
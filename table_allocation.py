@@ -0,0 +1,140 @@
+from itertools import groupby
+
+JOIN_SEPARATOR = '+'
+
+#Split a table ID into the tables it is made of, 'T4_1+T4_2' -> ['T4_1', 'T4_2']
+def split_table_id(table_id):
+    return table_id.split(JOIN_SEPARATOR)
+
+def join_table_ids(table_ids):
+    return JOIN_SEPARATOR.join(table_ids)
+
+#Get (size, number) from a table ID such as 'T4_2'
+def parse_table_id(table_id):
+    size, number = table_id[1:].split('_')
+    return int(size), int(number)
+
+
+#A table, or a run of adjacent tables pushed together, that can seat a party
+class TableOption:
+    def __init__(self, table_ids, seats):
+        self.table_ids = tuple(table_ids)
+        self.seats = seats
+
+    @property
+    def table_id(self):
+        return join_table_ids(self.table_ids)
+
+    def waste(self, party_size):
+        return self.seats - party_size
+
+    def as_dict(self):
+        return {'table_id': self.table_id, 'size': self.seats}
+
+
+#Smallest free table that seats the party, None if no single table does
+def best_fit_table(free_tables, party_size):
+    fitting = [table for table in free_tables if table['size'] >= party_size]
+    if not fitting:
+        return None
+    return min(fitting, key=lambda table: table['size'])
+
+#First free table that seats the party, what picking the top of the list gives
+def first_fit_table(free_tables, party_size):
+    return next((table for table in free_tables if table['size'] >= party_size), None)
+
+#Runs of consecutively numbered tables of the same size, e.g. T2_3 + T2_4
+def _adjacent_runs(free_tables, max_join):
+    numbered = sorted((parse_table_id(table['table_id']), table['table_id']) for table in free_tables)
+    runs = []
+    for size, group in groupby(numbered, key=lambda item: item[0][0]):
+        group = list(group)
+        for i in range(len(group)):
+            for j in range(i + 1, min(i + max_join, len(group))):
+                # Stop at the first gap in the numbering
+                if group[j][0][1] != group[j - 1][0][1] + 1:
+                    break
+                runs.append(TableOption([table_id for _, table_id in group[i:j + 1]], size * (j - i + 1)))
+    return runs
+
+#All ways to seat a party, fewest wasted seats first, then fewest tables
+def table_options(free_tables, party_size, allow_join=True, max_join=3):
+    options = [TableOption([table['table_id']], table['size']) for table in free_tables if table['size'] >= party_size]
+    if allow_join:
+        options += [run for run in _adjacent_runs(free_tables, max_join) if run.seats >= party_size]
+    options.sort(key=lambda option: (option.waste(party_size), len(option.table_ids)))
+    return options
+
+#Best way to seat one party, joining tables only when no single table fits
+def allocate(free_tables, party_size, allow_join=True, max_join=3):
+    options = table_options(free_tables, party_size, allow_join=False)
+    if not options and allow_join:
+        options = table_options(free_tables, party_size, allow_join=True, max_join=max_join)
+    return options[0] if options else None
+
+
+#Seat a list of party sizes on the free tables of one slot, maximising seated covers.
+#Uses a branch and bound search for up to `exact_limit` parties, which gives up
+#after `node_limit` search nodes and keeps the best seating found, and a greedy
+#pass for larger batches.
+#Returns one TableOption (or None if the party isn't seated) per party, in input order.
+def assign_batch(free_tables, party_sizes, allow_join=True, max_join=3, exact_limit=8, node_limit=200000):
+    if len(party_sizes) <= exact_limit:
+        return _assign_exact(free_tables, party_sizes, allow_join, max_join, node_limit)
+    return assign_greedy(free_tables, party_sizes, allow_join, max_join)
+
+#Seat the largest parties first, each on its best fitting option
+def assign_greedy(free_tables, party_sizes, allow_join=True, max_join=3):
+    assignment = [None] * len(party_sizes)
+    free = list(free_tables)
+    for i in sorted(range(len(party_sizes)), key=lambda i: -party_sizes[i]):
+        option = allocate(free, party_sizes[i], allow_join, max_join)
+        if option is not None:
+            assignment[i] = option
+            used = set(option.table_ids)
+            free = [table for table in free if table['table_id'] not in used]
+    return assignment
+
+def _assign_exact(free_tables, party_sizes, allow_join, max_join, node_limit):
+    order = sorted(range(len(party_sizes)), key=lambda i: -party_sizes[i])
+    options = {i: table_options(free_tables, party_sizes[i], allow_join, max_join) for i in order}
+    # Seats still wanted by the parties after position k, for the bound
+    remaining = [sum(party_sizes[i] for i in order[k:]) for k in range(len(order) + 1)]
+
+    total_seats = sum(table['size'] for table in free_tables)
+
+    greedy = assign_greedy(free_tables, party_sizes, allow_join, max_join)
+    best = {'score': _score(greedy, party_sizes), 'assignment': greedy}
+    current = [None] * len(party_sizes)
+    nodes = [0]
+
+    def search(k, used, seats_used, covers, waste):
+        nodes[0] += 1
+        if nodes[0] > node_limit:
+            return
+        if k == len(order):
+            if (covers, -waste) > best['score']:
+                best['score'] = (covers, -waste)
+                best['assignment'] = list(current)
+            return
+        # Even seating everyone left, or filling every free seat, can't beat
+        # the best found so far (waste only grows, so ties need less of it)
+        reachable = covers + min(remaining[k], total_seats - seats_used)
+        if (reachable, -waste) <= best['score']:
+            return
+        i = order[k]
+        for option in options[i]:
+            if used.isdisjoint(option.table_ids):
+                current[i] = option
+                search(k + 1, used | set(option.table_ids), seats_used + option.seats, covers + party_sizes[i], waste + option.waste(party_sizes[i]))
+                current[i] = None
+        search(k + 1, used, seats_used, covers, waste)
+
+    search(0, frozenset(), 0, 0, 0)
+    return best['assignment']
+
+#(seated covers, -wasted seats) of an assignment, higher is better
+def _score(assignment, party_sizes):
+    covers = sum(size for option, size in zip(assignment, party_sizes) if option is not None)
+    waste = sum(option.waste(size) for option, size in zip(assignment, party_sizes) if option is not None)
+    return (covers, -waste)
@@ -0,0 +1,42 @@
+import pytest
+from booking_store import BookingStore
+from sqlite_store import SQLiteBackend
+
+BOOKINGS = """booking_id,user_id,restaurant_id,date,time,table_id,party_size,status
+B001,U001,R001,2026-10-28,19:00,T002,4,active
+B002,U001,R003,2026-11-02,20:00,T001,2,cancelled
+B003,U001,R002,2026-11-15,12:30,T003,2,active
+B004,U002,R001,2026-11-02,19:00,T001,2,active
+"""
+
+
+@pytest.fixture(params=['csv', 'sqlite'])
+def store(request, tmp_path):
+    path = tmp_path / 'bookings.csv'
+    path.write_text(BOOKINGS)
+    if request.param == 'csv':
+        yield BookingStore(str(path))
+        return
+    backend = SQLiteBackend(str(tmp_path / 'bookings.db'))
+    for row in BookingStore(str(path)).rows:
+        backend.bookings.add_booking(dict(row))
+    yield backend.bookings
+    backend.close()
+
+def booking_ids(bookings):
+    return [booking['booking_id'] for booking in bookings]
+
+
+def test_history_in_date_range(store):
+    assert booking_ids(store.user_history('U001', start_date='2026-11-01', end_date='2026-11-15')) == ['B003', 'B002']
+    assert booking_ids(store.user_history('U001', end_date='2026-11-02', newest_first=False)) == ['B001', 'B002']
+    assert store.user_history_count('U001', active_only=True, start_date='2026-11-01') == 1
+
+@pytest.mark.parametrize('date', ['20261101', '2026-1-1', '01/11/2026', '2026-11-01 '])
+def test_history_rejects_malformed_dates(store, date):
+    with pytest.raises(ValueError):
+        store.user_history('U001', start_date=date)
+    with pytest.raises(ValueError):
+        store.user_history('U001', end_date=date)
+    with pytest.raises(ValueError):
+        store.user_history_count('U001', start_date=date)
@@ -0,0 +1,33 @@
+import pytest
+from bulk_bookings import BookingValidator
+from restaurant_classes import Restaurant
+
+
+def make_validator():
+    restaurant = Restaurant('R001', 'The Grand Kitchen', 'Italian', 4.5, '123 Main St, Downtown', 10, '2:3,4:4,6:3', '10:00', '22:00')
+    return BookingValidator({'R001': restaurant})
+
+def booking_row(**changes):
+    row = {'booking_id': 'B100', 'user_id': 'U001', 'restaurant_id': 'R001', 'date': '2026-11-02',
+           'time': '19:30', 'table_id': 'T2_1', 'party_size': '2', 'status': ''}
+    row.update(changes)
+    return row
+
+
+def test_clean_keeps_canonical_date_and_time():
+    cleaned = make_validator().clean(booking_row(time='10:30'))
+    assert (cleaned['date'], cleaned['time'], cleaned['status']) == ('2026-11-02', '10:30', 'active')
+
+@pytest.mark.parametrize('time', ['9:30', '10:5', '1030', '10:30:00', '24:00'])
+def test_clean_rejects_non_canonical_times(time):
+    with pytest.raises(ValueError, match='Invalid time'):
+        make_validator().clean(booking_row(time=time))
+
+@pytest.mark.parametrize('date', ['20261102', '2026-11-2', '2026-02-30'])
+def test_clean_rejects_non_canonical_dates(date):
+    with pytest.raises(ValueError, match='Invalid date'):
+        make_validator().clean(booking_row(date=date))
+
+def test_clean_rejects_times_outside_opening_hours():
+    with pytest.raises(ValueError, match='outside opening hours'):
+        make_validator().clean(booking_row(time='08:00'))
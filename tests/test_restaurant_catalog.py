@@ -0,0 +1,56 @@
+from restaurant_catalog import RestaurantCatalog
+from restaurant_classes import Restaurant
+
+
+def make_catalog():
+    return RestaurantCatalog([
+        Restaurant('R001', 'The Grand Kitchen', 'Italian', 4.5, '123 Main St, Downtown', 10, '2:3,4:4,6:3', '10:00', '22:00'),
+        Restaurant('R002', 'Spice Garden', 'Indian', 4.2, '456 Park Ave, Midtown', 8, '2:2,4:3,6:3', '11:00', '23:00'),
+        Restaurant('R003', 'Curry House', 'Indian', 3.9, '12 Side St, Midtown', 6, '2:2,4:4', '11:00', '22:00'),
+        Restaurant('R004', 'Sushi Bar', 'Japanese', 4.8, '789 Ocean Dr, Waterfront', 6, '2:3,4:3', '12:00', '22:00'),
+    ])
+
+def ids(restaurants):
+    return [restaurant.restaurant_id for restaurant in restaurants]
+
+
+def test_update_after_rating_changed_in_place():
+    catalog = make_catalog()
+    restaurant = catalog['R002']
+    restaurant.rating = 4.75
+    catalog.update(restaurant)
+    assert ids(catalog.filter(min_rating=4.6)) == ['R004', 'R002']
+    assert sorted(catalog.ratings) == catalog.ratings
+    assert [rating for rating, _ in catalog.ratings] == [3.9, 4.5, 4.75, 4.8]
+
+def test_update_after_cuisine_changed_in_place():
+    catalog = make_catalog()
+    restaurant = catalog['R004']
+    restaurant.cuisine_type = 'Sushi'
+    catalog.update(restaurant)
+    assert catalog.cuisine_types() == ['Indian', 'Italian', 'Sushi']
+    assert ids(catalog.filter(cuisine_type='Sushi')) == ['R004']
+    assert ids(catalog.filter(cuisine_type='Japanese')) == []
+
+def test_update_after_name_and_location_changed_in_place():
+    catalog = make_catalog()
+    restaurant = catalog['R003']
+    restaurant.name = 'Tandoor'
+    restaurant.location = '1 Harbour Rd, Waterfront'
+    catalog.update(restaurant)
+    assert catalog.find_by_name('Curry House') == []
+    assert ids(catalog.find_by_name('tandoor')) == ['R003']
+    assert ids(catalog.filter(area='Midtown')) == ['R002']
+    assert ids(catalog.filter(area='Waterfront')) == ['R004', 'R003']
+    assert ids(catalog.filter(search='curry')) == []
+    assert ids(catalog.filter(search='tandoor')) == ['R003']
+
+def test_remove_after_change_in_place():
+    catalog = make_catalog()
+    restaurant = catalog['R001']
+    restaurant.cuisine_type = 'French'
+    restaurant.rating = 2.0
+    catalog.remove('R001')
+    assert 'R001' not in catalog
+    assert 'italian' not in catalog.by_cuisine
+    assert [restaurant_id for _, restaurant_id in catalog.ratings] == ['R003', 'R002', 'R004']
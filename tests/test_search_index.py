@@ -0,0 +1,34 @@
+from restaurant_classes import Restaurant
+from search_index import RestaurantSearchIndex, tokenize
+
+
+def make_index():
+    return RestaurantSearchIndex([
+        Restaurant('R001', 'Café Lumière', 'French', 4.5, '1 Rue Haute, Downtown', 6, '2:3,4:3', '10:00', '22:00'),
+        Restaurant('R002', '寿司 Kyoto', 'Japanese', 4.7, '2 Harbour Rd, Waterfront', 6, '2:3,4:3', '12:00', '22:00'),
+        Restaurant('R003', 'Fish & Chips', 'British', 3.9, '3 Pier St, Waterfront', 4, '2:2,4:2', '11:00', '21:00'),
+        Restaurant('R004', 'Spice Garden', 'Indian', 4.2, '456 Park Ave, Midtown', 8, '2:2,4:3,6:3', '11:00', '23:00'),
+    ])
+
+def ids(restaurants):
+    return [restaurant.restaurant_id for restaurant in restaurants]
+
+
+def test_tokenize_keeps_non_ascii_letters():
+    assert tokenize('Café Lumière') == ['café', 'lumière']
+    assert tokenize('寿司 Kyoto') == ['寿司', 'kyoto']
+
+def test_non_ascii_queries_match_only_matching_restaurants():
+    index = make_index()
+    assert ids(index.search('café')) == ['R001']
+    assert ids(index.search('lumi')) == ['R001']
+    assert ids(index.search('寿司')) == ['R002']
+
+def test_query_without_words_matches_substrings():
+    index = make_index()
+    assert ids(index.search('&')) == ['R003']
+    assert index.search('?!') == []
+
+def test_blank_query_returns_everything():
+    index = make_index()
+    assert ids(index.search('  ')) == ['R001', 'R002', 'R003', 'R004']
@@ -0,0 +1,190 @@
+import heapq
+import threading
+from bisect import bisect_left, bisect_right
+from itertools import count
+from availability import minutes_to_time
+from booking_store import BookingConflictError, booking_duration, time_to_minutes
+from restaurant_classes import User
+from storage import get_booking_store
+from table_allocation import allocate, parse_table_id, split_table_id
+
+# Tables joined for one party at most, so a freed table can help parties up to this many times its size
+MAX_JOIN = 3
+
+#Check if a table overlaps one offered at a slot less than `stay` minutes away
+def _offered(table_id, slot, stay, offered):
+    parts = split_table_id(table_id)
+    return any(abs(slot - offered_slot) < stay and not tables.isdisjoint(parts) for tables, offered_slot in offered)
+
+
+#A user's wish for a table at a restaurant on a day, any slot between
+#`earliest` and `latest` (minutes since midnight). Lower priority values go
+#first, then the order requests were made in.
+class WaitlistRequest:
+    __slots__ = ('request_id', 'user_id', 'restaurant_id', 'date', 'earliest', 'latest', 'party_size', 'priority', 'sequence', 'auto_book', 'status', 'offer', 'booking_id')
+
+    def __init__(self, request_id, user_id, restaurant_id, date, earliest, latest, party_size, priority, sequence, auto_book):
+        self.request_id = request_id
+        self.user_id = user_id
+        self.restaurant_id = restaurant_id
+        self.date = date
+        self.earliest = earliest
+        self.latest = latest
+        self.party_size = party_size
+        self.priority = priority
+        self.sequence = sequence
+        self.auto_book = auto_book
+        # 'waiting', then 'offered', 'booked' or 'withdrawn'
+        self.status = 'waiting'
+        # {'time', 'table_id'} once offered or booked
+        self.offer = None
+        self.booking_id = None
+
+    def __repr__(self):
+        return f"WaitlistRequest({self.request_id!r}, {self.restaurant_id} {self.date} {minutes_to_time(self.earliest)}-{minutes_to_time(self.latest)}, party of {self.party_size}, {self.status})"
+
+
+#Waitlist for full slots, matched against tables as they are freed.
+#Requests are indexed under every slot of their time window and their party
+#size, each (restaurant, date, slot, party size) bucket a heap in priority
+#order. A freed table can only help the few slots whose stay overlaps it and
+#party sizes it can seat (alone or joined with free neighbours), so an event
+#looks at those bucket heads only, whatever the size of the waitlist.
+#Requests with auto_book are booked straight away, others get an offer through
+#on_offer(request) and leave the waitlist; the table isn't held for them.
+#Cancellations through the booking store are picked up automatically.
+class Waitlist:
+    def __init__(self, restaurants, on_offer=None, on_booked=None, listen=True):
+        self.restaurants = restaurants
+        self.on_offer = on_offer
+        self.on_booked = on_booked
+        self.requests = {}
+        # (restaurant_id, date, slot minute) -> {party_size: heap of (priority, sequence, request_id)}
+        self._buckets = {}
+        self._sequence = count(1)
+        self._lock = threading.RLock()
+        self.stats = {'events': 0, 'buckets_checked': 0, 'offers': 0, 'bookings': 0}
+        if listen:
+            get_booking_store().add_release_listener(self.on_release)
+
+    #Join the waitlist for any slot from `earliest` to `latest` ('HH:MM', latest defaults to earliest)
+    def add(self, user_id, restaurant_id, date, earliest, latest=None, party_size=2, priority=0, auto_book=False):
+        restaurant = self.restaurants.get(restaurant_id)
+        if restaurant is None:
+            raise ValueError(f"Unknown restaurant {restaurant_id}")
+        first = time_to_minutes(earliest)
+        last = time_to_minutes(latest) if latest else first
+        slots = restaurant.get_slot_minutes()
+        window = slots[bisect_left(slots, first):bisect_right(slots, last)]
+        if not window:
+            raise ValueError(f"No slots between {earliest} and {latest or earliest} at {restaurant_id}")
+
+        with self._lock:
+            sequence = next(self._sequence)
+            request = WaitlistRequest(f"W{sequence}", user_id, restaurant_id, date, first, last, int(party_size), priority, sequence, auto_book)
+            self.requests[request.request_id] = request
+            entry = (priority, sequence, request.request_id)
+            for slot in window:
+                heapq.heappush(self._buckets.setdefault((restaurant_id, date, slot), {}).setdefault(request.party_size, []), entry)
+        return request
+
+    #Leave the waitlist, False if the request was already offered, booked or withdrawn
+    def withdraw(self, request_id):
+        with self._lock:
+            request = self.requests.get(request_id)
+            if request is None or request.status != 'waiting':
+                return False
+            # Its heap entries are dropped when they reach the top
+            request.status = 'withdrawn'
+            return True
+
+    #Requests still waiting, optionally only one user's
+    def waiting(self, user_id=None):
+        return [request for request in self.requests.values() if request.status == 'waiting' and (user_id is None or request.user_id == user_id)]
+
+    #Booking store listener, called with the booking whose table was freed
+    def on_release(self, booking):
+        restaurant = self.restaurants.get(booking['restaurant_id'])
+        if restaurant is None:
+            return
+        try:
+            start = time_to_minutes(booking['time'])
+            duration = booking_duration(booking, restaurant.default_duration)
+        except ValueError:
+            return
+        self.table_freed(booking['restaurant_id'], booking['date'], start, duration, booking['table_id'])
+
+    #Best waiting entry of a bucket heap, dropping entries of requests that stopped waiting
+    def _head(self, heap):
+        while heap and self.requests[heap[0][2]].status != 'waiting':
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    #Match the waitlist against a table freed from `start` for `duration` minutes.
+    #Returns the requests offered or booked, in the order they were served.
+    def table_freed(self, restaurant_id, date, start, duration, table_id=None):
+        restaurant = self.restaurants.get(restaurant_id)
+        if restaurant is None:
+            return []
+        stay = restaurant.default_duration
+        seats = sum(parse_table_id(part)[0] for part in split_table_id(table_id)) if table_id else None
+        slots = restaurant.get_slot_minutes()
+        # A stay starting at s overlaps the freed time when start - stay < s < start + duration
+        affected = slots[bisect_right(slots, start - stay):bisect_left(slots, start + duration)]
+
+        served = []
+        with self._lock:
+            self.stats['events'] += 1
+            candidates = []
+            for slot in affected:
+                sizes = self._buckets.get((restaurant_id, date, slot))
+                if not sizes:
+                    continue
+                for party_size, heap in sizes.items():
+                    if seats is None or party_size <= seats * MAX_JOIN:
+                        candidates.append((slot, party_size, heap))
+            self.stats['buckets_checked'] += len(candidates)
+            # Tables offered during this event, treated as taken for the next candidates
+            offered = []
+            while candidates:
+                heads = [(head, i) for i, (_, _, heap) in enumerate(candidates) if (head := self._head(heap)) is not None]
+                if not heads:
+                    break
+                _, i = min(heads)
+                slot, party_size, heap = candidates[i]
+                request = self.requests[heap[0][2]]
+                if self._serve(restaurant, request, slot, offered):
+                    served.append(request)
+                else:
+                    # Everyone in this bucket wants the same slot and party size, so none of them fits
+                    candidates.pop(i)
+
+        for request in served:
+            callback = self.on_booked if request.status == 'booked' else self.on_offer
+            if callback is not None:
+                callback(request)
+        return served
+
+    #Offer or book the best table for the request at a slot, False if none is free
+    def _serve(self, restaurant, request, slot, offered):
+        time = minutes_to_time(slot)
+        stay = restaurant.default_duration
+        free_tables = [table for table in restaurant._free_tables(request.date, time, stay) if not _offered(table['table_id'], slot, stay, offered)]
+        option = allocate(free_tables, request.party_size)
+        if option is None:
+            return False
+        request.offer = {'time': time, 'table_id': option.table_id}
+        if request.auto_book:
+            try:
+                request.booking_id = User(request.user_id, '', '', '').make_reservation(
+                    request.restaurant_id, request.date, time, option.table_id, request.party_size, stay)
+            except BookingConflictError:
+                request.offer = None
+                return False
+            request.status = 'booked'
+            self.stats['bookings'] += 1
+        else:
+            request.status = 'offered'
+            offered.append((set(option.table_ids), slot))
+            self.stats['offers'] += 1
+        return True